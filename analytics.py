@@ -0,0 +1,265 @@
+"""
+Circulation analytics: aggregates over the borrow history, kept current.
+
+CirculationStats is maintained like the other LibrarySystem indexes: built
+from the history in one pass on load, then updated by every borrow and
+return, so reports never rescan `borrow_records`. Archived months (see
+archive.py) are added the first time a report needs them:
+
+    books      loans per ISBN
+    months     loans, returns and fines (EGP) per "YYYY-MM"
+    borrowers  loans, returns and fines per borrower ID
+
+Loans count in the month they started, returns and fines in the month the
+book came back. Reports are generated row by row and `write_report`
+streams them to a file, so an export never holds the whole report.
+
+Usage (JSON files and journal as the desktop app uses them):
+    python analytics.py top                          # Most borrowed books, most active borrowers
+    python analytics.py top --k 20 --by fines
+    python analytics.py export months --format csv --out months.csv
+    python analytics.py export history --format ndjson > history.ndjson
+"""
+import argparse
+import csv
+import heapq
+import json
+import sys
+from collections import Counter
+from datetime import date
+from functools import lru_cache
+from operator import attrgetter
+
+FORMATS = ("csv", "ndjson")
+REPORTS = {
+    "books": ("isbn", "title", "author", "loans"),
+    "months": ("month", "loans", "returns", "fines"),
+    "borrowers": ("user_id", "name", "phone", "loans", "returns", "fines"),
+    "history": ("isbn", "title", "user_id", "name", "phone", "borrow_date",
+                "returned", "return_date", "fine"),
+}
+RANKINGS = ("loans", "returns", "fines")
+
+_LOANS, _RETURNS, _FINES = 0, 1, 2
+
+
+@lru_cache(maxsize=4096)
+def month_of(day):
+    """'YYYY-MM' of a day ordinal (memoized: histories reuse few days)."""
+    d = date.fromordinal(day)
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+class CirculationStats:
+    """
+    Materialized circulation aggregates.
+
+    Per-month and per-borrower totals are [loans, returns, fines] lists, so
+    an update is a couple of dict lookups and in-place additions.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.loans_by_isbn = Counter()
+        self._months = {}  # "YYYY-MM" -> [loans, returns, fines]
+        self._borrowers = {}  # str(user_id) -> [loans, returns, fines]
+
+    def rebuild(self, records):
+        """Recomputes every aggregate from the history in one pass."""
+        self.loans_by_isbn = Counter()
+        self._months = {}
+        self._borrowers = {}
+        self.add_records(records)
+
+    def add_records(self, records):
+        """
+        Adds a batch of records to the aggregates (the whole history on
+        load, or archived months when a report needs them).
+
+        Totals are counted per day and per raw user ID, mostly with C-level
+        Counters (only fined records get a Python-level step), then folded
+        into months and borrower rows.
+        """
+        user_of = attrgetter("user_id")
+        estimate = self.return_day
+        self.loans_by_isbn.update(map(attrgetter("isbn"), records))
+        loans_by_day = Counter(map(attrgetter("borrow_day"), records))
+        loans_by_user = Counter(map(user_of, records))
+
+        returned = [rec for rec in records if rec.returned]
+        returns_by_user = Counter(map(user_of, returned))
+        returns_by_day = Counter(map(attrgetter("return_day"), returned))
+        if returns_by_day.pop(None, 0):  # Records saved without a return date
+            returns_by_day.update(estimate(rec) for rec in returned if rec.return_day is None)
+        fines_by_user, fines_by_day = {}, {}
+        for rec in returned:
+            fine = rec.fine
+            if fine:
+                uid = rec.user_id
+                fines_by_user[uid] = fines_by_user.get(uid, 0) + fine
+                day = rec.return_day
+                if day is None:
+                    day = estimate(rec)
+                fines_by_day[day] = fines_by_day.get(day, 0) + fine
+
+        for table, key, totals, field in (
+            (self._months, month_of, loans_by_day, _LOANS),
+            (self._months, month_of, returns_by_day, _RETURNS),
+            (self._months, month_of, fines_by_day, _FINES),
+            (self._borrowers, str, loans_by_user, _LOANS),
+            (self._borrowers, str, returns_by_user, _RETURNS),
+            (self._borrowers, str, fines_by_user, _FINES),
+        ):
+            for k, value in totals.items():
+                _row(table, key(k))[field] += value
+
+    def loan_started(self, rec):
+        self.loans_by_isbn[rec.isbn] += 1
+        _row(self._months, month_of(rec.borrow_day))[_LOANS] += 1
+        _row(self._borrowers, str(rec.user_id))[_LOANS] += 1
+
+    def loan_ended(self, rec):
+        """Call once the record is marked returned, with its fine."""
+        for row in (_row(self._months, month_of(self.return_day(rec))),
+                    _row(self._borrowers, str(rec.user_id))):
+            row[_RETURNS] += 1
+            row[_FINES] += rec.fine
+
+    def return_day(self, rec):
+        """
+        The day a returned record came back. Records saved before return
+        dates were kept get an estimate: a fine pins the day down (under the
+        current policy); a loan without one came back within its period and
+        is counted on its borrow day.
+        """
+        if rec.return_day is not None:
+            return rec.return_day
+        rate = self.policy.fine_per_day
+        if rec.fine and rate:
+            return rec.borrow_day + self.policy.loan_days + int(rec.fine // rate)
+        return rec.borrow_day
+
+    # ---------- Queries ----------
+    def top_books(self, k=10):
+        """(isbn, loans) of the k most borrowed books, most first (O(n log k))."""
+        return heapq.nlargest(k, self.loans_by_isbn.items(), key=_second)
+
+    def top_borrowers(self, k=10, by="loans"):
+        """
+        The k borrowers with the most loans, returns or fines, highest first.
+
+        Returns:
+            list: (user_id, [loans, returns, fines]) pairs.
+        """
+        field = ranking_field(by)
+        return heapq.nlargest(k, self._borrowers.items(), key=lambda item: item[1][field])
+
+    def months(self):
+        """Yields (month, [loans, returns, fines]), oldest month first."""
+        for month in sorted(self._months):
+            yield month, self._months[month]
+
+    def borrowers(self):
+        """Yields (user_id, [loans, returns, fines]) for every borrower."""
+        yield from self._borrowers.items()
+
+
+def ranking_field(by):
+    """Position of a RANKINGS name in a [loans, returns, fines] row (ValueError if unknown)."""
+    if by not in RANKINGS:
+        raise ValueError(f"⚠️ Cannot rank borrowers by '{by}' (use {', '.join(RANKINGS)}).")
+    return RANKINGS.index(by)
+
+
+def _row(table, key):
+    row = table.get(key)
+    if row is None:
+        row = table[key] = [0, 0, 0]
+    return row
+
+
+def _second(item):
+    return item[1]
+
+
+def write_report(rows, f, fmt="csv", fields=None):
+    """
+    Streams report rows to a text file, one row at a time.
+
+    Args:
+        rows (iterable): Row dicts (typically a generator).
+        f (file): Text file opened for writing (newline="" for CSV).
+        fmt (str): "csv" (header from `fields`) or "ndjson".
+        fields (tuple): CSV columns; defaults to the first row's keys.
+
+    Returns:
+        int: Number of rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"⚠️ Unknown format '{fmt}' (use {', '.join(FORMATS)}).")
+    n = 0
+    if fmt == "ndjson":
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            n += 1
+        return n
+
+    writer = None
+    if fields:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(f, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+        n += 1
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Circulation reports.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    top = sub.add_parser("top", help="Most borrowed books and most active borrowers")
+    top.add_argument("--k", type=int, default=10, help="Entries per ranking")
+    top.add_argument("--by", choices=RANKINGS, default="loans", help="How to rank borrowers")
+    export = sub.add_parser("export", help="Stream a full report as CSV or NDJSON")
+    export.add_argument("report", choices=list(REPORTS))
+    export.add_argument("--format", choices=FORMATS, default="csv")
+    export.add_argument("--out", help="Output file (default: stdout)")
+    for p in (top, export):
+        p.add_argument("--db", default="library_data.json", help="Books JSON file")
+        p.add_argument("--borrow", default="borrow.json", help="Borrow history JSON file")
+        p.add_argument("--journal", default="library.journal", help="Journal file ('' for none)")
+        p.add_argument("--archive", default="borrow_archive", help="Archive of old borrow history")
+    args = parser.parse_args(argv)
+
+    from archive import HistoryArchive
+    from storage import JsonStorage
+    from system import LibrarySystem
+
+    # Read-only: shared mode so a running app's lock and journal are respected
+    # (and no close(), so nothing is archived)
+    storage = JsonStorage(args.db, args.borrow, args.journal or None, shared=True)
+    library = LibrarySystem(storage=storage, archive=HistoryArchive(args.archive))
+
+    if args.command == "top":
+        print(f"📚 Most borrowed books (top {args.k}):")
+        for row in library.top_books(args.k):
+            print(f"  {row['loans']:>6}  {row['title']} ({row['isbn']})")
+        print(f"👤 Most active borrowers by {args.by} (top {args.k}):")
+        for row in library.top_borrowers(args.k, args.by):
+            print(f"  {row[args.by]:>6}  {row['name']} ({row['user_id']})")
+        return
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8", newline="") as f:
+            n = library.export_report(args.report, f, args.format)
+        print(f"✅ Wrote {n} {args.report} rows to {args.out}.")
+    else:
+        sys.stdout.reconfigure(newline="")
+        library.export_report(args.report, sys.stdout, args.format)
+
+
+if __name__ == "__main__":
+    main()
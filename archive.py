@@ -0,0 +1,375 @@
+"""
+Cold tier of the borrow history.
+
+Returned records older than a configurable age are moved out of the hot
+history (the file loaded at startup) into gzip NDJSON segments, one per
+borrow month, described by a small manifest:
+
+    borrow_archive/
+        manifest.json            segments, pending run, borrower profiles file
+        2025-03.ndjson.gz        records borrowed in March 2025
+        borrowers-4.json.gz      latest profile of every archived borrower
+
+The manifest is the commit point. A segment is only trusted up to the
+record count and byte size it records, so an interrupted append is cut off
+on the next one. A run stays "pending" until the hot history has been
+rewritten without its records; on load, hot records that duplicate a
+pending run are dropped (see `duplicates`).
+
+Segments are read lazily and cached a few at a time: the Borrowers Log and
+the analytics only open the months a query's date range needs. A segment
+that cannot be read is reported in `errors` and reads as empty; a manifest
+that cannot be read marks the archive `broken`, and LibrarySystem appends
+nothing to it until it is repaired.
+
+Usage (JSON files and journal as the desktop app uses them):
+    python archive.py run --older-than 365   # Archive returned loans borrowed over a year ago
+    python archive.py info                   # Show the segments
+"""
+import argparse
+import gzip
+import json
+import os
+import zlib
+from collections import Counter, OrderedDict
+from datetime import date
+from itertools import islice
+from analytics import month_of
+from borrowers import Borrower
+from borrow_record import BorrowRecord
+from dates import format_day, parse_day
+
+MANIFEST = "manifest.json"
+VERSION = 1
+
+# What a damaged segment or profiles file can raise while being decoded
+_READ_ERRORS = (OSError, EOFError, ValueError, KeyError, TypeError, zlib.error)
+
+
+class Segment:
+    """
+    Manifest entry of one month of archived records.
+
+    Attributes:
+        month (str): Borrow month, "YYYY-MM".
+        file (str): Segment file name inside the archive directory.
+        records (int): Committed records (lines) in the file.
+        size (int): Committed bytes; anything after them is an interrupted append.
+        last_return (int): Latest return day among the records, so analytics
+            know which months' returns the segment contributes to.
+    """
+
+    __slots__ = ("month", "file", "records", "size", "last_return")
+
+    def __init__(self, month, file, records=0, size=0, last_return=None):
+        self.month = month
+        self.file = file
+        self.records = records
+        self.size = size
+        self.last_return = last_return
+
+    def to_dict(self):
+        return {
+            "file": self.file,
+            "records": self.records,
+            "size": self.size,
+            "last_return": format_day(self.last_return),
+        }
+
+
+class HistoryArchive:
+    """
+    Monthly gzip NDJSON segments of returned borrow records.
+
+    Args:
+        directory (str): Where the manifest and segments live.
+        max_age_days (int): Returned records borrowed longer ago than this
+            are archived by LibrarySystem.archive_history.
+        cache_segments (int): Decoded segments kept in memory.
+    """
+
+    def __init__(self, directory="borrow_archive", max_age_days=365, cache_segments=8):
+        self.directory = directory
+        self.max_age_days = max_age_days
+        self.cache_segments = cache_segments
+        self.segments = {}  # month -> Segment
+        self.pending = None  # {month: records before the pending run}
+        self.profiles_file = None
+        self.generation = 0
+        self.broken = False
+        self.errors = []
+        self._cache = OrderedDict()  # (month, records) -> [BorrowRecord, ...]
+
+    def __len__(self):
+        return sum(seg.records for seg in self.segments.values())
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    # ---------- Manifest ----------
+    def load(self):
+        """
+        (Re)reads the manifest; a missing archive is an empty one.
+
+        Returns:
+            bool: False if the manifest exists but cannot be read (the
+            archive is then empty and `broken`, see `errors`).
+        """
+        self.segments, self.pending, self.profiles_file, self.generation = {}, None, None, 0
+        self.broken = False
+        self._cache.clear()
+        try:
+            with open(self._path(MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != VERSION:
+                raise ValueError(f"unsupported version {manifest.get('version')!r}")
+            segments = {
+                month: Segment(month, entry["file"], entry["records"], entry["size"],
+                               parse_day(entry["last_return"]))
+                for month, entry in manifest["segments"].items()
+            }
+        except FileNotFoundError:
+            return True
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            self.broken = True
+            self.errors.append(f"Could not read history archive {self._path(MANIFEST)}: {e}")
+            return False
+        self.segments = segments
+        self.pending = manifest.get("pending")
+        self.profiles_file = manifest.get("profiles")
+        self.generation = manifest.get("generation", 0)
+        return True
+
+    def _write_manifest(self):
+        manifest = {
+            "version": VERSION,
+            "generation": self.generation,
+            "profiles": self.profiles_file,
+            "pending": self.pending,
+            "segments": {m: self.segments[m].to_dict() for m in sorted(self.segments)},
+        }
+        path = self._path(MANIFEST)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    # ---------- Reading ----------
+    def months(self, first=None, last=None):
+        """Archived months, oldest first, overlapping the day range [first, last]."""
+        lo = month_of(first) if first is not None else ""
+        hi = month_of(last) if last is not None else "9999-99"
+        return [m for m in sorted(self.segments) if lo <= m <= hi]
+
+    def contributing(self, first=None, last=None):
+        """
+        Archived months holding records that count towards circulation
+        totals of the days [first, last]: borrowed by `last`, returned from
+        `first` on.
+        """
+        lo = month_of(first) if first is not None else ""
+        return [m for m in self.months(None, last)
+                if self.segments[m].last_return is None or month_of(self.segments[m].last_return) >= lo]
+
+    def read(self, month):
+        """
+        Every committed record of a month, sorted by borrow day (cached).
+
+        A later run may append loans that started early in the month but
+        came back late, so the file itself is only ordered within a run.
+        """
+        seg = self.segments.get(month)
+        if seg is None:
+            return []
+        key = (month, seg.records)
+        records = self._cache.get(key)
+        if records is not None:
+            self._cache.move_to_end(key)
+            return records
+        records = self._read_segment(seg)
+        if records is None:
+            return []
+        records.sort(key=_borrow_day)
+        self._cache[key] = records
+        if len(self._cache) > self.cache_segments:
+            self._cache.popitem(last=False)
+        return records
+
+    def iter_records(self, months=None):
+        """Streams records month by month, bypassing the cache (for exports and folding)."""
+        for month in months if months is not None else sorted(self.segments):
+            seg = self.segments[month]
+            records = self._cache.get((month, seg.records))
+            if records is None:
+                records = self._read_segment(seg) or []
+            yield from records
+
+    def _read_segment(self, seg):
+        """The committed records of a segment in file order, or None if it is unreadable."""
+        try:
+            with gzip.open(self._path(seg.file), "rb") as f:
+                lines = list(islice(f, seg.records))  # Never past the committed records
+            if len(lines) < seg.records:
+                raise EOFError(f"{len(lines)} of {seg.records} records")
+            # One json.loads for the whole segment: NDJSON lines hold no raw newlines
+            rows = json.loads(b"[" + b",".join(lines) + b"]") if lines else []
+            return [
+                BorrowRecord(r["isbn"], r["user_id"], r["name"], r["phone"], r["borrow_date"],
+                             True, r.get("fine", 0), r.get("return_date"))
+                for r in rows
+            ]
+        except _READ_ERRORS as e:
+            self.errors.append(f"Could not read archived {seg.month} ({seg.file}): {e}")
+            return None
+
+    def profiles(self):
+        """Latest Borrower profile of every archived borrower (for the registry)."""
+        if not self.profiles_file:
+            return []
+        try:
+            with gzip.open(self._path(self.profiles_file), "rt", encoding="utf-8") as f:
+                return [Borrower(r["user_id"], r["name"], r["phone"], r["loans"], r["last_day"])
+                        for r in json.load(f)]
+        except _READ_ERRORS as e:
+            self.errors.append(f"Could not read archived borrowers ({self.profiles_file}): {e}")
+            return []
+
+    def duplicates(self):
+        """
+        Multiset of (isbn, user_id, borrow_day) archived by a pending run,
+        i.e. records the hot history may still hold after an interruption.
+        """
+        found = Counter()
+        for month, before in (self.pending or {}).items():
+            seg = self.segments.get(month)
+            records = self._read_segment(seg) if seg is not None else None
+            for rec in islice(records or [], before, None):
+                found[(rec.isbn, str(rec.user_id), rec.borrow_day)] += 1
+        return found
+
+    # ---------- Writing ----------
+    def append(self, records, return_day):
+        """
+        Archives returned records and marks the run pending.
+
+        Args:
+            records (list): Returned BorrowRecords, oldest first.
+            return_day (callable): Return day of a record (estimated for
+                records saved without one, see CirculationStats.return_day).
+
+        Raises:
+            OSError: The archive could not be written (nothing is committed).
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        by_month = {}
+        for rec in records:
+            by_month.setdefault(month_of(rec.borrow_day), []).append(rec)
+
+        profiles = {b.user_id: b for b in self.profiles()}
+        pending = {}
+        for month, recs in by_month.items():
+            seg = self.segments.get(month) or Segment(month, f"{month}.ndjson.gz")
+            pending[month] = seg.records
+            path = self._path(seg.file)
+            with open(path, "ab") as raw:
+                raw.truncate(seg.size)  # Drop an interrupted append past the manifest
+                raw.seek(seg.size)
+                with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                    gz.write("".join(
+                        json.dumps(rec.to_dict(), ensure_ascii=False) + "\n" for rec in recs
+                    ).encode("utf-8"))
+                raw.flush()
+                os.fsync(raw.fileno())
+                size = raw.tell()
+            last = max(return_day(rec) for rec in recs)
+            self.segments[month] = Segment(
+                month, seg.file, seg.records + len(recs), size,
+                last if seg.last_return is None else max(seg.last_return, last),
+            )
+            for rec in recs:
+                _profile(profiles, rec)
+
+        old_profiles = self.profiles_file
+        self.generation += 1
+        self.profiles_file = f"borrowers-{self.generation}.json.gz"
+        with gzip.open(self._path(self.profiles_file), "wt", encoding="utf-8") as f:
+            json.dump([{"user_id": b.user_id, "name": b.name, "phone": b.phone,
+                        "loans": b.loans, "last_day": b.last_day} for b in profiles.values()], f)
+        self.pending = pending
+        self._write_manifest()  # Commit point: the records are archived from here on
+        if old_profiles:
+            os.remove(self._path(old_profiles))
+
+    def commit(self):
+        """Ends the pending run once the hot history no longer holds its records."""
+        if self.pending is not None:
+            self.pending = None
+            self._write_manifest()
+
+    def describe(self):
+        """One line per segment, for the `info` command."""
+        if not self.segments:
+            return [f"{self.directory}: empty"]
+        lines = []
+        for month in sorted(self.segments):
+            seg = self.segments[month]
+            lines.append(f"{month}: {seg.records} records, {seg.size} bytes ({seg.file})")
+        lines.append(f"Total: {len(self)} records" + (" (a run is pending)" if self.pending else ""))
+        return lines
+
+
+def month_bounds(month):
+    """(first day, first day of the next month) of a "YYYY-MM" month, as ordinals."""
+    year, mon = int(month[:4]), int(month[5:7])
+    return date(year, mon, 1).toordinal(), date(year + mon // 12, mon % 12 + 1, 1).toordinal()
+
+
+def _borrow_day(rec):
+    return rec.borrow_day
+
+
+def _profile(profiles, rec):
+    uid = str(rec.user_id)
+    borrower = profiles.get(uid)
+    if borrower is None:
+        borrower = profiles[uid] = Borrower(uid, rec.name, rec.phone)
+    borrower.loans += 1
+    if borrower.last_day is None or rec.borrow_day >= borrower.last_day:
+        borrower.name, borrower.phone, borrower.last_day = rec.name, str(rec.phone), rec.borrow_day
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Borrow history archive tools.")
+    parser.add_argument("command", choices=["run", "info"])
+    parser.add_argument("--older-than", type=int, default=365, metavar="DAYS",
+                        help="Archive returned loans borrowed more than DAYS ago")
+    parser.add_argument("--archive", default="borrow_archive", help="Archive directory")
+    parser.add_argument("--db", default="library_data.json", help="Books JSON file")
+    parser.add_argument("--borrow", default="borrow.json", help="Borrow history JSON file")
+    parser.add_argument("--journal", default="library.journal", help="Journal file ('' for none)")
+    args = parser.parse_args(argv)
+
+    archive = HistoryArchive(args.archive, args.older_than)
+    if args.command == "info":
+        archive.load()
+        print("\n".join(archive.errors + archive.describe()))
+        return
+
+    from storage import JsonStorage
+    from system import LibrarySystem
+
+    storage = JsonStorage(args.db, args.borrow, args.journal or None, shared=True)
+    library = LibrarySystem(storage=storage, archive=archive)
+    try:
+        moved = library.archive_history()
+    except (OSError, ValueError) as e:
+        library.close()
+        print(f"❌ Archiving failed: {e}")
+        return
+    library.close()
+    print(f"✅ Archived {moved} records; {len(library.borrow_records)} remain in {args.borrow}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+
+CACHE_DIR = ".cache"
+
+
+def sized_image(source, size, cache_dir=CACHE_DIR):
+    """
+    Returns the path of a PNG copy of `source` resized to `size`, cached on disk.
+
+    The copy is regenerated only when the source is newer than it, so the
+    full-size image is decoded (and PIL imported) once, not on every start.
+    Tk reads PNG natively, which lets the window icon skip PIL entirely.
+
+    Args:
+        source (str): Path of the original image.
+        size (tuple): (width, height) in pixels.
+        cache_dir (str): Directory holding the resized copies.
+
+    Returns:
+        str: Path of the cached PNG.
+    """
+    name = os.path.splitext(os.path.basename(source))[0]
+    target = os.path.join(cache_dir, f"{name}-{size[0]}x{size[1]}.png")
+    try:
+        if os.path.getmtime(target) >= os.path.getmtime(source):
+            return target
+    except OSError:
+        pass  # No cached copy yet
+
+    from PIL import Image  # Only needed when the cache is (re)built
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with Image.open(source) as img:
+        img = img.convert("RGBA")
+        img.thumbnail(size, Image.LANCZOS)
+        img.save(target + ".tmp", "PNG")
+    os.replace(target + ".tmp", target)
+    return target
+
+
+def load_image(source, size, cache_dir=CACHE_DIR):
+    """Opens the cached, pre-sized copy of `source` as a PIL image (decoded once)."""
+    from PIL import Image
+
+    with Image.open(sized_image(source, size, cache_dir)) as img:
+        img.load()
+        return img.copy()
@@ -0,0 +1,10 @@
+"""
+Benchmarks for the Smart Library core engine (headless, except startup).
+
+Run a benchmark module from the repository root, e.g.:
+    python -m benchmarks.engine --sizes 1000,100000 --out results.json
+    python -m benchmarks.compare baseline.json results.json
+    python -m benchmarks.startup --out startup.json   # needs a display
+    python -m benchmarks.generate --books 100000 --out data/
+    python -m benchmarks.record_memory
+"""
@@ -0,0 +1,69 @@
+"""
+Compares two benchmark reports written by benchmarks.engine.
+
+Every timing and memory figure present in both reports is listed with its
+ratio (new / old); figures that grew by more than --threshold are flagged
+as regressions and make the command exit with status 1.
+
+Usage:
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 0.10]
+"""
+import argparse
+import json
+import sys
+
+# Sizes and hit counts describe the workload, they are not measurements
+NOT_MEASURED = {"books", "records", "hits", "keystrokes"}
+
+
+def flatten(node, prefix=""):
+    """Yields (dotted path, value) for every numeric measurement in a report."""
+    for key, value in node.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in NOT_MEASURED:
+            yield path, value
+
+
+def compare(old, new, threshold=0.10):
+    """
+    Returns:
+        list: (path, old, new, ratio, regressed) for measurements in both reports.
+    """
+    before = dict(flatten(old["results"]))
+    rows = []
+    for path, value in flatten(new["results"]):
+        if path not in before:
+            continue
+        base = before[path]
+        ratio = value / base if base else (1.0 if not value else float("inf"))
+        rows.append((path, base, value, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    parser.add_argument("old", help="Baseline report")
+    parser.add_argument("new", help="Candidate report")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    rows = compare(old, new, args.threshold)
+    width = max((len(r[0]) for r in rows), default=10)
+    for path, base, value, ratio, regressed in rows:
+        flag = "  ⚠️ REGRESSION" if regressed else ""
+        print(f"{path:<{width}}  {base:>10}  {value:>10}  x{ratio:.2f}{flag}")
+    regressions = sum(1 for r in rows if r[4])
+    print(f"{len(rows)} measurements, {regressions} regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
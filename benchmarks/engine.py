@@ -0,0 +1,268 @@
+"""
+Scaling benchmark for LibrarySystem on synthetic data.
+
+For every catalog size it generates data files (see benchmarks.generate)
+in a temporary directory and measures:
+    load_s          startup with an eager and with a lazy history, and from
+                    binary snapshots (see snapshot.py)
+    save_s          full rewrite of the catalog and of the history
+    memory_mb       memory retained by a loaded library and the load's peak
+    ops_us          add / borrow / return / delete latency, engine only
+    ops_journal_us  the same operations committed to a journal (with fsync)
+    search_ms       cold queries of several shapes, and an incremental
+                    "typing" sequence
+    query_ms        structured queries (filters, sorting, limits)
+
+Results are printed (or written with --out) as JSON; compare two runs with
+`python -m benchmarks.compare old.json new.json`. Nothing imports Tk.
+
+Usage:
+    python -m benchmarks.engine                         # 1k, 100k and 1M books
+    python -m benchmarks.engine --sizes 1000,100000 --out results.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from benchmarks.generate import generate, write
+from storage import JsonStorage
+from system import LibrarySystem
+
+SEARCHES = {
+    "one_char": "a",
+    "two_chars": "da",
+    "word": "python",
+    "author": "hassan",
+    "isbn": "9780000000123",
+    "miss": "zzqx",
+}
+
+QUERIES = {
+    "author": "author:hassan",
+    "borrowed_by_author": "author:hassan status:borrowed",
+    "overdue": "status:overdue sort:borrow_date",
+    "date_range": "borrowed_after:2000-01-01 borrowed_before:2100-01-01 sort:-borrow_date limit:50",
+    "available_text": "python status:available sort:title limit:20",
+}
+
+
+class _NoCommitStorage(JsonStorage):
+    """Loads the generated files but persists nothing: isolates engine cost."""
+
+    def commit_batch(self, library, ops):
+        pass
+
+
+def _best(fn, repeat):
+    """Minimum wall time of `repeat` calls (the least disturbed run)."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _summary(samples, scale):
+    samples = sorted(samples)
+    return {
+        "p50": round(samples[len(samples) // 2] * scale, 1),
+        "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * scale, 1),
+        "max": round(samples[-1] * scale, 1),
+    }
+
+
+def bench_load(db_file, borrow_file, repeat):
+    LibrarySystem(storage=JsonStorage(db_file, borrow_file, binary=True)).close()  # Writes the snapshots
+
+    def binary():
+        return LibrarySystem(storage=JsonStorage(db_file, borrow_file, binary=True))
+
+    return {
+        "eager": round(_best(lambda: LibrarySystem(db_file, borrow_file), repeat), 3),
+        "lazy": round(_best(lambda: LibrarySystem(db_file, borrow_file, lazy_history=True), repeat), 3),
+        "binary": round(_best(binary, repeat), 3),
+    }
+
+
+def bench_memory(db_file, borrow_file):
+    gc.collect()
+    tracemalloc.start()
+    library = LibrarySystem(db_file, borrow_file)
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del library
+    return {"retained": round(retained / 2**20, 1), "peak": round(peak / 2**20, 1)}
+
+
+def bench_save(library, repeat):
+    return {
+        "books": round(_best(library.save_data, repeat), 3),
+        "history": round(_best(library.save_borrow_data, repeat), 3),
+    }
+
+
+def bench_ops(library, count, seed=7):
+    """Per-operation latency in microseconds for `count` of each operation."""
+    rng = random.Random(seed)
+    timings = {"add": [], "borrow": [], "return": [], "delete": []}
+    added = [f"BENCH-{seed}-{i}" for i in range(count)]
+
+    def timed(kind, fn, *args):
+        t0 = time.perf_counter()
+        ok, msg = fn(*args)
+        timings[kind].append(time.perf_counter() - t0)
+        if not ok:
+            raise RuntimeError(f"{kind} {args[0]}: {msg}")
+
+    for isbn in added:
+        timed("add", library.add_book, f"Benchmark Title {isbn}", "Bench Author", isbn)
+    available = [b.isbn for b in library.books if b.is_available]
+    lent = rng.sample(available, min(count, len(available)))
+    for isbn in lent:
+        timed("borrow", library.borrow_book, isbn, "9999", "Bench Borrower", "01000000000")
+    for isbn in lent:
+        timed("return", library.return_book, isbn)
+    for isbn in added:
+        timed("delete", library.delete_book, isbn)
+    return {kind: _summary(samples, 1e6) for kind, samples in timings.items() if samples}
+
+
+def bench_search(library, repeat):
+    """Cold query latency in milliseconds (median of `repeat`) and hit counts."""
+    results = {}
+    for label, term in SEARCHES.items():
+        samples = []
+        for _ in range(repeat):
+            library.search("\x00")  # Defeat the narrowing cache: measure a cold query
+            t0 = time.perf_counter()
+            hits = library.search(term)
+            samples.append(time.perf_counter() - t0)
+        results[label] = {"ms": _summary(samples, 1e3)["p50"], "hits": len(hits)}
+
+    # Typing a title one character at a time, as the debounced dashboard does
+    first = next(iter(library.books), None)
+    title = first.title.lower() if first else ""
+    library.search("\x00")
+    t0 = time.perf_counter()
+    for i in range(1, len(title) + 1):
+        library.search(title[:i])
+    results["typing"] = {"ms": round((time.perf_counter() - t0) * 1e3, 1), "keystrokes": len(title)}
+    return results
+
+
+def bench_query(library, repeat):
+    """Structured query latency in milliseconds (median of `repeat`) and hit counts."""
+    results = {}
+    for label, text in QUERIES.items():
+        samples = []
+        for _ in range(repeat):
+            library.search("\x00")
+            t0 = time.perf_counter()
+            hits = library.query(text)
+            samples.append(time.perf_counter() - t0)
+        results[label] = {"ms": _summary(samples, 1e3)["p50"], "hits": len(hits)}
+    return results
+
+
+def run_size(n, workdir, repeat=3, ops=200, memory=True, log=None):
+    """Generates `n` books and runs every benchmark against them."""
+    t0 = time.perf_counter()
+    book_rows, record_rows = generate(n)
+    db_file, borrow_file = write(workdir, book_rows, record_rows)
+    result = {
+        "books": len(book_rows),
+        "records": len(record_rows),
+        "generate_s": round(time.perf_counter() - t0, 2),
+    }
+    del book_rows, record_rows
+
+    def step(name, fn):
+        if log:
+            log(f"  {n}: {name}")
+        result[name] = fn()
+
+    big = n >= 1_000_000
+    step("load_s", lambda: bench_load(db_file, borrow_file, 1 if big else repeat))
+    if memory:
+        step("memory_mb", lambda: bench_memory(db_file, borrow_file))
+
+    library = LibrarySystem(storage=_NoCommitStorage(db_file, borrow_file))
+    step("ops_us", lambda: bench_ops(library, ops))
+    step("search_ms", lambda: bench_search(library, repeat))
+    step("query_ms", lambda: bench_query(library, repeat))
+    step("save_s", lambda: bench_save(library, 1 if big else repeat))
+    del library
+
+    journal = os.path.join(workdir, "bench.journal")
+    library = LibrarySystem(storage=JsonStorage(db_file, borrow_file, journal, compact_every=10**9))
+    step("ops_journal_us", lambda: bench_ops(library, max(1, ops // 4)))
+    library.storage.journal.close()
+    return result
+
+
+def _commit_id():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report_meta():
+    """Where and when a report was produced (compared reports should match)."""
+    return {
+        "commit": _commit_id(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def run(sizes, repeat=3, ops=200, memory=True, log=None):
+    report = {"meta": report_meta(), "results": {}}
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            report["results"][str(n)] = run_size(n, workdir, repeat, ops, memory, log)
+    return report
+
+
+def _progress(msg):
+    print(msg, file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark LibrarySystem on synthetic data.")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma-separated catalog sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per timing (the best is kept)")
+    parser.add_argument("--ops", type=int, default=200, help="Operations of each kind per size")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slow) tracemalloc pass")
+    parser.add_argument("--out", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    report = run(sizes, args.repeat, args.ops, not args.no_memory, _progress)
+    text = json.dumps(report, indent=4)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Synthetic library data in the real `library_data.json` / `borrow.json` schema.
+
+Loans are generated in chronological order over the requested number of
+years, so the history is consistent: a book has at most one open loan,
+earlier loans of a book are closed (with the policy's fine) before it is
+lent again, and only recent loans are still active.
+
+Usage:
+    python -m benchmarks.generate --books 100000 --borrowers 5000 --years 5 --out data/
+"""
+import argparse
+import json
+import os
+import random
+from datetime import date, timedelta
+from overdue import LoanPolicy
+from storage import write_rows
+
+FIRST_NAMES = ["Ahmed", "Mona", "Omar", "Sara", "Youssef", "Nour", "Karim", "Laila", "Hassan", "Mariam"]
+LAST_NAMES = ["Ayman", "Hassan", "Mostafa", "Ali", "Ibrahim", "Saleh", "Fawzy", "Nabil", "Adel", "Samir"]
+WORDS = ["Data", "Python", "Deep", "Learning", "Systems", "Design", "Modern", "Theory", "Art",
+         "Science", "History", "Networks", "Vision", "Language", "Signals", "Algorithms"]
+
+
+def generate(books, borrowers=None, years=3, loans_per_book=1.0, today=None, seed=42):
+    """
+    Builds a catalog and a borrow history.
+
+    Args:
+        books (int): Catalog size.
+        borrowers (int, optional): Distinct borrowers (default: one per 20 books).
+        years (int): Length of the history, ending `today`.
+        loans_per_book (float): History size relative to the catalog.
+        today (date, optional): Last day of the history.
+        seed (int): Random seed; the same arguments always give the same data.
+
+    Returns:
+        tuple: (book_rows, record_rows) lists of dicts, records oldest first.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    policy = LoanPolicy()
+    borrowers = borrowers or max(1, books // 20)
+
+    people = [
+        (str(101 + i), f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"010{rng.randrange(10**8):08d}")
+        for i in range(borrowers)
+    ]
+    authors = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(max(1, books // 25))]
+    catalog = [
+        {
+            "title": " ".join(rng.sample(WORDS, 3)) + f" {i}",
+            "author": rng.choice(authors),
+            "isbn": str(9780000000000 + i),
+            "is_available": True,
+            "borrow_man": None,
+            "borrow_date": None,
+        }
+        for i in range(books)
+    ]
+
+    first_day = today.toordinal() - 365 * years
+    days = sorted(rng.randrange(first_day, today.toordinal() + 1) for _ in range(int(books * loans_per_book)))
+    records = []
+    open_loans = {}  # catalog index -> (record, borrow day)
+    for day in days:
+        i = rng.randrange(books) if books else 0
+        if i in open_loans:
+            _close(open_loans.pop(i), day, policy)
+        uid, name, phone = rng.choice(people)
+        borrowed = date.fromordinal(day)
+        rec = {
+            "isbn": catalog[i]["isbn"],
+            "user_id": uid,
+            "name": name,
+            "phone": phone,
+            "borrow_date": borrowed.isoformat(),
+            "returned": False,
+            "fine": 0,
+        }
+        records.append(rec)
+        open_loans[i] = (rec, day)
+
+    # Old loans come back; the last few weeks (and a few stragglers) stay out
+    for i, (rec, day) in open_loans.items():
+        if today.toordinal() - day > 21 and rng.random() < 0.9:
+            _close((rec, day), day + rng.randrange(1, 15), policy)
+        else:
+            catalog[i].update(is_available=False, borrow_man=rec["name"], borrow_date=rec["borrow_date"])
+    return catalog, records
+
+
+def _close(loan, return_day, policy):
+    rec, day = loan
+    rec["returned"] = True
+    rec["fine"] = policy.fine(date.fromordinal(day), date.fromordinal(return_day))
+    rec["return_date"] = date.fromordinal(return_day).isoformat()
+
+
+def write(directory, book_rows, record_rows, ndjson=False):
+    """Writes the rows as data files in `directory`; returns (db_file, borrow_file)."""
+    ext = ".ndjson" if ndjson else ".json"
+    db_file = os.path.join(directory, "library_data" + ext)
+    borrow_file = os.path.join(directory, "borrow" + ext)
+    for path, rows in ((db_file, book_rows), (borrow_file, record_rows)):
+        with open(path, "w", encoding="utf-8") as f:
+            write_rows(path, rows, f)
+    return db_file, borrow_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic library data files.")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--borrowers", type=int, help="Distinct borrowers (default: books / 20)")
+    parser.add_argument("--years", type=int, default=3, help="Years of borrow history")
+    parser.add_argument("--loans-per-book", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ndjson", action="store_true", help="Write .ndjson files")
+    parser.add_argument("--out", default=".", help="Target directory")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    books, records = generate(args.books, args.borrowers, args.years, args.loans_per_book, seed=args.seed)
+    paths = write(args.out, books, records, args.ndjson)
+    print(json.dumps({"books": len(books), "records": len(records), "files": paths}, indent=4))
+
+
+if __name__ == "__main__":
+    main()
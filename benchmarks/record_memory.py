@@ -0,0 +1,135 @@
+"""
+Memory and construction-time benchmark for Book / BorrowRecord.
+
+Loads N borrow records (and N books) from JSON text the way `LibrarySystem`
+does, once with the current slotted classes and once with the original
+`__dict__`-based classes, and reports the bytes still allocated once the
+decoded rows are dropped (objects plus the strings they keep alive) and the
+load time, both scaled to one million records.
+
+Usage:
+    python -m benchmarks.record_memory [--records 1000000]
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from book import Book
+from borrow_record import BorrowRecord
+
+
+class LegacyBook:
+    """The original Book: per-instance __dict__ and strptime per date."""
+
+    def __init__(self, title, author, isbn, borrow_man=None, is_available=True, borrow_date=None):
+        self.title = title
+        self.author = author
+        self.isbn = isbn
+        self.is_available = is_available
+        self.borrow_man = borrow_man
+        if isinstance(borrow_date, str):
+            try:
+                self.borrow_date = datetime.strptime(borrow_date, "%Y-%m-%d").date()
+            except ValueError:
+                self.borrow_date = None
+        else:
+            self.borrow_date = borrow_date
+
+
+class LegacyBorrowRecord:
+    """The original BorrowRecord: per-instance __dict__ and a date object each."""
+
+    def __init__(self, isbn, user_id, name, phone, borrow_date, returned=False, fine=0):
+        self.isbn = isbn
+        self.user_id = user_id
+        self.name = name
+        self.phone = phone
+        self.borrow_date = borrow_date
+        self.returned = returned
+        self.fine = fine
+
+
+def make_rows(n, seed=42):
+    """Synthetic books and borrow records as JSON text."""
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    borrowers = [(str(100 + i), f"Borrower {i}", f"010{i:08d}") for i in range(max(1, n // 50))]
+    authors = [f"Author {i}" for i in range(max(1, n // 20))]
+    books, records = [], []
+    for i in range(n):
+        day = (start + timedelta(days=rng.randrange(3650))).isoformat()
+        uid, name, phone = rng.choice(borrowers)
+        books.append({
+            "title": f"Title {i}", "author": rng.choice(authors), "isbn": str(10_000_000 + i),
+            "is_available": False, "borrow_man": name, "borrow_date": day,
+        })
+        records.append({
+            "isbn": str(10_000_000 + i), "user_id": uid, "name": name, "phone": phone,
+            "borrow_date": day, "returned": True, "fine": 0,
+        })
+    return json.dumps(books), json.dumps(records)
+
+
+def measure(build, text):
+    """Returns (traced bytes retained, seconds) for loading objects from JSON text."""
+    gc.collect()
+    t0 = time.perf_counter()
+    objs = build(json.loads(text))
+    elapsed = time.perf_counter() - t0  # Timed without tracemalloc overhead
+    del objs
+
+    gc.collect()
+    tracemalloc.start()
+    objs = build(json.loads(text))
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return size, elapsed
+
+
+def build_books(cls):
+    return lambda rows: [
+        cls(r["title"], r["author"], r["isbn"], r["borrow_man"], r["is_available"], r["borrow_date"])
+        for r in rows
+    ]
+
+
+def build_records(cls, parse_date):
+    return lambda rows: [
+        cls(r["isbn"], r["user_id"], r["name"], r["phone"], parse_date(r["borrow_date"]),
+            r["returned"], r["fine"])
+        for r in rows
+    ]
+
+
+def run(n):
+    book_rows, record_rows = make_rows(n)
+    scale = 1_000_000 / n
+    results = {}
+    for label, build, rows in [
+        ("legacy_books", build_books(LegacyBook), book_rows),
+        ("books", build_books(Book), book_rows),
+        ("legacy_records", build_records(LegacyBorrowRecord, date.fromisoformat), record_rows),
+        ("records", build_records(BorrowRecord, str), record_rows),
+    ]:
+        size, elapsed = measure(build, rows)
+        results[label] = {
+            "mb_per_million": round(size * scale / 2**20, 1),
+            "seconds_per_million": round(elapsed * scale, 2),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=1_000_000, help="Objects to build per class")
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.records), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Time to first frame of the desktop app, measured end to end.
+
+Each run starts `python main.py --startup-time` in a fresh process, which
+paints the window, loads the catalog, shows the dashboard and exits,
+printing its own timings. The first run starts with an empty asset cache
+(`cold`), the others reuse it (`warm`, median). Needs the GUI
+dependencies and a display; on a headless Linux machine (no DISPLAY) each
+run goes through `xvfb-run` when it is installed. The report is compatible
+with benchmarks.compare.
+
+    first_frame_ms  process start -> window painted (loading state)
+    ready_ms        process start -> dashboard shown
+    process_ms      wall time of the whole process, interpreter included
+
+Usage:
+    python -m benchmarks.startup                    # the data in the repository root
+    python -m benchmarks.startup --books 100000 --repeat 5 --out startup.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.engine import report_meta
+from benchmarks.generate import generate, write
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def launch(workdir):
+    """Runs one measured startup in `workdir`; returns its timings in ms."""
+    cmd = [sys.executable, os.path.join(ROOT, "main.py"), "--startup-time"]
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY") and shutil.which("xvfb-run"):
+        cmd = ["xvfb-run", "-a"] + cmd  # A virtual X server for CI machines
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, cwd=workdir, capture_output=True, text=True, check=True)
+    timings = json.loads(out.stdout.strip().splitlines()[-1])
+    timings["process_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return timings
+
+
+def measure(workdir, repeat=5):
+    shutil.rmtree(os.path.join(workdir, ".cache"), ignore_errors=True)
+    cold = launch(workdir)
+    warm = [launch(workdir) for _ in range(max(1, repeat - 1))]
+    median = {k: sorted(run[k] for run in warm)[len(warm) // 2] for k in warm[0]}
+    return {"cold": cold, "warm": median}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the desktop app's startup time.")
+    parser.add_argument("--books", type=int, help="Start on generated data of this size instead of the repository's")
+    parser.add_argument("--repeat", type=int, default=5, help="Launches per measurement (the first is cold)")
+    parser.add_argument("--out", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {"meta": report_meta(), "results": {}}
+    if args.books is None:
+        report["results"]["startup"] = measure(ROOT, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            write(workdir, *generate(args.books))
+            shutil.copy(os.path.join(ROOT, "logoo.jpg"), workdir)
+            report["results"][f"startup_{args.books}"] = measure(workdir, args.repeat)
+
+    text = json.dumps(report, indent=4)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
-from datetime import datetime
+from sys import intern
+from dates import from_day, format_day, parse_day, to_day
 
 class Book:
     """
@@ -11,22 +12,29 @@ class Book:
         borrow_man (str, optional): Name of the borrower if not available.
         is_available (bool): Status indicating if the book can be borrowed.
         borrow_date (date, optional): The date the book was issued.
+        borrow_day (int, optional): `borrow_date` as a day ordinal (how it is stored).
     """
+    # No per-instance __dict__; author/borrower strings are interned because
+    # a few names repeat across a large catalog.
+    __slots__ = ("title", "author", "isbn", "borrow_man", "is_available", "borrow_day")
+
     def __init__(self, title, author, isbn, borrow_man=None, is_available=True, borrow_date=None):
         self.title = title
-        self.author = author
+        self.author = intern(author) if type(author) is str else author
         self.isbn = isbn
         self.is_available = is_available
-        self.borrow_man = borrow_man
+        self.borrow_man = intern(borrow_man) if type(borrow_man) is str else borrow_man
+
+        # Accepts a date, an ISO string (JSON format) or None
+        self.borrow_day = parse_day(borrow_date) if type(borrow_date) is str else to_day(borrow_date)
+
+    @property
+    def borrow_date(self):
+        return from_day(self.borrow_day)
 
-        # Convert date from string (JSON format) to Python date object if necessary
-        if isinstance(borrow_date, str):
-            try:
-                self.borrow_date = datetime.strptime(borrow_date, "%Y-%m-%d").date()
-            except ValueError:
-                self.borrow_date = None
-        else:
-            self.borrow_date = borrow_date
+    @borrow_date.setter
+    def borrow_date(self, value):
+        self.borrow_day = to_day(value)
 
     def to_dict(self):
         """
@@ -41,5 +49,5 @@ class Book:
             "isbn": self.isbn,
             "is_available": self.is_available,
             "borrow_man": self.borrow_man,
-            "borrow_date": self.borrow_date.strftime("%Y-%m-%d") if self.borrow_date else None,
+            "borrow_date": format_day(self.borrow_day),
         }
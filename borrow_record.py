@@ -1,4 +1,5 @@
-from datetime import date
+from sys import intern
+from dates import from_day, format_day, parse_day, to_day
 
 class BorrowRecord:
     """
@@ -10,17 +11,43 @@ class BorrowRecord:
         name (str): Full name of the borrower.
         phone (str): Contact phone number of the borrower.
         borrow_date (date): The date the transaction occurred.
+        borrow_day (int): `borrow_date` as a day ordinal (how it is stored).
         returned (bool): Status indicating if the book has been returned.
         fine (float): The total overdue fine calculated at return.
+        return_date (date): When it was returned (None while active, and for
+            records saved before return dates were kept).
     """
-    def __init__(self, isbn, user_id, name, phone, borrow_date, returned=False, fine=0):
+    # Histories hold millions of these: no per-instance __dict__, and the
+    # borrower fields are interned since the same people borrow repeatedly.
+    __slots__ = ("isbn", "user_id", "name", "phone", "borrow_day", "returned", "fine", "return_day")
+
+    def __init__(self, isbn, user_id, name, phone, borrow_date, returned=False, fine=0,
+                 return_date=None):
         self.isbn = isbn
-        self.user_id = user_id
-        self.name = name
-        self.phone = phone
-        self.borrow_date = borrow_date
+        self.user_id = intern(user_id) if type(user_id) is str else user_id
+        self.name = intern(name) if type(name) is str else name
+        self.phone = intern(phone) if type(phone) is str else phone
+        # Hot path for loading: ISO strings go straight to the memoized parser
+        self.borrow_day = parse_day(borrow_date) if type(borrow_date) is str else to_day(borrow_date)
         self.returned = returned
         self.fine = fine
+        self.return_day = parse_day(return_date) if type(return_date) is str else to_day(return_date)
+
+    @property
+    def borrow_date(self):
+        return from_day(self.borrow_day)
+
+    @borrow_date.setter
+    def borrow_date(self, value):
+        self.borrow_day = to_day(value)
+
+    @property
+    def return_date(self):
+        return from_day(self.return_day)
+
+    @return_date.setter
+    def return_date(self, value):
+        self.return_day = to_day(value)
 
     def to_dict(self):
         """
@@ -34,7 +61,8 @@ class BorrowRecord:
             "user_id": self.user_id,
             "name": self.name,
             "phone": self.phone,
-            "borrow_date": self.borrow_date.strftime("%Y-%m-%d"),
+            "borrow_date": format_day(self.borrow_day),
             "returned": self.returned,
             "fine": self.fine,
+            "return_date": format_day(self.return_day),
         }
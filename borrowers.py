@@ -0,0 +1,144 @@
+from bisect import bisect_left, insort
+from sys import intern
+
+
+class Borrower:
+    """
+    A borrower profile, derived from the borrow history.
+
+    Attributes:
+        user_id (str): Unique identifier of the borrower.
+        name (str): Name given on the most recent loan.
+        phone (str): Phone given on the most recent loan.
+        loans (int): Number of loans on record.
+        last_day (int): Day ordinal of the most recent loan.
+    """
+
+    __slots__ = ("user_id", "name", "phone", "loans", "last_day")
+
+    def __init__(self, user_id, name, phone, loans=0, last_day=None):
+        self.user_id = user_id
+        self.name = name
+        self.phone = phone
+        self.loans = loans
+        self.last_day = last_day
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "name": self.name,
+            "phone": self.phone,
+            "loans": self.loans,
+        }
+
+
+class BorrowerRegistry:
+    """
+    Borrowers indexed by ID and by phone.
+
+    Profiles are kept up to date from BorrowRecords (the latest loan's name
+    and phone win). IDs and phones are also held in sorted lists, so prefix
+    completion is a bisection rather than a scan, and the next free numeric
+    ID is a maintained counter instead of a pass over the history.
+    """
+
+    def __init__(self, first_id=101):
+        self.first_id = first_id
+        self._by_id = {}
+        self._ids = []  # Sorted user IDs
+        self._phones = []  # Sorted (phone, user_id) pairs
+        self._max_id = None
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def rebuild(self, records, seed=()):
+        """
+        Builds every profile from a history, oldest record first.
+
+        Args:
+            records (list): BorrowRecords, oldest first.
+            seed (iterable): Borrower profiles of older, archived records
+                (copied, then updated by `records`).
+        """
+        self._by_id = {}
+        self._max_id = None
+        for b in seed:
+            self._by_id[b.user_id] = Borrower(b.user_id, b.name, intern(str(b.phone)), b.loans, b.last_day)
+            if b.user_id.isdigit() and (self._max_id is None or int(b.user_id) > self._max_id):
+                self._max_id = int(b.user_id)
+        for rec in records:
+            self._update(rec)
+        self._ids = sorted(self._by_id)
+        self._phones = sorted((b.phone, b.user_id) for b in self._by_id.values())
+
+    def record(self, rec):
+        """Updates the registry with a new loan."""
+        uid = str(rec.user_id)
+        borrower = self._by_id.get(uid)
+        old_phone = borrower.phone if borrower else None
+        borrower = self._update(rec)
+        if old_phone is None:
+            insort(self._ids, uid)
+        elif old_phone != borrower.phone:
+            del self._phones[bisect_left(self._phones, (old_phone, uid))]
+        if old_phone != borrower.phone:
+            insort(self._phones, (borrower.phone, uid))
+
+    def _update(self, rec):
+        uid = str(rec.user_id)
+        borrower = self._by_id.get(uid)
+        if borrower is None:
+            borrower = self._by_id[uid] = Borrower(uid, rec.name, rec.phone)
+            if uid.isdigit() and (self._max_id is None or int(uid) > self._max_id):
+                self._max_id = int(uid)
+        borrower.loans += 1
+        if borrower.last_day is None or rec.borrow_day >= borrower.last_day:
+            borrower.name = rec.name
+            borrower.phone = intern(str(rec.phone))
+            borrower.last_day = rec.borrow_day
+        return borrower
+
+    def get(self, user_id):
+        """Returns the Borrower with this ID, or None (O(1))."""
+        return self._by_id.get(str(user_id))
+
+    def by_phone(self, phone):
+        """Every Borrower registered with exactly this phone number."""
+        phone = str(phone)
+        i = bisect_left(self._phones, (phone, ""))
+        found = []
+        while i < len(self._phones) and self._phones[i][0] == phone:
+            found.append(self._by_id[self._phones[i][1]])
+            i += 1
+        return found
+
+    def complete(self, prefix, limit=5):
+        """
+        Borrowers whose ID or phone starts with `prefix` (ID matches first).
+
+        Args:
+            prefix (str): What has been typed so far.
+            limit (int): Maximum number of suggestions.
+        """
+        prefix = str(prefix).strip()
+        if not prefix:
+            return []
+        found, seen = [], set()
+        i = bisect_left(self._ids, prefix)
+        while i < len(self._ids) and len(found) < limit and self._ids[i].startswith(prefix):
+            seen.add(self._ids[i])
+            found.append(self._by_id[self._ids[i]])
+            i += 1
+        i = bisect_left(self._phones, (prefix, ""))
+        while i < len(self._phones) and len(found) < limit and self._phones[i][0].startswith(prefix):
+            uid = self._phones[i][1]
+            if uid not in seen:
+                seen.add(uid)
+                found.append(self._by_id[uid])
+            i += 1
+        return found
+
+    def next_id(self):
+        """One past the highest numeric ID on record (O(1))."""
+        return self.first_id if self._max_id is None else self._max_id + 1
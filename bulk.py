@@ -0,0 +1,34 @@
+"""
+Streaming readers for bulk input files (CSV or NDJSON).
+
+Rows are produced one at a time so arbitrarily large imports run in
+constant memory; `batched` groups them for LibrarySystem's bulk APIs.
+"""
+import csv
+from itertools import islice
+from storage import iter_ndjson
+
+
+def iter_input(path, errors):
+    """
+    Yields one dict per input row.
+
+    `.ndjson` files hold one JSON object per line; anything else is read as
+    CSV with a header row (e.g. "title,author,isbn"). Unparsable NDJSON lines
+    are reported in `errors` and skipped.
+    """
+    if path.endswith(".ndjson"):
+        yield from iter_ndjson(path, errors)
+        return
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def batched(rows, size):
+    """Groups an iterable into lists of at most `size` items."""
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,200 @@
+import http.client
+import json
+from urllib.parse import quote, urlencode, urlsplit
+from book import Book
+from borrowers import Borrower
+from borrow_record import BorrowRecord
+from events import ADDED, BORROWED, DELETED, RETURNED, EventBus
+from overdue import LoanPolicy
+from storage import StorageBackend
+
+
+class RemoteLibrary:
+    """
+    LibrarySystem stand-in that talks to a library server (see server.py).
+
+    Implements the part of the LibrarySystem API the GUI uses, so
+    `LibraryApp(RemoteLibrary(url))` runs as a thin client. One keep-alive
+    connection is reused for every request and re-opened if the server
+    dropped it. Actions return the same (ok, msg) tuples as the engine;
+    an unreachable server is reported as a failed action. Successful
+    actions of this client are published on `events` like the engine does
+    (changes made by other desks are not).
+
+    Args:
+        url (str): Server base URL, e.g. "http://127.0.0.1:8765".
+        timeout (float): Socket timeout in seconds.
+    """
+
+    def __init__(self, url, timeout=10):
+        parts = urlsplit(url if "://" in url else "http://" + url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 8765
+        self.timeout = timeout
+        self._conn = None
+
+        status = self._request("GET", "/status")
+        self.policy = LoanPolicy(**status["policy"])
+        self.load_errors = status["load_errors"]
+        self.storage = StorageBackend()  # The server persists; nothing to report locally
+        self.events = EventBus()
+
+    # ---------- Queries ----------
+    def get_book(self, isbn):
+        try:
+            return _book(self._request("GET", "/books/" + quote(isbn, safe="")))
+        except LookupError:
+            return None
+
+    def search(self, term):
+        data = self._request("GET", "/books?" + urlencode({"q": term}))
+        return [_book(row) for row in data["books"]]
+
+    def query(self, text, sort=None, limit=None):
+        params = {"q": text}
+        if sort:
+            params["sort"] = sort
+        if limit:
+            params["limit"] = limit
+        data = self._request("GET", "/books?" + urlencode(params), accept=(400,))
+        if "error" in data:
+            raise ValueError(data["error"])
+        return [_book(row) for row in data["books"]]
+
+    def stats(self):
+        return self._request("GET", "/stats")
+
+    def metrics(self):
+        return self._request("GET", "/metrics")
+
+    def next_user_id(self):
+        return self._request("GET", "/users/next_id")["next_id"]
+
+    def get_borrower(self, user_id):
+        try:
+            return _borrower(self._request("GET", "/users/" + quote(str(user_id), safe="")))
+        except LookupError:
+            return None
+
+    def find_borrowers(self, prefix, limit=5):
+        data = self._request("GET", "/users?" + urlencode({"prefix": prefix, "limit": limit}))
+        return [_borrower(row) for row in data["users"]]
+
+    def top_books(self, k=10):
+        return self._request("GET", "/analytics/books?" + urlencode({"k": k}))["books"]
+
+    def top_borrowers(self, k=10, by="loans"):
+        data = self._request("GET", "/analytics/borrowers?" + urlencode({"k": k, "by": by}), accept=(400,))
+        if "error" in data:
+            raise ValueError(data["error"])
+        return data["borrowers"]
+
+    def monthly_totals(self, date_from=None, date_to=None):
+        params = {}
+        if date_from:
+            params["from"] = date_from.isoformat()
+        if date_to:
+            params["to"] = date_to.isoformat()
+        return self._request("GET", "/analytics/months?" + urlencode(params))["months"]
+
+    def borrow_log(self, page=0, page_size=50, status=None, date_from=None,
+                   date_to=None, user_id=None):
+        params = {"page": page, "page_size": page_size}
+        if status:
+            params["status"] = status
+        if date_from:
+            params["from"] = date_from.isoformat()
+        if date_to:
+            params["to"] = date_to.isoformat()
+        if user_id:
+            params["user_id"] = user_id
+        data = self._request("GET", "/log?" + urlencode(params))
+        rows = [(_record(row["record"]), row["title"]) for row in data["rows"]]
+        return rows, data["total"]
+
+    # ---------- Actions ----------
+    def add_book(self, title, author, isbn):
+        return self._action(
+            "POST", "/books", {"title": title, "author": author, "isbn": isbn}, (ADDED, isbn)
+        )
+
+    def delete_book(self, isbn):
+        return self._action("DELETE", "/books/" + quote(isbn, safe=""), change=(DELETED, isbn))
+
+    def borrow_book(self, isbn, user_id, name, phone):
+        return self._action(
+            "POST",
+            "/books/" + quote(isbn, safe="") + "/borrow",
+            {"user_id": user_id, "name": name, "phone": phone},
+            (BORROWED, isbn),
+        )
+
+    def return_book(self, isbn):
+        return self._action(
+            "POST", "/books/" + quote(isbn, safe="") + "/return", {}, (RETURNED, isbn)
+        )
+
+    def sync(self):
+        """Every query reads the server's current state; nothing to catch up."""
+        return False
+
+    def flush(self):
+        """Server actions are durable when they return."""
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ---------- HTTP ----------
+    def _action(self, method, path, body=None, change=None):
+        try:
+            data = self._request(method, path, body, accept=(409,))
+        except (OSError, http.client.HTTPException) as e:
+            return False, f"❌ Server unreachable: {e}"
+        except LookupError:
+            return False, "❌ Book not found."
+        if data["ok"] and change is not None:
+            self.events.emit(*change)
+        return data["ok"], data["message"]
+
+    def _request(self, method, path, body=None, accept=()):
+        """Sends one request (retrying once on a dropped keep-alive connection)."""
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request(method, path, body=payload, headers=headers)
+                response = self._conn.getresponse()
+                raw = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt == 2:
+                    raise
+        data = json.loads(raw)
+        if response.status == 404:
+            raise LookupError(data.get("error", path))
+        if response.status != 200 and response.status not in accept:
+            raise http.client.HTTPException(f"{response.status}: {data.get('error', '')}")
+        return data
+
+
+def _book(row):
+    return Book(
+        row["title"], row["author"], row["isbn"],
+        row.get("borrow_man"), row["is_available"], row.get("borrow_date"),
+    )
+
+
+def _record(row):
+    return BorrowRecord(
+        row["isbn"], row["user_id"], row["name"], row["phone"],
+        row["borrow_date"], row["returned"], row.get("fine", 0), row.get("return_date"),
+    )
+
+
+def _borrower(row):
+    return Borrower(row["user_id"], row["name"], row["phone"], row.get("loans", 0))
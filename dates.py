@@ -0,0 +1,42 @@
+"""
+Day-ordinal helpers shared by the record classes.
+
+Dates are stored as `date.toordinal()` integers: they take no per-instance
+object, compare and subtract as plain ints, and convert back to `date`
+only when displayed or serialized.
+"""
+from datetime import date
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def parse_day(text):
+    """
+    Parses a "YYYY-MM-DD" string into a day ordinal, or None if invalid.
+
+    Borrow histories reuse a small set of dates, so results are memoized and
+    a million records only parse a few thousand distinct strings.
+    """
+    try:
+        return date.fromisoformat(text).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def to_day(value):
+    """Converts a date, ISO string or None into a day ordinal (or None)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return parse_day(value)
+    return value.toordinal()
+
+
+def from_day(day):
+    """Converts a day ordinal (or None) back into a date."""
+    return date.fromordinal(day) if day is not None else None
+
+
+def format_day(day):
+    """Formats a day ordinal as "YYYY-MM-DD" (None stays None)."""
+    return date.fromordinal(day).isoformat() if day is not None else None
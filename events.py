@@ -0,0 +1,70 @@
+"""
+Change notifications: LibrarySystem publishes one Change per applied
+operation, so views can patch what changed instead of re-reading everything.
+
+    ADDED     a book was added           (isbn)
+    DELETED   a book was deleted         (isbn)
+    BORROWED  a book was lent            (isbn)
+    RETURNED  a book came back           (isbn)
+    RELOADED  the whole state was reloaded, e.g. after another process
+              rewrote the data files     (no isbn: refresh everything)
+"""
+
+ADDED = "added"
+DELETED = "deleted"
+BORROWED = "borrowed"
+RETURNED = "returned"
+RELOADED = "reloaded"
+
+# Operation dict "op" -> change kind
+OP_KINDS = {"add": ADDED, "delete": DELETED, "borrow": BORROWED, "return": RETURNED}
+
+
+class Change:
+    """
+    One change to the library state.
+
+    Attributes:
+        kind (str): ADDED, DELETED, BORROWED, RETURNED or RELOADED.
+        isbn (str): The affected book (None for RELOADED).
+    """
+
+    __slots__ = ("kind", "isbn")
+
+    def __init__(self, kind, isbn=None):
+        self.kind = kind
+        self.isbn = isbn
+
+    def __repr__(self):
+        return f"Change({self.kind!r}, {self.isbn!r})"
+
+
+class EventBus:
+    """
+    Synchronous publish/subscribe for Change events.
+
+    Subscribers run on the thread that made the change, inside the engine
+    lock, so they should only record the change (the GUI puts it on a
+    queue that its Tk thread drains). Nothing is allocated while nobody is
+    subscribed, which keeps loading and replaying journals free.
+    """
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Calls `callback(change)` for every change from now on; returns it."""
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def emit(self, kind, isbn=None):
+        """Publishes a Change to every subscriber."""
+        if not self._subscribers:
+            return
+        change = Change(kind, isbn)
+        for callback in tuple(self._subscribers):
+            callback(change)
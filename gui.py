@@ -1,31 +1,85 @@
+import queue
+import threading
+import time
 import customtkinter as ctk
+import tkinter as tk
 from tkinter import messagebox
-from datetime import date, timedelta
+from datetime import date, datetime
+from archive import HistoryArchive
+from assets import load_image, sized_image
+from events import ADDED, DELETED, RELOADED
+from metrics import recorder
+from query import parse_query
+from storage import JsonStorage
 from system import LibrarySystem
-from PIL import Image, ImageTk
+from writer import BackgroundStorage
+from widgets import TableRow, VirtualTable
 
 # Standard Theme Configuration
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("dark-blue")
 
 
+def open_default_library(binary=False):
+    """
+    The JSON files and journal (plus binary snapshots), persisted by a
+    background writer thread; old returned loans go to "borrow_archive".
+    """
+    storage = BackgroundStorage(JsonStorage(journal_file="library.journal", shared=True, binary=binary))
+    return LibrarySystem(storage=storage, lazy_history=True, archive=HistoryArchive())
+
+
 class LibraryApp(ctk.CTk):
     """
     Main Application Class for the Smart Library Management System.
     Handles the GUI layout, navigation between views, and user interactions.
+
+    The window is painted before any data-dependent view is built: without a
+    `library`, `open_library` runs on a loader thread while a loading state
+    is shown. `startup` holds the seconds from `started` (default: now) to
+    "first_frame" and to "ready" (dashboard shown), and <<LibraryReady>> is
+    generated once the dashboard is up. The loader thread then reads the
+    deferred borrow history, so the first borrow popup or log page does not
+    parse it on the Tk thread.
+
+    Views are built on first use and then kept: navigation only swaps which
+    one is packed. The app subscribes to the library's change events and
+    patches just the affected table row and stat labels (see apply_changes).
     """
 
-    def __init__(self):
+    def __init__(self, library=None, open_library=open_default_library, started=None):
+        self._started = started if started is not None else time.perf_counter()
+        self.startup = {}
         super().__init__()
 
         self.title("Smart Library System📚")
         self.geometry("1150x700")
-        self.library = LibrarySystem()
+        self.library = library
+        self._loading = None
+        self._ready = threading.Event()  # Set with <<LibraryReady>>
+        self._poll_job = None
+        self.views = {}  # View name -> its frame, built on first show
+        self.current_view = None
+        self._changes = queue.Queue()  # Change events not yet applied, from any thread
+        self._changes_job = None
+        self._positions = None  # ISBN -> index in the dashboard table, built on demand
+        self._log_stale = False
+        self._stat_values = {}
+        if library is None:
+            # Read the data files while Tk builds and paints the window
+            self._loading = {}
+            threading.Thread(
+                target=self._load_library, args=(open_library,), name="library-loader", daemon=True
+            ).start()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.bind("<F12>", self.toggle_profile)
+        self.bind("<Map>", self._on_map, add="+")
 
         # --- Application Icon (Logo) Setup ---
+        # A cached 64px PNG, read by Tk itself: no JPEG decode, no PIL
         try:
-            icon_img = Image.open("logoo.jpg")
-            self.iconphoto(False, ImageTk.PhotoImage(icon_img))
+            self._icon = tk.PhotoImage(master=self, file=sized_image("logoo.jpg", (64, 64)))
+            self.iconphoto(False, self._icon)
         except Exception:
             pass
 
@@ -36,13 +90,10 @@ class LibraryApp(ctk.CTk):
         self.sidebar = ctk.CTkFrame(self, width=200, corner_radius=0)
         self.sidebar.grid(row=0, column=0, sticky="nsew")
 
-        # Sidebar Logo Display
+        # Sidebar Logo Display (decoded once, at 2x for HiDPI scaling)
         try:
-            my_image = ctk.CTkImage(
-                light_image=Image.open("logoo.jpg"),
-                dark_image=Image.open("logoo.jpg"),
-                size=(100, 100),
-            )
+            logo = load_image("logoo.jpg", (200, 200))
+            my_image = ctk.CTkImage(light_image=logo, dark_image=logo, size=(100, 100))
             ctk.CTkLabel(self.sidebar, text="", image=my_image).pack(pady=(30, 10))
         except Exception:
             pass
@@ -59,11 +110,119 @@ class LibraryApp(ctk.CTk):
         self.add_nav_btn("Smart Scanner", "borrow")
         self.add_nav_btn("Borrowers Log", "borrowers")
 
+        # Persistence status (writes happen on a background thread)
+        self.save_status = ctk.CTkLabel(self.sidebar, text="💾 All changes saved", text_color="gray")
+        self.save_status.pack(side="bottom", pady=15)
+
         # ---------- Main Content Area ----------
         self.main_frame = ctk.CTkFrame(self, corner_radius=10)
         self.main_frame.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
+        self._loading_label = ctk.CTkLabel(
+            self.main_frame, text="⏳ Loading catalog...", font=("Arial", 18), text_color="gray"
+        )
+        self._loading_label.place(relx=0.5, rely=0.5, anchor="center")
+
+    # ---------- Startup ----------
+    def _load_library(self, open_library):
+        """Runs on the loader thread; touches no Tk state."""
+        try:
+            library = open_library()
+        except Exception as e:
+            self._loading["error"] = e
+            return
+        self._loading["library"] = library
+        # Only once the dashboard is up: the catalog comes first
+        self._ready.wait()
+        library.load_history()
+
+    def _mark(self, name):
+        seconds = time.perf_counter() - self._started
+        self.startup[name] = seconds
+        if recorder.enabled:
+            recorder.record_time(f"startup.{name}", seconds)
+
+    def _on_map(self, event):
+        if event.widget is self and "first_frame" not in self.startup:
+            self.after_idle(self._on_first_frame)
+
+    def _on_first_frame(self):
+        if "first_frame" in self.startup:
+            return  # Mapped again before the first idle pass
+        self._mark("first_frame")
+        self._wait_for_library()
+
+    def _wait_for_library(self):
+        """Polls the loader thread, then builds the data-dependent views."""
+        if self.library is None:
+            if not self._loading:
+                self.after(20, self._wait_for_library)
+                return
+            if "error" in self._loading:
+                messagebox.showerror("Startup Failed", f"The library could not be opened:\n{self._loading['error']}")
+                self.destroy()
+                return
+            self.library = self._loading["library"]
+        self._loading = None
 
+        self.library.events.subscribe(self._on_change)
         self.show_frame("dashboard")
+        self._poll_job = self.after(200, self.poll_persistence)
+        self._changes_job = self.after(self.CHANGE_POLL_MS, self.poll_changes)
+        self.update_idletasks()
+        self._mark("ready")
+
+        if self.library.load_errors:
+            shown = "\n".join(self.library.load_errors[:10])
+            more = len(self.library.load_errors) - 10
+            if more > 0:
+                shown += f"\n... and {more} more."
+            messagebox.showwarning("Data Problems", f"Some records could not be loaded:\n{shown}")
+        self.event_generate("<<LibraryReady>>")
+        self._ready.set()
+
+    def on_close(self):
+        """Waits for pending writes and folds the journal into the JSON files before exiting."""
+        if self.library is None:
+            self.destroy()  # Still loading: nothing was changed
+            return
+        if self._poll_job is not None:
+            self.after_cancel(self._poll_job)
+        if self._changes_job is not None:
+            self.after_cancel(self._changes_job)
+        self.library.events.unsubscribe(self._on_change)
+        self.save_status.configure(text="⏳ Saving...")
+        self.update_idletasks()
+        self.library.close()
+        self.destroy()
+
+    def toggle_profile(self, event=None):
+        """Starts or stops a cProfile capture of the GUI thread (F12)."""
+        if not recorder.profiling:
+            recorder.start_profile()
+            self.title("Smart Library System📚 [profiling - F12 to stop]")
+            return
+        path = f"profile-{datetime.now():%Y%m%d-%H%M%S}.prof"
+        recorder.stop_profile(path)
+        self.title("Smart Library System📚")
+        messagebox.showinfo("Profile Saved", f"cProfile capture written to {path}")
+
+    def poll_persistence(self):
+        """
+        Reports background write progress and failures, and picks up changes
+        made by other instances sharing the data files (runs on the Tk thread;
+        what sync applies arrives as change events).
+        """
+        self.library.sync()
+        failures = [error for _, error in self.library.storage.poll() if error is not None]
+        pending = getattr(self.library.storage, "pending", 0)
+        if failures:
+            self.save_status.configure(text="⚠️ Save failed", text_color="#E74C3C")
+            messagebox.showerror("Save Failed", f"Changes could not be written to disk:\n{failures[-1]}")
+        elif pending:
+            self.save_status.configure(text=f"⏳ Saving {pending}...", text_color="gray")
+        else:
+            self.save_status.configure(text="💾 All changes saved", text_color="gray")
+        self._poll_job = self.after(200, self.poll_persistence)
 
     # ---------- Navigation Logic ----------
     def add_nav_btn(self, text, view):
@@ -79,22 +238,37 @@ class LibraryApp(ctk.CTk):
         ).pack(pady=10, padx=20, fill="x")
 
     def show_frame(self, name):
-        """Clears the main frame and switches to the requested view."""
-        for w in self.main_frame.winfo_children():
-            w.destroy()
-        if name == "dashboard":
-            self.create_dashboard()
-        elif name == "manage":
-            self.create_manage()
-        elif name == "borrow":
-            self.create_borrow()
-        elif name == "borrowers":
-            self.create_borrowers()
+        """Switches to the requested view, building it the first time it is shown."""
+        if self.library is None:
+            return  # Still loading; the dashboard is shown once it is ready
+        if self._loading_label is not None:
+            self._loading_label.destroy()
+            self._loading_label = None
+        view = self.views.get(name)
+        if view is None:
+            view = self.views[name] = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+            if name == "dashboard":
+                self.create_dashboard(view)
+            elif name == "manage":
+                self.create_manage(view)
+            elif name == "borrow":
+                self.create_borrow(view)
+            elif name == "borrowers":
+                self.create_borrowers(view)
+            if recorder.enabled:
+                recorder.observe(f"widgets.{name}", _count_widgets(view))
+        elif name == "borrowers" and self._log_stale:
+            self.show_log_page(self.log_page)
+        if view is not self.current_view:
+            if self.current_view is not None:
+                self.current_view.pack_forget()
+            view.pack(fill="both", expand=True)
+            self.current_view = view
 
     # ---------- Dashboard View ----------
-    def create_dashboard(self):
+    def create_dashboard(self, view):
         """Constructs the dashboard view with live statistics and a searchable book list."""
-        top = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        top = ctk.CTkFrame(view, fg_color="transparent")
         top.pack(fill="x", pady=10, padx=20)
 
         ctk.CTkLabel(top, text="Library Dashboard", font=("Arial", 26, "bold")).pack(
@@ -102,32 +276,39 @@ class LibraryApp(ctk.CTk):
         )
 
         self.search_var = ctk.StringVar()
-        self.search_var.trace("w", self.update_list)
+        self.search_var.trace("w", self.schedule_search)
+        self._search_job = None
         ctk.CTkEntry(
             top,
-            placeholder_text="🔍 Search Title, Author or ISBN...",
+            placeholder_text="🔍 Search, or filter: author: status: borrower: borrowed_before:",
             textvariable=self.search_var,
-            width=300,
+            width=380,
         ).pack(side="right")
+        self.query_error = ctk.CTkLabel(top, text="", text_color="#E74C3C")
+        self.query_error.pack(side="right", padx=10)
 
-        self.stats_area = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        self.stats_area = ctk.CTkFrame(view, fg_color="transparent")
         self.stats_area.pack(fill="x", pady=10, padx=20)
+        self.build_stats_cards()
         self.refresh_stats()
 
         # Policy Notification Bar
         policy_frame = ctk.CTkFrame(
-            self.main_frame, fg_color="#4a2c04", corner_radius=5, height=35
+            view, fg_color="#4a2c04", corner_radius=5, height=35
         )
         policy_frame.pack(fill="x", padx=20, pady=(0, 10))
         ctk.CTkLabel(
             policy_frame,
-            text="⚠️ Policy: 7-Day Loan Period | 💰 Late Fine: 50 EGP per day delayed.",
+            text=(
+                f"⚠️ Policy: {self.library.policy.loan_days}-Day Loan Period | "
+                f"💰 Late Fine: {self.library.policy.fine_per_day} EGP per day delayed."
+            ),
             text_color="#ffb84d",
             font=("Arial", 12, "bold"),
         ).place(relx=0.5, rely=0.5, anchor="center")
 
         # Table Header
-        cols = ctk.CTkFrame(self.main_frame, height=35, fg_color="#2b2b2b")
+        cols = ctk.CTkFrame(view, height=35, fg_color="#2b2b2b")
         cols.pack(fill="x", pady=5, padx=20)
         headers = [
             ("ISBN", 80),
@@ -141,112 +322,58 @@ class LibraryApp(ctk.CTk):
                 cols, text=txt, width=w, anchor="w", font=("Arial", 12, "bold")
             ).pack(side="left", padx=5)
 
-        self.scroll = ctk.CTkScrollableFrame(self.main_frame)
-        self.scroll.pack(fill="both", expand=True, padx=20, pady=10)
+        self.table = VirtualTable(
+            view, lambda parent: BookRow(parent, self), row_height=40
+        )
+        self.table.pack(fill="both", expand=True, padx=20, pady=10)
         self.update_list()
 
-    def refresh_stats(self):
-        """Calculates and refreshes library totals and availability metrics."""
-        for w in self.stats_area.winfo_children():
-            w.destroy()
-        total = len(self.library.books)
-        avail = sum(1 for b in self.library.books if b.is_available)
-        borrowed = total - avail
-        for title, val, col in [
-            ("Total Books", total, "#1f538d"),
-            ("Available", avail, "#2cc985"),
-            ("Borrowed", borrowed, "#c92c2c"),
+    def build_stats_cards(self):
+        """Creates the statistic cards once; refresh_stats only updates their values."""
+        self.stat_labels = {}
+        for key, title, col in [
+            ("total", "Total Books", "#1f538d"),
+            ("available", "Available", "#2cc985"),
+            ("borrowed", "Borrowed", "#c92c2c"),
+            ("overdue", "Overdue", "#b36b00"),
         ]:
             card = ctk.CTkFrame(self.stats_area, width=180, height=80, fg_color=col)
             card.pack(side="left", padx=10, expand=True)
             ctk.CTkLabel(card, text=title, font=("Arial", 14, "bold")).place(
                 relx=0.5, rely=0.3, anchor="center"
             )
-            ctk.CTkLabel(
-                card, text=str(val), font=("Arial", 24, "bold"), text_color="white"
-            ).place(relx=0.5, rely=0.7, anchor="center")
-
-    def update_list(self, *args):
-        """Filters the book list based on user search queries."""
-        for w in self.scroll.winfo_children():
-            w.destroy()
-        term = self.search_var.get().lower()
-        for book in self.library.books:
-            if (
-                term in book.title.lower()
-                or term in book.author.lower()
-                or term in book.isbn
-            ):
-                self.draw_row(book)
-
-    def draw_row(self, book):
-        """Renders an individual book row with status indicators and action buttons."""
-        row = ctk.CTkFrame(self.scroll, fg_color="transparent")
-        row.pack(fill="x", pady=4, padx=5)
-
-        display_title = book.title[:27] + "..." if len(book.title) > 30 else book.title
-        display_author = (
-            book.author[:15] + "..." if len(book.author) > 18 else book.author
-        )
-
-        ctk.CTkLabel(row, text=book.isbn, width=80, anchor="w").pack(
-            side="left", padx=5
-        )
-        ctk.CTkLabel(
-            row, text=display_title, width=230, anchor="w", font=("Arial", 13, "bold")
-        ).pack(side="left", padx=5)
-        ctk.CTkLabel(row, text=display_author, width=130, anchor="w").pack(
-            side="left", padx=5
-        )
-
-        # Dynamic Status and Fine Calculation
-        if book.is_available:
-            status_txt, status_col = "🟢 Available", "#2cc985"
-        else:
-            due_date = (
-                book.borrow_date + timedelta(days=7)
-                if book.borrow_date
-                else date.today()
+            value = ctk.CTkLabel(
+                card, text="", font=("Arial", 24, "bold"), text_color="white"
             )
-            days_left = (due_date - date.today()).days
-            if days_left < 0:
-                fine = abs(days_left) * 50
-                status_txt = f"🔴 LATE ({abs(days_left)}d) | Pay: {fine}"
-                status_col = "#ff4d4d"
-            else:
-                status_txt = f"📅 Due: {due_date}"
-                status_col = "#ffa500"
-
-        ctk.CTkLabel(
-            row,
-            text=status_txt,
-            text_color=status_col,
-            width=210,
-            anchor="w",
-            font=("Arial", 12, "bold"),
-        ).pack(side="left", padx=5)
+            value.place(relx=0.5, rely=0.7, anchor="center")
+            self.stat_labels[key] = value
 
-        # Action Buttons (Borrow/Return and Delete)
-        actions_frame = ctk.CTkFrame(row, fg_color="transparent")
-        actions_frame.pack(side="left", padx=5)
-
-        btn_txt = "Borrow" if book.is_available else "Return"
-        btn_col = "#2cc985" if book.is_available else "#c92c2c"
-        ctk.CTkButton(
-            actions_frame,
-            text=btn_txt,
-            width=70,
-            fg_color=btn_col,
-            command=lambda b=book: self.quick_action(b),
-        ).pack(side="left", padx=2)
-        ctk.CTkButton(
-            actions_frame,
-            text="X",
-            width=30,
-            fg_color="#444",
-            hover_color="#800000",
-            command=lambda b=book: self.delete_action(b),
-        ).pack(side="left", padx=2)
+    def refresh_stats(self):
+        """Refreshes library totals from the engine's live counters; only changed labels are redrawn."""
+        stats = self.library.stats()
+        for key, label in self.stat_labels.items():
+            text = str(stats[key])
+            if self._stat_values.get(key) != text:
+                label.configure(text=text)
+                self._stat_values[key] = text
+
+    def schedule_search(self, *args):
+        """Debounces keystrokes: the search runs once typing pauses briefly."""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(150, self.update_list)
+
+    def update_list(self, keep_offset=False):
+        """Filters the book list based on the search box (free text and/or filters)."""
+        self._search_job = None
+        try:
+            matches = self.library.query(self.search_var.get())
+        except ValueError as e:
+            self.query_error.configure(text=str(e))
+            return  # Keep the last results while the query is being fixed
+        self.query_error.configure(text="")
+        self.table.set_items(matches, keep_offset=keep_offset)
+        self._positions = None
 
     def delete_action(self, book):
         """Prompts user for deletion and removes the book from the library database."""
@@ -256,7 +383,6 @@ class LibraryApp(ctk.CTk):
             ok, msg = self.library.delete_book(book.isbn)
             if ok:
                 messagebox.showinfo("Deleted", msg)
-                self.refresh_ui()
             else:
                 messagebox.showerror("Error", msg)
 
@@ -265,14 +391,13 @@ class LibraryApp(ctk.CTk):
         if book.is_available:
             self.borrow_popup(book)
         else:
+            policy = self.library.policy
             due_date = (
-                book.borrow_date + timedelta(days=7)
-                if book.borrow_date
-                else date.today()
+                policy.due_date(book.borrow_date) if book.borrow_date else date.today()
             )
             days_left = (due_date - date.today()).days
             if days_left < 0:
-                fine = abs(days_left) * 50
+                fine = abs(days_left) * policy.fine_per_day
                 confirm = messagebox.askyesno(
                     "💰 Fine Payment",
                     f"User is late by {abs(days_left)} days.\nFine Amount: {fine} EGP\n\nHas the user paid?",
@@ -283,26 +408,21 @@ class LibraryApp(ctk.CTk):
             if messagebox.askyesno("Confirm", f"Return '{book.title}'?"):
                 ok, msg = self.library.return_book(book.isbn)
                 messagebox.showinfo("Done", msg)
-                self.refresh_ui()
 
     def borrow_popup(self, book):
-        """Opens a top-level window to gather borrower details with auto-incrementing ID."""
+        """
+        Opens a top-level window to gather borrower details with auto-incrementing ID.
+        Typing an ID or phone prefix suggests known borrowers from the registry.
+        """
         win = ctk.CTkToplevel(self)
-        win.geometry("400x400")
+        win.geometry("400x520")
         win.title("Borrow Details")
         win.attributes("-topmost", True)
         ctk.CTkLabel(
             win, text=f"Borrowing: {book.title}", font=("Arial", 16, "bold")
         ).pack(pady=20)
 
-        next_id = 101
-        ids = [
-            int(r.user_id)
-            for r in self.library.borrow_records
-            if str(r.user_id).isdigit()
-        ]
-        if ids:
-            next_id = max(ids) + 1
+        next_id = self.library.next_user_id()
 
         entries = []
         for p in ["User ID", "Borrower Name", "Phone (11 digits)"]:
@@ -312,6 +432,35 @@ class LibraryApp(ctk.CTk):
                 e.insert(0, str(next_id))
             entries.append(e)
 
+        suggestions = ctk.CTkFrame(win, fg_color="transparent")
+        suggestions.pack(fill="x", padx=50)
+
+        def fill(borrower):
+            for e, value in zip(entries, (borrower.user_id, borrower.name, borrower.phone)):
+                e.delete(0, "end")
+                e.insert(0, value)
+            for w in suggestions.winfo_children():
+                w.destroy()
+
+        def suggest(entry):
+            for w in suggestions.winfo_children():
+                w.destroy()
+            prefix = entry.get().strip()
+            if prefix == str(next_id):
+                return  # Untouched suggested ID: nobody to complete
+            for borrower in self.library.find_borrowers(prefix, 4):
+                ctk.CTkButton(
+                    suggestions,
+                    text=f"{borrower.user_id} · {borrower.name} · {borrower.phone}",
+                    anchor="w",
+                    fg_color="gray30",
+                    height=24,
+                    command=lambda b=borrower: fill(b),
+                ).pack(fill="x", pady=1)
+
+        for e in (entries[0], entries[2]):
+            e.bind("<KeyRelease>", lambda event, e=e: suggest(e))
+
         def confirm():
             uid, name, phone = entries[0].get(), entries[1].get(), entries[2].get()
             if not (uid and name and phone):
@@ -323,30 +472,114 @@ class LibraryApp(ctk.CTk):
             ok, msg = self.library.borrow_book(book.isbn, uid, name, phone)
             messagebox.showinfo("Result", msg)
             win.destroy()
-            self.refresh_ui()
 
         ctk.CTkButton(win, text="Confirm", fg_color="green", command=confirm).pack(
             pady=20
         )
 
     def refresh_ui(self):
-        """Refreshes statistics and lists across the UI."""
-        self.refresh_stats()
-        self.update_list()
+        """Refreshes statistics and lists across the UI (e.g. after a full reload)."""
+        if "dashboard" in self.views:
+            self.refresh_stats()
+            self.update_list(keep_offset=True)
+        self._mark_log_stale()
+
+    # ---------- Change Events ----------
+    PATCH_LIMIT = 50  # More changes at once than this: one full refresh is cheaper
+    CHANGE_POLL_MS = 50
+
+    def _on_change(self, change):
+        """
+        Library subscriber. It runs on whichever thread published the change
+        (a storage writer or sync thread included), so it only queues it:
+        Tk is touched from poll_changes, on the Tk thread.
+        """
+        self._changes.put(change)
+
+    def poll_changes(self):
+        """Drains the change queue on the Tk thread and patches the widgets."""
+        changes = []
+        while True:
+            try:
+                changes.append(self._changes.get_nowait())
+            except queue.Empty:
+                break
+        if changes:
+            self.apply_changes(changes)
+        self._changes_job = self.after(self.CHANGE_POLL_MS, self.poll_changes)
+
+    def apply_changes(self, changes):
+        """
+        Applies change events: stat labels whose value changed, the affected
+        dashboard row, and the log page if it is on screen. A checkout
+        therefore touches a constant number of widgets.
+        """
+        if len(changes) > self.PATCH_LIMIT or any(c.kind == RELOADED for c in changes):
+            self.refresh_ui()
+            return
+        if "dashboard" in self.views:
+            self.refresh_stats()
+            if self._needs_requery(changes):
+                self.update_list(keep_offset=True)
+            else:
+                for change in changes:
+                    self._patch_row(change)
+        self._mark_log_stale()
+
+    def _needs_requery(self, changes):
+        """True if the changes may move books in or out of the current search results."""
+        text = self.search_var.get().strip()
+        if not text:
+            return False  # Whole catalog: every change can be patched in place
+        if any(c.kind == ADDED for c in changes):
+            return True
+        try:
+            q = parse_query(text)
+        except ValueError:
+            return False  # The table still shows the last valid query's results
+        loan_filters = ("status", "borrower", "borrowed_before", "borrowed_after")
+        return any(k in q.filters for k in loan_filters) or (q.sort or "").lstrip("-") == "borrow_date"
+
+    def _patch_row(self, change):
+        if change.kind == ADDED:
+            book = self.library.get_book(change.isbn)
+            if book is not None:
+                if self._positions is not None:
+                    self._positions[change.isbn] = len(self.table.items)
+                self.table.append(book)
+            return
+        if self._positions is None:
+            self._positions = {book.isbn: i for i, book in enumerate(self.table.items)}
+        index = self._positions.get(change.isbn)
+        if index is None:
+            return  # Not in the current results
+        if change.kind == DELETED:
+            self.table.remove(index)
+            self._positions = None  # Later rows shifted
+        else:
+            book = self.library.get_book(change.isbn)
+            if book is not None:
+                self.table.update_item(index, book)  # A fresh copy for a remote library
+
+    def _mark_log_stale(self):
+        """The log page is reloaded now if it is on screen, else when next shown."""
+        self._log_stale = True
+        if self.current_view is not None and self.current_view is self.views.get("borrowers"):
+            self.show_log_page(self.log_page)
 
     # ---------- Manage Books View ----------
-    def create_manage(self):
+    def create_manage(self, view):
         """Interface for manually adding new book records to the library."""
-        ctk.CTkLabel(self.main_frame, text="Add New Book", font=("Arial", 24)).pack(
+        ctk.CTkLabel(view, text="Add New Book", font=("Arial", 24)).pack(
             pady=20
         )
-        self.e_t = ctk.CTkEntry(self.main_frame, placeholder_text="Title", width=300)
+        self.e_t = ctk.CTkEntry(view, placeholder_text="Title", width=300)
         self.e_t.pack(pady=5)
-        self.e_a = ctk.CTkEntry(self.main_frame, placeholder_text="Author", width=300)
+        self.e_a = ctk.CTkEntry(view, placeholder_text="Author", width=300)
         self.e_a.pack(pady=5)
-        self.e_i = ctk.CTkEntry(self.main_frame, placeholder_text="ISBN", width=300)
+        self.e_i = ctk.CTkEntry(view, placeholder_text="ISBN", width=300)
         self.e_i.pack(pady=5)
-        ctk.CTkButton(self.main_frame, text="Save Book", command=self.save_book).pack(
+        ctk.CTkButton(view, text="Save Book", command=self.save_book).pack(
             pady=20
         )
 
@@ -358,27 +591,28 @@ class LibraryApp(ctk.CTk):
             )
             if ok:
                 messagebox.showinfo("Success", msg)
-                self.refresh_ui()
+                for e in (self.e_t, self.e_a, self.e_i):
+                    e.delete(0, "end")  # The view is kept; ready for the next book
             else:
                 messagebox.showerror("Error", msg)
         else:
             messagebox.showwarning("Error", "Missing Data")
 
     # ---------- Smart ISBN Scanner View ----------
-    def create_borrow(self):
+    def create_borrow(self, view):
         """Initializes the intelligent scanning interface for quick borrow/return operations."""
         ctk.CTkLabel(
-            self.main_frame, text="🔫 Smart ISBN Scanner", font=("Arial", 24, "bold")
+            view, text="🔫 Smart ISBN Scanner", font=("Arial", 24, "bold")
         ).pack(pady=20)
         ctk.CTkLabel(
-            self.main_frame,
+            view,
             text="Scan or Type ISBN to Borrow/Return automatically:",
             font=("Arial", 14),
             text_color="gray",
         ).pack(pady=(0, 10))
 
         self.scan_entry = ctk.CTkEntry(
-            self.main_frame,
+            view,
             placeholder_text="Enter ISBN here...",
             width=400,
             height=40,
@@ -388,7 +622,7 @@ class LibraryApp(ctk.CTk):
         self.scan_entry.bind("<Return>", lambda event: self.scan_action())
 
         ctk.CTkButton(
-            self.main_frame,
+            view,
             text="🚀 Process Action",
             width=200,
             height=40,
@@ -397,7 +631,7 @@ class LibraryApp(ctk.CTk):
             command=self.scan_action,
         ).pack(pady=10)
         self.status_label = ctk.CTkLabel(
-            self.main_frame, text="", font=("Arial", 14, "bold")
+            view, text="", font=("Arial", 14, "bold")
         )
         self.status_label.pack(pady=20)
 
@@ -408,7 +642,7 @@ class LibraryApp(ctk.CTk):
             messagebox.showwarning("Warning", "Enter ISBN!")
             return
 
-        book = next((b for b in self.library.books if b.isbn == isbn), None)
+        book = self.library.get_book(isbn)
         if not book:
             self.status_label.configure(
                 text=f"❌ Book '{isbn}' not found!", text_color="#ff4d4d"
@@ -431,12 +665,32 @@ class LibraryApp(ctk.CTk):
             self.quick_action(book)
 
     # ---------- Transaction Logs (Audit View) ----------
-    def create_borrowers(self):
+    LOG_PAGE_SIZE = 100
+
+    def create_borrowers(self, view):
         """Renders the historical audit log of all borrowing and returning transactions."""
         ctk.CTkLabel(
-            self.main_frame, text="📜 Borrowing History Log", font=("Arial", 24, "bold")
+            view, text="📜 Borrowing History Log", font=("Arial", 24, "bold")
         ).pack(pady=20)
-        header_frame = ctk.CTkFrame(self.main_frame, height=40, fg_color="#2b2b2b")
+
+        # Filter Bar
+        filters = ctk.CTkFrame(view, fg_color="transparent")
+        filters.pack(fill="x", padx=20, pady=(0, 5))
+        self.log_status = ctk.CTkOptionMenu(
+            filters, values=["All", "Active", "Returned"], width=110
+        )
+        self.log_status.pack(side="left", padx=5)
+        self.log_from = ctk.CTkEntry(filters, placeholder_text="From (YYYY-MM-DD)", width=140)
+        self.log_from.pack(side="left", padx=5)
+        self.log_to = ctk.CTkEntry(filters, placeholder_text="To (YYYY-MM-DD)", width=140)
+        self.log_to.pack(side="left", padx=5)
+        self.log_user = ctk.CTkEntry(filters, placeholder_text="User ID", width=100)
+        self.log_user.pack(side="left", padx=5)
+        ctk.CTkButton(
+            filters, text="Apply", width=80, command=lambda: self.show_log_page(0)
+        ).pack(side="left", padx=5)
+
+        header_frame = ctk.CTkFrame(view, height=40, fg_color="#2b2b2b")
         header_frame.pack(fill="x", padx=20, pady=5)
 
         headers = [
@@ -458,50 +712,172 @@ class LibraryApp(ctk.CTk):
                 text_color="white",
             ).pack(side="left", padx=5)
 
-        scroll = ctk.CTkScrollableFrame(self.main_frame)
-        scroll.pack(fill="both", expand=True, padx=20, pady=10)
-
-        for rec in reversed(self.library.borrow_records):
-            row = ctk.CTkFrame(scroll, fg_color="transparent")
-            row.pack(fill="x", pady=2, padx=5)
-            book_obj = next((b for b in self.library.books if b.isbn == rec.isbn), None)
-            b_title = (
-                book_obj.title[:20] + "..."
-                if book_obj and len(book_obj.title) > 23
-                else (book_obj.title if book_obj else "Unknown")
-            )
+        # Pager
+        pager = ctk.CTkFrame(view, fg_color="transparent")
+        pager.pack(side="bottom", fill="x", padx=20, pady=(0, 10))
+        self.log_prev = ctk.CTkButton(
+            pager, text="◀ Newer", width=90, command=lambda: self.show_log_page(self.log_page - 1)
+        )
+        self.log_prev.pack(side="left")
+        self.log_next = ctk.CTkButton(
+            pager, text="Older ▶", width=90, command=lambda: self.show_log_page(self.log_page + 1)
+        )
+        self.log_next.pack(side="right")
+        self.log_info = ctk.CTkLabel(pager, text="", font=("Arial", 12))
+        self.log_info.pack(side="top")
 
-            status_txt, status_col = (
-                ("✅ Returned", "#2cc985") if rec.returned else ("🟠 Active", "#ffa500")
-            )
-            fine_txt, fine_col = (
-                (f"{rec.fine} EGP", "#ff4d4d") if rec.fine > 0 else ("-", "white")
+        self.log_table = VirtualTable(view, LogRow, row_height=32)
+        self.log_table.pack(fill="both", expand=True, padx=20, pady=10)
+        self.show_log_page(0)
+
+    def show_log_page(self, page):
+        """Fetches one page of the (filtered) history from the engine and displays it."""
+        try:
+            date_from = date.fromisoformat(self.log_from.get()) if self.log_from.get() else None
+            date_to = date.fromisoformat(self.log_to.get()) if self.log_to.get() else None
+        except ValueError:
+            messagebox.showerror("Error", "Dates must be in YYYY-MM-DD format!")
+            return
+
+        status = {"Active": "active", "Returned": "returned"}.get(self.log_status.get())
+        rows, total = self.library.borrow_log(
+            page,
+            self.LOG_PAGE_SIZE,
+            status=status,
+            date_from=date_from,
+            date_to=date_to,
+            user_id=self.log_user.get().strip() or None,
+        )
+        pages = max(1, -(-total // self.LOG_PAGE_SIZE))
+        if rows == [] and page > 0:
+            return self.show_log_page(pages - 1)
+
+        self.log_page = page
+        self._log_stale = False
+        self.log_table.set_items(rows)
+        self.log_info.configure(text=f"Page {page + 1} of {pages}  •  {total} records")
+        self.log_prev.configure(state="normal" if page > 0 else "disabled")
+        self.log_next.configure(state="normal" if page + 1 < pages else "disabled")
+
+
+def _count_widgets(widget):
+    """Tk widgets in a subtree (only computed while metrics are enabled)."""
+    return 1 + sum(_count_widgets(child) for child in widget.winfo_children())
+
+
+recorder.instrument(
+    LibraryApp, "create_dashboard", "update_list", "refresh_ui", "apply_changes",
+    "create_borrowers", "show_log_page",
+)
+
+
+class BookRow(TableRow):
+    """
+    A recyclable dashboard row: widgets are built once and repainted by
+    `set_item` whenever the VirtualTable binds the row to another book.
+    """
+
+    def __init__(self, master, app):
+        super().__init__(master)
+        self.app = app
+        self.book = None
+
+        self.isbn_lbl = ctk.CTkLabel(self, text="", width=80, anchor="w")
+        self.isbn_lbl.pack(side="left", padx=5)
+        self.title_lbl = ctk.CTkLabel(
+            self, text="", width=230, anchor="w", font=("Arial", 13, "bold")
+        )
+        self.title_lbl.pack(side="left", padx=5)
+        self.author_lbl = ctk.CTkLabel(self, text="", width=130, anchor="w")
+        self.author_lbl.pack(side="left", padx=5)
+        self.status_lbl = ctk.CTkLabel(
+            self, text="", width=210, anchor="w", font=("Arial", 12, "bold")
+        )
+        self.status_lbl.pack(side="left", padx=5)
+
+        # Action Buttons (Borrow/Return and Delete)
+        actions_frame = ctk.CTkFrame(self, fg_color="transparent")
+        actions_frame.pack(side="left", padx=5)
+        self.action_btn = ctk.CTkButton(
+            actions_frame, text="", width=70, command=lambda: app.quick_action(self.book)
+        )
+        self.action_btn.pack(side="left", padx=2)
+        ctk.CTkButton(
+            actions_frame,
+            text="X",
+            width=30,
+            fg_color="#444",
+            hover_color="#800000",
+            command=lambda: app.delete_action(self.book),
+        ).pack(side="left", padx=2)
+
+    def set_item(self, book):
+        """Renders the book with status indicators and the matching action button."""
+        self.book = book
+
+        display_title = book.title[:27] + "..." if len(book.title) > 30 else book.title
+        display_author = (
+            book.author[:15] + "..." if len(book.author) > 18 else book.author
+        )
+        self.isbn_lbl.configure(text=book.isbn)
+        self.title_lbl.configure(text=display_title)
+        self.author_lbl.configure(text=display_author)
+
+        # Dynamic Status and Fine Calculation
+        if book.is_available:
+            status_txt, status_col = "🟢 Available", "#2cc985"
+        else:
+            policy = self.app.library.policy
+            due_date = (
+                policy.due_date(book.borrow_date) if book.borrow_date else date.today()
             )
+            days_left = (due_date - date.today()).days
+            if days_left < 0:
+                fine = abs(days_left) * policy.fine_per_day
+                status_txt = f"🔴 LATE ({abs(days_left)}d) | Pay: {fine}"
+                status_col = "#ff4d4d"
+            else:
+                status_txt = f"📅 Due: {due_date}"
+                status_col = "#ffa500"
+        self.status_lbl.configure(text=status_txt, text_color=status_col)
 
-            data = [
-                (str(rec.user_id), 50),
-                (rec.name, 130),
-                (rec.phone, 100),
-                (b_title, 180),
-                (str(rec.borrow_date), 90),
-            ]
-            for txt, w in data:
-                ctk.CTkLabel(row, text=txt, width=w, anchor="w").pack(
-                    side="left", padx=5
-                )
-            ctk.CTkLabel(
-                row,
-                text=fine_txt,
-                text_color=fine_col,
-                width=70,
-                anchor="w",
-                font=("Arial", 11, "bold"),
-            ).pack(side="left", padx=5)
-            ctk.CTkLabel(
-                row,
-                text=status_txt,
-                text_color=status_col,
-                width=90,
-                anchor="w",
-                font=("Arial", 11, "bold"),
-            ).pack(side="left", padx=5)
+        btn_txt = "Borrow" if book.is_available else "Return"
+        btn_col = "#2cc985" if book.is_available else "#c92c2c"
+        self.action_btn.configure(text=btn_txt, fg_color=btn_col)
+
+
+class LogRow(TableRow):
+    """A recyclable Borrowers Log row bound to a (BorrowRecord, title) pair."""
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.cells = []
+        for w in (50, 130, 100, 180, 90):
+            lbl = ctk.CTkLabel(self, text="", width=w, anchor="w")
+            lbl.pack(side="left", padx=5)
+            self.cells.append(lbl)
+        self.fine_lbl = ctk.CTkLabel(
+            self, text="", width=70, anchor="w", font=("Arial", 11, "bold")
+        )
+        self.fine_lbl.pack(side="left", padx=5)
+        self.status_lbl = ctk.CTkLabel(
+            self, text="", width=90, anchor="w", font=("Arial", 11, "bold")
+        )
+        self.status_lbl.pack(side="left", padx=5)
+
+    def set_item(self, item):
+        rec, title = item
+        b_title = title[:20] + "..." if len(title) > 23 else title
+
+        status_txt, status_col = (
+            ("✅ Returned", "#2cc985") if rec.returned else ("🟠 Active", "#ffa500")
+        )
+        fine_txt, fine_col = (
+            (f"{rec.fine} EGP", "#ff4d4d") if rec.fine > 0 else ("-", "white")
+        )
+
+        data = [str(rec.user_id), rec.name, rec.phone, b_title, str(rec.borrow_date)]
+        for lbl, txt in zip(self.cells, data):
+            lbl.configure(text=txt)
+        self.fine_lbl.configure(text=fine_txt, text_color=fine_col)
+        self.status_lbl.configure(text=status_txt, text_color=status_col)
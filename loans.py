@@ -0,0 +1,54 @@
+from collections import defaultdict
+
+
+class LoanIndex:
+    """
+    Indexes over the borrow history.
+
+    Keeps ISBN -> open BorrowRecord (at most one active loan per book, in
+    the order the loans started) and user_id -> every record of that
+    borrower, oldest first, so returns and "what does this user have out"
+    never scan the history.
+
+    `chronological` stays True while records were appended in non-decreasing
+    borrow-date order (always the case for loans made by the app), which lets
+    date-range queries bisect the history instead of scanning it.
+    """
+
+    def __init__(self):
+        self._active = {}  # isbn -> open BorrowRecord
+        self._by_user = defaultdict(list)  # str(user_id) -> [BorrowRecord, ...]
+        self.chronological = True
+        self._last_day = None
+
+    def rebuild(self, records):
+        """Indexes a whole history in one pass."""
+        self._active.clear()
+        self._by_user.clear()
+        self.chronological = True
+        self._last_day = None
+        for rec in records:
+            self.add(rec)
+
+    def add(self, rec):
+        """Indexes a newly appended record."""
+        self._by_user[str(rec.user_id)].append(rec)
+        if not rec.returned:
+            self._active.pop(rec.isbn, None)  # Keep start order if data is inconsistent
+            self._active[rec.isbn] = rec
+        if self._last_day is not None and rec.borrow_day < self._last_day:
+            self.chronological = False
+        self._last_day = rec.borrow_day
+
+    def close(self, isbn):
+        """Removes and returns the open loan for `isbn` (None if there is none)."""
+        return self._active.pop(isbn, None)
+
+    def active(self, isbn):
+        return self._active.get(isbn)
+
+    def for_user(self, user_id):
+        return self._by_user.get(str(user_id), [])
+
+    def all_active(self):
+        return self._active.values()
@@ -0,0 +1,75 @@
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Exclusive advisory lock shared by every process that opens the same data
+    files (fcntl.flock on POSIX, msvcrt.locking on Windows).
+
+    The lock is re-entrant within a process: nested acquisitions, from any
+    thread, only count depth, so a storage writer thread may commit inside
+    a transaction opened by the main thread, or release an acquisition the
+    main thread handed over to it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = None
+        self._depth = 0
+        self._guard = threading.Lock()
+
+    def acquire(self):
+        """Returns True if this call took the lock from other processes (depth 0)."""
+        with self._guard:
+            if self._depth == 0:
+                fh = open(self.path, "a+b")
+                try:
+                    _lock(fh)
+                except BaseException:
+                    fh.close()
+                    raise
+                self._fh = fh
+            self._depth += 1
+            return self._depth == 1
+
+    def release(self):
+        with self._guard:
+            self._depth -= 1
+            if self._depth == 0:
+                _unlock(self._fh)
+                self._fh.close()
+                self._fh = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _lock(fh):
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        return
+    fh.seek(0)
+    while True:
+        try:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue  # LK_LOCK gives up after ~10 s; keep waiting
+
+
+def _unlock(fh):
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        return
+    fh.seek(0)
+    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
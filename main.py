@@ -1,9 +1,82 @@
-from gui import LibraryApp
+import time
+
+STARTED = time.perf_counter()  # Before the heavy imports: startup is measured from here
+
+import argparse
+import functools
+import json
+import sys
+from metrics import recorder
 
 """
 Entry point for the Smart Library Management System.
 Initializes the GUI and starts the main event loop.
+
+Usage:
+    python main.py                     # JSON files + transaction journal
+    python main.py --sqlite library.db # SQLite storage backend
+    python main.py --binary            # Binary snapshots next to the JSON files
+    python main.py --server http://127.0.0.1:8765  # Thin client of server.py
+    python main.py --metrics-log metrics.log       # Time hot paths, dump every minute
+    python main.py --profile session.prof          # cProfile the whole session
+    python main.py --startup-time                  # Print time to first frame / ready, exit
+
+F12 in the window starts / stops a cProfile capture.
 """
 if __name__ == "__main__":
-    app = LibraryApp()
+    parser = argparse.ArgumentParser(description="Smart Library Management System")
+    parser.add_argument("--sqlite", metavar="DB", help="Use a SQLite database instead of the JSON files")
+    parser.add_argument("--server", metavar="URL", help="Connect to a library server instead of opening the files")
+    parser.add_argument("--binary", action="store_true", help="Also keep binary snapshots next to the JSON files (faster loading)")
+    parser.add_argument("--metrics", action="store_true", help="Record operation timings and sizes")
+    parser.add_argument("--metrics-log", metavar="FILE", help="Append a metrics snapshot to FILE periodically (implies --metrics)")
+    parser.add_argument("--metrics-interval", type=float, default=60, help="Seconds between metrics snapshots")
+    parser.add_argument("--profile", metavar="FILE", help="Write a cProfile capture of the whole session to FILE")
+    parser.add_argument("--startup-time", action="store_true", help="Print startup timings (ms) as JSON and exit once ready")
+    args = parser.parse_args()
+
+    # Imported after parsing so --help stays instant; the HTTP client and
+    # the SQLite backend are only imported by the modes that use them.
+    from gui import LibraryApp, open_default_library
+
+    if args.metrics or args.metrics_log:
+        recorder.enable()
+    if args.metrics_log:
+        recorder.start_log(args.metrics_log, args.metrics_interval)
+    if args.profile:
+        recorder.start_profile()
+
+    library = None
+    open_library = open_default_library
+    if args.binary:
+        open_library = functools.partial(open_default_library, binary=True)
+    if args.server:
+        from client import RemoteLibrary
+
+        try:
+            library = RemoteLibrary(args.server)
+        except OSError as e:
+            sys.exit(f"❌ Cannot reach the library server at {args.server}: {e}")
+    elif args.sqlite:
+        from storage import SqliteStorage
+        from system import LibrarySystem
+        from writer import BackgroundStorage
+
+        def open_library():
+            # The history stays in the database: its queries run as SQL
+            return LibrarySystem(storage=BackgroundStorage(SqliteStorage(args.sqlite)), lazy_history=True)
+
+    app = LibraryApp(library, open_library, started=STARTED)
+
+    if args.startup_time:
+        def report(event):
+            print(json.dumps({f"{k}_ms": round(v * 1000, 1) for k, v in app.startup.items()}))
+            app.after(0, app.on_close)
+
+        app.bind("<<LibraryReady>>", report, add="+")
     app.mainloop()
+
+    if args.profile:
+        recorder.stop_profile(args.profile)
+    if args.metrics_log:
+        recorder.dump(args.metrics_log)
@@ -0,0 +1,212 @@
+"""
+Operation timing and metrics for the Smart Library Management System.
+
+Hot paths are registered once with `recorder.instrument(cls, *names)` and
+only wrapped while metrics are enabled, so a disabled recorder costs
+nothing on those calls. Sizes (bytes written, widgets drawn) are recorded
+at their call sites behind a single `recorder.enabled` check.
+
+    recorder.enable()
+    ...
+    recorder.snapshot()   # also LibrarySystem.metrics()
+"""
+import functools
+import json
+import math
+import threading
+import time
+
+
+class Histogram:
+    """
+    Log-bucketed distribution with fixed memory.
+
+    Each doubling of the value is split into `STEPS` buckets, so reported
+    percentiles are within ~9% of the exact ones whatever the sample count.
+    """
+
+    __slots__ = ("count", "total", "max", "_buckets")
+    STEPS = 8
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._buckets = {}
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        idx = math.floor(math.log2(value) * self.STEPS) if value > 0 else None
+        self._buckets[idx] = self._buckets.get(idx, 0) + 1
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile sample."""
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for idx in sorted(self._buckets, key=lambda i: float("-inf") if i is None else i):
+            seen += self._buckets[idx]
+            if seen >= rank:
+                return 0 if idx is None else min(self.max, 2 ** ((idx + 1) / self.STEPS))
+        return self.max
+
+    def summary(self, scale=1):
+        def r(v):
+            return round(v * scale, 3)
+        return {
+            "count": self.count,
+            "mean": r(self.total / self.count) if self.count else 0,
+            "p50": r(self.percentile(50)),
+            "p95": r(self.percentile(95)),
+            "p99": r(self.percentile(99)),
+            "max": r(self.max),
+        }
+
+
+class Metrics:
+    """
+    Process-wide registry of timings (seconds, reported in ms) and value
+    distributions (bytes, widget counts), plus the log dump and profiler.
+
+    Samples arrive from the UI, server handler and storage writer threads at
+    once, so recording and snapshots are serialized by `_lock`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.timings = {}
+        self.values = {}
+        self._lock = threading.Lock()
+        self._targets = []  # (owner, method name, label)
+        self._originals = {}
+        self._started = None
+        self._dump_stop = None
+        self._profiler = None
+
+    # ---------- Switching ----------
+    def instrument(self, owner, *names):
+        """Registers methods of `owner` (a class) to be timed while enabled."""
+        for name in names:
+            target = (owner, name, f"{owner.__name__}.{name}")
+            self._targets.append(target)
+            if self.enabled:
+                self._wrap(target)
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._started = time.time()
+        for target in self._targets:
+            self._wrap(target)
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for (owner, name), original in self._originals.items():
+            setattr(owner, name, original)
+        self._originals.clear()
+        self.stop_log()
+
+    def reset(self):
+        """Drops every recorded sample."""
+        with self._lock:
+            self.timings = {}
+            self.values = {}
+            self._started = time.time()
+
+    def _wrap(self, target):
+        owner, name, label = target
+        original = owner.__dict__[name]
+        self._originals[(owner, name)] = original
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record_time(label, time.perf_counter() - t0)
+
+        setattr(owner, name, timed)
+
+    # ---------- Recording ----------
+    def record_time(self, label, seconds):
+        with self._lock:
+            hist = self.timings.get(label)
+            if hist is None:
+                hist = self.timings[label] = Histogram()
+            hist.record(seconds)
+
+    def observe(self, label, value):
+        """Records a size-like sample (bytes written, widgets drawn, ...)."""
+        with self._lock:
+            hist = self.values.get(label)
+            if hist is None:
+                hist = self.values[label] = Histogram()
+            hist.record(value)
+
+    def snapshot(self):
+        """Counts and p50/p95/p99 of everything recorded so far, as plain dicts."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "since": self._started,
+                "timings_ms": {k: h.summary(1000) for k, h in sorted(self.timings.items())},
+                "values": {k: h.summary() for k, h in sorted(self.values.items())},
+                "profiling": self._profiler is not None,
+            }
+
+    # ---------- Periodic log ----------
+    def start_log(self, path, interval=60):
+        """Appends a snapshot as one JSON line to `path` every `interval` seconds."""
+        self.stop_log()
+        stop = self._dump_stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.dump(path)
+
+        threading.Thread(target=run, name="metrics-log", daemon=True).start()
+
+    def stop_log(self):
+        if self._dump_stop is not None:
+            self._dump_stop.set()
+            self._dump_stop = None
+
+    def dump(self, path):
+        line = json.dumps({"time": time.time(), **self.snapshot()}, ensure_ascii=False)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    # ---------- Profiling ----------
+    @property
+    def profiling(self):
+        return self._profiler is not None
+
+    def start_profile(self):
+        """Starts a cProfile capture of the calling thread."""
+        import cProfile  # Imported on demand: it is not needed to start the app
+
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profile(self, path):
+        """Stops the capture and writes it to `path` (open with pstats or snakeviz)."""
+        profiler, self._profiler = self._profiler, None
+        if profiler is None:
+            return None
+        import pstats
+
+        profiler.disable()
+        profiler.dump_stats(path)
+        return pstats.Stats(profiler)
+
+
+recorder = Metrics()
@@ -0,0 +1,62 @@
+"""
+Data file migrations for the Smart Library Management System.
+
+Usage:
+    python migrate.py sqlite library.db [--books library_data.json] [--borrows borrow.json]
+    python migrate.py ndjson library_data.json library_data.ndjson
+"""
+import argparse
+import sys
+from storage import JsonStorage, SqliteStorage, convert_to_ndjson
+
+
+def migrate_to_sqlite(db_path, books_file, borrow_file, force=False):
+    """Imports the JSON catalog and borrow history into a SQLite database."""
+    source = JsonStorage(books_file, borrow_file)
+    target = SqliteStorage(db_path)
+    try:
+        if not target.is_empty() and not force:
+            return False, f"❌ '{db_path}' already holds data (use --force to append)."
+        books = list(source.load_books())
+        records = list(source.load_borrow_records())
+        if source.load_errors:
+            return False, "❌ Source data is damaged:\n" + "\n".join(source.load_errors)
+        target.import_rows(books, records)
+        return True, f"✅ Imported {len(books)} books and {len(records)} borrow records into '{db_path}'."
+    finally:
+        target.close(None)
+
+
+def migrate_to_ndjson(src, dst):
+    """Converts a JSON array data file into newline-delimited JSON."""
+    count, errors = convert_to_ndjson(src, dst)
+    if errors:
+        return False, f"⚠️ Wrote {count} records to '{dst}', but the source is damaged:\n" + "\n".join(errors)
+    return True, f"✅ Wrote {count} records to '{dst}'."
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate library data between formats.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("sqlite", help="Import the JSON files into a SQLite database")
+    p.add_argument("db", help="Target SQLite database file")
+    p.add_argument("--books", default="library_data.json", help="Source books JSON file")
+    p.add_argument("--borrows", default="borrow.json", help="Source borrow log JSON file")
+    p.add_argument("--force", action="store_true", help="Import into a non-empty database")
+
+    p = sub.add_parser("ndjson", help="Convert a JSON array file to NDJSON")
+    p.add_argument("src", help="Source JSON array file")
+    p.add_argument("dst", help="Target .ndjson file")
+
+    args = parser.parse_args(argv)
+    if args.command == "sqlite":
+        ok, msg = migrate_to_sqlite(args.db, args.books, args.borrows, args.force)
+    else:
+        ok, msg = migrate_to_ndjson(args.src, args.dst)
+    print(msg)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+import heapq
+from array import array
+from datetime import date, timedelta
+
+
+class LoanPolicy:
+    """
+    Circulation rules, configured in one place.
+
+    Attributes:
+        loan_days (int): Days a book may be kept before it is overdue.
+        fine_per_day (int): Fine in EGP for every day past the due date.
+    """
+
+    def __init__(self, loan_days=7, fine_per_day=50):
+        self.loan_days = loan_days
+        self.fine_per_day = fine_per_day
+
+    def due_date(self, borrow_date):
+        """The date a loan that started on `borrow_date` must be returned by."""
+        return borrow_date + timedelta(days=self.loan_days)
+
+    def days_late(self, borrow_date, today=None):
+        """Whole days past the due date (0 if not overdue)."""
+        today = today or date.today()
+        return max(0, (today - borrow_date).days - self.loan_days)
+
+    def fine(self, borrow_date, today=None):
+        """Fine owed for a loan if it were returned `today`."""
+        return self.days_late(borrow_date, today) * self.fine_per_day
+
+
+class OverdueTracker:
+    """
+    Active loans ordered by due date.
+
+    A binary heap of (due_day, seq, isbn) answers "what is overdue" by
+    visiting only the overdue entries (O(k log n) for k results) instead of
+    scanning every book. Returns use lazy deletion: an entry is live only
+    while its seq matches the book's current loan, and the heap is rebuilt
+    once stale entries outnumber live ones.
+
+    Due days are also kept in a packed column (`array`) with a parallel ISBN
+    list, so fines for every active loan are computed in one vectorized-style
+    pass (`fines`) over plain integers.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self._heap = []  # (due_day, seq, isbn); may hold stale entries
+        self._live = {}  # isbn -> seq of its live heap entry
+        self._seq = 0
+        self._col_due = array("l")  # due days, packed
+        self._col_isbn = []  # ISBN for each column slot
+        self._slot = {}  # isbn -> column slot
+
+    def __len__(self):
+        return len(self._live)
+
+    def rebuild(self, books):
+        """Indexes every borrowed book in one pass."""
+        self._live.clear()
+        self._col_due = array("l")
+        self._col_isbn = []
+        self._slot.clear()
+        for book in books:
+            if not book.is_available and book.borrow_day is not None:
+                self._insert(book.isbn, book.borrow_day + self.policy.loan_days)
+        self._reheap()
+
+    def loan_started(self, isbn, borrow_day):
+        if borrow_day is None:
+            return
+        entry = self._insert(isbn, borrow_day + self.policy.loan_days)
+        heapq.heappush(self._heap, entry)
+
+    def loan_ended(self, isbn):
+        if self._live.pop(isbn, None) is None:
+            return
+        # Swap-remove from the packed column
+        slot = self._slot.pop(isbn)
+        last_isbn = self._col_isbn.pop()
+        last_due = self._col_due.pop()
+        if slot < len(self._col_isbn):
+            self._col_isbn[slot] = last_isbn
+            self._col_due[slot] = last_due
+            self._slot[last_isbn] = slot
+        if len(self._heap) > 2 * len(self._live) + 16:
+            self._reheap()
+
+    def overdue(self, today=None, limit=None):
+        """
+        Loans past their due date, most overdue first.
+
+        Returns:
+            list: (isbn, days_late) tuples.
+        """
+        today = (today or date.today()).toordinal()
+        heap, live = self._heap, self._live
+        result = []
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier and (limit is None or len(result) < limit):
+            (due_day, seq, isbn), i = heapq.heappop(frontier)
+            if due_day >= today:
+                continue  # Its children are due even later
+            if live.get(isbn) == seq:
+                result.append((isbn, today - due_day))
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
+    def fines(self, today=None):
+        """
+        Fines for every active loan, computed in one pass over the due column.
+
+        Returns:
+            tuple: (isbns, fines) parallel lists; fines are 0 for loans not yet due.
+        """
+        today = (today or date.today()).toordinal()
+        rate = self.policy.fine_per_day
+        fines = [(today - d) * rate if d < today else 0 for d in self._col_due]
+        return list(self._col_isbn), fines
+
+    def _insert(self, isbn, due):
+        """Records a live loan in the column store; returns its heap entry."""
+        if isbn in self._live:
+            self.loan_ended(isbn)
+        self._seq += 1
+        self._live[isbn] = self._seq
+        self._slot[isbn] = len(self._col_isbn)
+        self._col_isbn.append(isbn)
+        self._col_due.append(due)
+        return (due, self._seq, isbn)
+
+    def _reheap(self):
+        """Rebuilds the heap from the live loans, dropping stale entries."""
+        self._heap = [
+            (self._col_due[slot], self._live[isbn], isbn)
+            for isbn, slot in self._slot.items()
+        ]
+        heapq.heapify(self._heap)
@@ -0,0 +1,203 @@
+import heapq
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from dates import parse_day
+
+FILTERS = ("author", "status", "borrower", "borrowed_before", "borrowed_after")
+STATUSES = ("available", "borrowed", "overdue")
+SORT_KEYS = ("title", "author", "isbn", "borrow_date")
+
+# key:value (value optionally "quoted", possibly still empty while typing) or a free-text word
+_TOKEN = re.compile(r'(\w+):("[^"]*"?|\S*)|("[^"]*"?|\S+)')
+
+
+class Query:
+    """
+    A parsed query: free text plus structured filters.
+
+    Attributes:
+        text (str): Free-text part, matched like the dashboard search.
+        filters (dict): Filter name -> value (a day ordinal for the dates).
+        sort (str, optional): A SORT_KEYS entry, "-" prefixed for descending.
+        limit (int, optional): Maximum number of results.
+    """
+
+    __slots__ = ("text", "filters", "sort", "limit")
+
+    def __init__(self, text="", filters=None, sort=None, limit=None):
+        self.text = text
+        self.filters = filters or {}
+        self.sort = sort
+        self.limit = limit
+
+
+def parse_query(text):
+    """
+    Parses e.g. 'python author:"Karim Hassan" status:borrowed sort:-borrow_date limit:20'.
+
+    Filters: author:, borrower: (substring, case-insensitive),
+    status:available|borrowed|overdue, borrowed_before:/borrowed_after:
+    YYYY-MM-DD (exclusive), plus sort: and limit:. Anything else, including
+    words with an unknown "key:", is free text. A filter with no value yet
+    is ignored, so a query can be typed incrementally.
+
+    Raises:
+        ValueError: For an invalid status, date, sort key or limit (the
+            message is meant for the user).
+    """
+    if ":" not in text:
+        return Query(text)  # Plain search: the term is used exactly as typed
+
+    query = Query()
+    words = []
+    for m in _TOKEN.finditer(text):
+        key, value, word = m.group(1), m.group(2), m.group(3)
+        key = key.lower() if key else None
+        if key not in FILTERS and key not in ("sort", "limit"):
+            words.append((m.group(0) if key else word).strip('"'))
+            continue
+        value = value.strip('"').strip()
+        if not value:
+            continue
+        if key == "status":
+            if value.lower() not in STATUSES:
+                raise ValueError(f"⚠️ Unknown status '{value}' (use available, borrowed or overdue).")
+            query.filters[key] = value.lower()
+        elif key in ("borrowed_before", "borrowed_after"):
+            day = parse_day(value)
+            if day is None:
+                raise ValueError(f"⚠️ Invalid date '{value}' (use YYYY-MM-DD).")
+            query.filters[key] = day
+        elif key == "sort":
+            if value.lower().lstrip("-") not in SORT_KEYS:
+                raise ValueError(f"⚠️ Cannot sort by '{value}' (use {', '.join(SORT_KEYS)}).")
+            query.sort = value.lower()
+        elif key == "limit":
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f"⚠️ Invalid limit '{value}'.")
+            query.limit = int(value)
+        else:
+            query.filters[key] = value.lower()
+    query.text = " ".join(w for w in words if w)
+    return query
+
+
+class QueryIndex:
+    """
+    Secondary indexes for structured queries, kept current by LibrarySystem
+    like LibraryStats (rebuild, then one call per change in book state).
+
+    Authors and borrower names map to their ISBNs; a substring filter scans
+    the distinct names (far fewer than books) and unions their postings.
+    Borrowed books are a set, and their borrow days a sorted list, so date
+    filters are a bisection.
+    """
+
+    def __init__(self):
+        self._by_author = defaultdict(set)  # author.lower() -> {isbn, ...}
+        self._by_borrower = defaultdict(set)  # borrow_man.lower() -> {isbn, ...}
+        self.borrowed = set()
+        self._by_day = []  # Sorted (borrow_day, isbn) of borrowed books with a date
+
+    def rebuild(self, books):
+        self._by_author.clear()
+        self._by_borrower.clear()
+        self.borrowed = set()
+        self._by_day = []
+        for book in books:
+            self._by_author[book.author.lower()].add(book.isbn)
+            if not book.is_available:
+                self._index_loan(book, bulk=True)
+        self._by_day.sort()
+
+    def book_added(self, book):
+        self._by_author[book.author.lower()].add(book.isbn)
+        if not book.is_available:
+            self._index_loan(book)
+
+    def book_removed(self, book):
+        _discard(self._by_author, book.author.lower(), book.isbn)
+        if not book.is_available:
+            self.loan_ended(book)
+
+    def loan_started(self, book):
+        self._index_loan(book)
+
+    def loan_ended(self, book):
+        """Call before the book's borrower and date are cleared."""
+        self.borrowed.discard(book.isbn)
+        if book.borrow_man:
+            _discard(self._by_borrower, book.borrow_man.lower(), book.isbn)
+        if book.borrow_day is not None:
+            i = bisect_left(self._by_day, (book.borrow_day, book.isbn))
+            if i < len(self._by_day) and self._by_day[i] == (book.borrow_day, book.isbn):
+                del self._by_day[i]
+
+    def _index_loan(self, book, bulk=False):
+        self.borrowed.add(book.isbn)
+        if book.borrow_man:
+            self._by_borrower[book.borrow_man.lower()].add(book.isbn)
+        if book.borrow_day is not None:
+            if bulk:
+                self._by_day.append((book.borrow_day, book.isbn))
+            else:
+                insort(self._by_day, (book.borrow_day, book.isbn))
+
+    # ---------- Lookups ----------
+    def by_author(self, term):
+        return _matching(self._by_author, term)
+
+    def by_borrower(self, term):
+        return _matching(self._by_borrower, term)
+
+    def borrowed_between(self, after=None, before=None):
+        """ISBNs of books borrowed strictly after / before the given day ordinals."""
+        lo = 0 if after is None else bisect_left(self._by_day, (after + 1,))
+        hi = len(self._by_day) if before is None else bisect_left(self._by_day, (before,))
+        return {isbn for _, isbn in self._by_day[lo:hi]}
+
+
+def _matching(index, term):
+    found = set()
+    for name, isbns in index.items():
+        if term in name:
+            found |= isbns
+    return found
+
+
+def _discard(index, key, isbn):
+    isbns = index.get(key)
+    if isbns is not None:
+        isbns.discard(isbn)
+        if not isbns:
+            del index[key]
+
+
+def sort_books(books, sort=None, limit=None):
+    """
+    Orders books by a SORT_KEYS field ("-title" for descending) and keeps the
+    first `limit`; unsorted input keeps its order. Books without a borrow
+    date come last when sorting by it.
+    """
+    if not sort:
+        return books[:limit] if limit else books
+    field = sort.lstrip("-")
+    descending = sort.startswith("-")
+    if field == "borrow_date":
+        sign = -1 if descending else 1
+
+        def key(book):
+            day = book.borrow_day
+            return (day is None, sign * day if day is not None else 0)
+        descending = False
+    elif field == "isbn":
+        def key(book):
+            return book.isbn
+    else:
+        def key(book):
+            return getattr(book, field).lower()
+    if limit:
+        pick = heapq.nlargest if descending else heapq.nsmallest
+        return pick(limit, books, key=key)
+    return sorted(books, key=key, reverse=descending)
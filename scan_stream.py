@@ -0,0 +1,160 @@
+"""
+Headless scan-stream mode for the Smart Library Management System.
+
+Reads one scan per line from stdin (e.g. a USB scanner in keyboard mode) or
+from a file, and handles it like the Smart Scanner: a borrowed book is
+returned, an available one is lent to the borrower given on the line.
+
+Usage:
+    python scan_stream.py                          # scans from stdin
+    python scan_stream.py returns.txt --batch 1000
+    python scan_stream.py --sqlite library.db < scans.txt
+
+Line format:
+    ISBN                            # return
+    ISBN,user_id,name,phone         # loan (tabs also work as separators)
+
+Scans are grouped into batches (up to --batch scans, or whatever arrived
+within --linger ms of the first one) and each batch is persisted with a
+single commit. One result line per scan goes to stdout; throughput and
+latency statistics go to stderr at the end.
+"""
+import argparse
+import queue
+import sys
+import threading
+import time
+from storage import JsonStorage, SqliteStorage
+from system import LibrarySystem
+
+
+def parse_scan(line):
+    """Splits a scan line into the dict accepted by LibrarySystem.scan_many."""
+    parts = [p.strip() for p in line.replace("\t", ",").split(",")]
+    parts += [""] * (4 - len(parts))
+    return {"isbn": parts[0], "user_id": parts[1], "name": parts[2], "phone": parts[3]}
+
+
+def _read_lines(stream, scans):
+    """Feeds (arrival time, line) pairs to the queue; None marks the end."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            scans.put((time.perf_counter(), line))
+    scans.put(None)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[idx]
+
+
+def run_stream(library, stream, batch_size=500, linger=0.05, out=sys.stdout):
+    """
+    Processes every scan of `stream` through `library` in batched commits.
+
+    Latency is measured per scan from the moment its line was read to the
+    moment its batch was committed.
+
+    Returns:
+        dict: scans, accepted, rejected, batches, seconds, per_second and
+        latency_ms (p50 / p95 / p99 / max).
+    """
+    scans = queue.Queue()
+    threading.Thread(target=_read_lines, args=(stream, scans), daemon=True).start()
+
+    latencies = []
+    accepted = rejected = batches = 0
+    start = time.perf_counter()
+    done = False
+    while not done:
+        first = scans.get()
+        if first is None:
+            break
+        pending = [first]
+        deadline = first[0] + linger
+        while len(pending) < batch_size:
+            try:
+                item = scans.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            if item is None:
+                done = True
+                break
+            pending.append(item)
+
+        parsed = [parse_scan(line) for _, line in pending]
+        results = library.scan_many(parsed)
+        committed = time.perf_counter()
+        batches += 1
+        for (arrived, _), scan, (ok, msg) in zip(pending, parsed, results):
+            latencies.append(committed - arrived)
+            if ok:
+                accepted += 1
+            else:
+                rejected += 1
+            status = "OK" if ok else "FAIL"
+            out.write(f"{scan['isbn']}\t{status}\t{msg.replace(chr(10), ' ')}\n")
+        out.flush()
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    total = accepted + rejected
+    return {
+        "scans": total,
+        "accepted": accepted,
+        "rejected": rejected,
+        "batches": batches,
+        "seconds": elapsed,
+        "per_second": total / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50) * 1000,
+            "p95": _percentile(latencies, 95) * 1000,
+            "p99": _percentile(latencies, 99) * 1000,
+            "max": (latencies[-1] if latencies else 0.0) * 1000,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process a stream of scans without the GUI.")
+    parser.add_argument("file", nargs="?", help="Scan file (default: read stdin)")
+    parser.add_argument("--batch", type=int, default=500, help="Maximum scans per commit")
+    parser.add_argument("--linger", type=float, default=50, help="Milliseconds to wait for more scans before committing")
+    parser.add_argument("--sqlite", metavar="DB", help="Use a SQLite database instead of the JSON files")
+    parser.add_argument("--journal", metavar="FILE", default="library.journal",
+                        help="Journal file when using the JSON files")
+    args = parser.parse_args(argv)
+
+    if args.sqlite:
+        library = LibrarySystem(storage=SqliteStorage(args.sqlite), lazy_history=True)
+    else:
+        library = LibrarySystem(storage=JsonStorage(journal_file=args.journal, shared=True), lazy_history=True)
+    if library.load_errors:
+        print("❌ Existing data could not be fully loaded; fix it before scanning:", file=sys.stderr)
+        print("\n".join(library.load_errors), file=sys.stderr)
+        return 1
+
+    stream = open(args.file, "r", encoding="utf-8") if args.file else sys.stdin
+    try:
+        stats = run_stream(library, stream, args.batch, args.linger / 1000)
+    finally:
+        library.close()
+        if args.file:
+            stream.close()
+
+    lat = stats["latency_ms"]
+    print(
+        f"✅ {stats['scans']} scans ({stats['accepted']} ok, {stats['rejected']} failed) "
+        f"in {stats['batches']} commits, {stats['seconds']:.2f}s = {stats['per_second']:.0f} scans/s\n"
+        f"⏱️ latency p50 {lat['p50']:.1f} ms, p95 {lat['p95']:.1f} ms, "
+        f"p99 {lat['p99']:.1f} ms, max {lat['max']:.1f} ms",
+        file=sys.stderr,
+    )
+    return 0 if not stats["rejected"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
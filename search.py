@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+
+class SearchIndex:
+    """
+    Incremental substring search over book title, author and ISBN.
+
+    Fields are normalized (lower-cased) once when a book is indexed, and every
+    trigram of every field is kept in an inverted index (trigram -> ISBNs).
+    A query of three or more characters only verifies the books that contain
+    all of its trigrams; shorter queries scan the pre-normalized fields.
+    When a query extends the previous one, the previous result is narrowed
+    instead of searching again.
+
+    Matching semantics are those of the original dashboard filter: the
+    lower-cased term is a substring of the lower-cased title or author, or of
+    the raw ISBN.
+    """
+
+    def __init__(self):
+        self._fields = {}  # isbn -> (seq, title_lower, author_lower, isbn)
+        self._grams = defaultdict(set)  # trigram -> {isbn, ...}
+        self._seq = 0
+        self._last_term = None
+        self._last_result = None
+
+    def __len__(self):
+        return len(self._fields)
+
+    def rebuild(self, books):
+        """Indexes every book from scratch."""
+        self._fields.clear()
+        self._grams.clear()
+        self._seq = 0
+        for book in books:
+            self.add(book)
+
+    def add(self, book):
+        """Indexes a single book (O(length of its fields))."""
+        self._seq += 1
+        fields = (self._seq, book.title.lower(), book.author.lower(), book.isbn)
+        self._fields[book.isbn] = fields
+        for gram in _trigrams_of_fields(fields):
+            self._grams[gram].add(book.isbn)
+        self._last_term = None
+
+    def remove(self, isbn):
+        """Drops a book from the index."""
+        fields = self._fields.pop(isbn, None)
+        if fields is None:
+            return
+        for gram in _trigrams_of_fields(fields):
+            postings = self._grams[gram]
+            postings.discard(isbn)
+            if not postings:
+                del self._grams[gram]
+        self._last_term = None
+
+    def search(self, term):
+        """
+        Returns the ISBNs matching `term`, in catalog order.
+
+        Args:
+            term (str): Free-text query; an empty term matches everything.
+        """
+        term = term.lower()
+        if not term:
+            result = list(self._fields)
+        elif self._last_term is not None and self._last_term in term:
+            result = self._filter(self._last_result, term)
+        elif len(term) >= 3:
+            result = self._filter(self._candidates(term), term)
+        else:
+            result = self._filter(self._fields, term)
+
+        self._last_term = term
+        self._last_result = result
+        return result
+
+    def _candidates(self, term):
+        """ISBNs whose fields contain every trigram of `term`, in catalog order."""
+        postings = []
+        for gram in {term[i:i + 3] for i in range(len(term) - 2)}:
+            found = self._grams.get(gram)
+            if not found:
+                return []
+            postings.append(found)
+        postings.sort(key=len)
+        return self.in_catalog_order(set(postings[0]).intersection(*postings[1:]))
+
+    def in_catalog_order(self, isbns):
+        """Sorts indexed ISBNs into catalog (insertion) order."""
+        fields = self._fields
+        return sorted(isbns, key=lambda isbn: fields[isbn][0])
+
+    def _filter(self, isbns, term):
+        fields = self._fields
+        result = []
+        for isbn in isbns:
+            _, title, author, raw_isbn = fields[isbn]
+            if term in title or term in author or term in raw_isbn:
+                result.append(isbn)
+        return result
+
+
+def _trigrams_of_fields(fields):
+    """Every trigram of the title, author and ISBN of an indexed entry."""
+    grams = set()
+    for text in fields[1:]:
+        for i in range(len(text) - 2):
+            grams.add(text[i:i + 3])
+    return grams
@@ -0,0 +1,319 @@
+"""
+Local HTTP/JSON server for the Smart Library Management System.
+
+One process owns the data files and serves every circulation desk, so
+several stations can share a catalog safely. Desks connect with
+`python main.py --server http://HOST:PORT`.
+
+Usage:
+    python server.py                          # JSON files + journal, port 8765
+    python server.py --host 0.0.0.0 --port 9000 --workers 32
+    python server.py --sqlite library.db
+    python server.py --binary                 # Binary snapshots (see snapshot.py)
+
+Endpoints (JSON bodies and responses):
+    GET    /status                      policy, load errors, catalog size
+    GET    /stats                       live totals
+    GET    /books?q=QUERY&sort=&limit=  search or structured query (empty: whole catalog)
+    POST   /books                       add {"title", "author", "isbn"}
+    GET    /books/ISBN                  lookup
+    DELETE /books/ISBN                  delete
+    POST   /books/ISBN/borrow           lend {"user_id", "name", "phone"}
+    POST   /books/ISBN/return           return
+    GET    /log?page=&page_size=&status=&from=&to=&user_id=
+    GET    /users?prefix=&limit=        borrowers by ID or phone prefix
+    GET    /users/next_id               suggested borrower ID
+    GET    /users/USER_ID               borrower profile
+    GET    /analytics/books?k=          most borrowed books
+    GET    /analytics/borrowers?k=&by=  most active borrowers (by loans, returns or fines)
+    GET    /analytics/months?from=&to=  loans, returns and fines per month
+    GET    /metrics                     timings and sizes (start with --metrics)
+
+Mutations answer {"ok": bool, "message": str} (409 when rejected) once the
+change is durable.
+"""
+import argparse
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from archive import HistoryArchive
+from metrics import recorder
+from urllib.parse import parse_qs, unquote, urlsplit
+from storage import JsonStorage, SqliteStorage
+from system import LibrarySystem
+from writer import BackgroundStorage
+
+
+class LibraryServer(HTTPServer):
+    """
+    HTTP server sharing one LibrarySystem between request threads.
+
+    Connections are handled by a fixed thread pool (one worker per open
+    keep-alive connection; idle connections are closed after
+    `LibraryRequestHandler.timeout` seconds). Mutations of the same ISBN
+    are serialized by a striped lock table and held until durable, so a
+    desk never observes a checkout that could still be lost; other books
+    proceed concurrently and share the storage writer's group commits.
+
+    Args:
+        address (tuple): (host, port) to listen on.
+        library (LibrarySystem): The shared engine.
+        workers (int): Size of the request thread pool.
+    """
+
+    allow_reuse_address = True
+    LOCK_STRIPES = 64
+
+    def __init__(self, address, library, workers=16):
+        super().__init__(address, LibraryRequestHandler)
+        self.library = library
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="library-http")
+        self._isbn_locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+
+    def lock_for(self, isbn):
+        """The lock serializing requests that touch `isbn`."""
+        return self._isbn_locks[hash(isbn) % self.LOCK_STRIPES]
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def service_actions(self):
+        # Runs between polls of serve_forever: surface background write failures
+        for _, error in self.library.storage.poll():
+            if error is not None:
+                sys.stderr.write(f"❌ Write failed: {error}\n")
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+class LibraryRequestHandler(BaseHTTPRequestHandler):
+    """Routes JSON requests to the shared LibrarySystem."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    timeout = 30  # Seconds an idle keep-alive connection may hold a worker
+
+    # ---------- Routing ----------
+    def do_GET(self):
+        path, query = self._parse()
+        library = self.server.library
+        # Build the payload under the engine lock (other threads may be
+        # mutating), then send it without holding the lock.
+        with library.lock:
+            status, payload = self._read(library, path, query)
+        self._send(status, payload)
+
+    def _read(self, library, path, query):
+        if path == ["status"]:
+            return 200, {
+                "policy": {
+                    "loan_days": library.policy.loan_days,
+                    "fine_per_day": library.policy.fine_per_day,
+                },
+                "load_errors": library.load_errors,
+                "books": library.stats()["total"],
+            }
+        if path == ["stats"]:
+            return 200, library.stats()
+        if path == ["books"]:
+            try:
+                limit = int(query["limit"]) if query.get("limit") else None
+                books = library.query(query.get("q", ""), query.get("sort") or None, limit)
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            return 200, {"books": [book.to_dict() for book in books]}
+        if len(path) == 2 and path[0] == "books":
+            book = library.get_book(path[1])
+            if book is None:
+                return 404, {"error": "❌ Book not found."}
+            return 200, book.to_dict()
+        if path == ["log"]:
+            return self._log(library, query)
+        if path == ["users"]:
+            try:
+                limit = int(query.get("limit", 5))
+            except ValueError as e:
+                return 400, {"error": f"Invalid parameter: {e}"}
+            found = library.find_borrowers(query.get("prefix", ""), limit)
+            return 200, {"users": [b.to_dict() for b in found]}
+        if path == ["users", "next_id"]:
+            return 200, {"next_id": library.next_user_id()}
+        if len(path) == 2 and path[0] == "users":
+            borrower = library.get_borrower(path[1])
+            if borrower is None:
+                return 404, {"error": "❌ Borrower not found."}
+            return 200, borrower.to_dict()
+        if path and path[0] == "analytics":
+            return self._analytics(library, path[1:], query)
+        if path == ["metrics"]:
+            return 200, library.metrics()
+        return 404, {"error": "Unknown endpoint"}
+
+    def do_POST(self):
+        path, _ = self._parse()
+        body = self._body()
+        if body is None:
+            return
+        library = self.server.library
+        if path == ["books"]:
+            isbn = str(body.get("isbn") or "").strip()
+            self._mutate(isbn, lambda: library.add_book(
+                str(body.get("title") or "").strip(), str(body.get("author") or "").strip(), isbn
+            ))
+        elif len(path) == 3 and path[0] == "books" and path[2] == "borrow":
+            self._mutate(path[1], lambda: library.borrow_book(
+                path[1],
+                str(body.get("user_id") or "").strip(),
+                str(body.get("name") or "").strip(),
+                str(body.get("phone") or "").strip(),
+            ))
+        elif len(path) == 3 and path[0] == "books" and path[2] == "return":
+            self._mutate(path[1], lambda: library.return_book(path[1]))
+        else:
+            self._send(404, {"error": "Unknown endpoint"})
+
+    def do_DELETE(self):
+        path, _ = self._parse()
+        if len(path) == 2 and path[0] == "books":
+            self._mutate(path[1], lambda: self.server.library.delete_book(path[1]))
+        else:
+            self._send(404, {"error": "Unknown endpoint"})
+
+    # ---------- Handlers ----------
+    def _mutate(self, isbn, action):
+        """Runs a mutation under the ISBN's lock and answers once it is durable.
+
+        The transaction only queues the write, so this flush is the single
+        wait; it runs after the lock is released so requests for the same
+        stripe do not queue behind the disk.
+        """
+        with self.server.lock_for(isbn):
+            ok, msg = action()
+        if ok:
+            self.server.library.flush()
+        self._send(200 if ok else 409, {"ok": ok, "message": msg})
+
+    def _analytics(self, library, path, query):
+        try:
+            k = int(query.get("k", 10))
+            if path == ["books"]:
+                return 200, {"books": library.top_books(k)}
+            if path == ["borrowers"]:
+                return 200, {"borrowers": library.top_borrowers(k, query.get("by", "loans"))}
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        if path == ["months"]:
+            try:
+                date_from = date.fromisoformat(query["from"]) if query.get("from") else None
+                date_to = date.fromisoformat(query["to"]) if query.get("to") else None
+            except ValueError as e:
+                return 400, {"error": f"Invalid parameter: {e}"}
+            return 200, {"months": library.monthly_totals(date_from, date_to)}
+        return 404, {"error": "Unknown endpoint"}
+
+    def _log(self, library, query):
+        try:
+            page = int(query.get("page", 0))
+            page_size = int(query.get("page_size", 50))
+            date_from = date.fromisoformat(query["from"]) if query.get("from") else None
+            date_to = date.fromisoformat(query["to"]) if query.get("to") else None
+        except ValueError as e:
+            return 400, {"error": f"Invalid parameter: {e}"}
+        rows, total = library.borrow_log(
+            page,
+            page_size,
+            status=query.get("status") or None,
+            date_from=date_from,
+            date_to=date_to,
+            user_id=query.get("user_id") or None,
+        )
+        return 200, {
+            "rows": [{"record": rec.to_dict(), "title": title} for rec, title in rows],
+            "total": total,
+        }
+
+    # ---------- Plumbing ----------
+    def _parse(self):
+        parts = urlsplit(self.path)
+        path = [unquote(p) for p in parts.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        return path, query
+
+    def _body(self):
+        """Reads the JSON request body; answers 400 and returns None if it is invalid."""
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            self._send(400, {"error": "Body must be a JSON object"})
+            return None
+        return body
+
+    def _send(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # One line per request would dominate the console at desk rates
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the library to several circulation desks.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=16, help="Request threads (one per open connection)")
+    parser.add_argument("--sqlite", metavar="DB", help="Use a SQLite database instead of the JSON files")
+    parser.add_argument("--journal", metavar="FILE", default="library.journal",
+                        help="Journal file when using the JSON files")
+    parser.add_argument("--archive", metavar="DIR", default="borrow_archive",
+                        help="Archive of old borrow history with the JSON files (see archive.py)")
+    parser.add_argument("--binary", action="store_true",
+                        help="Also keep binary snapshots next to the JSON files (faster loading)")
+    parser.add_argument("--metrics", action="store_true", help="Record timings, served at /metrics")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        recorder.enable()
+        recorder.instrument(LibraryRequestHandler, "do_GET", "do_POST", "do_DELETE")
+    if args.sqlite:
+        # The history stays in the (indexed) database: no archive, queries run as SQL
+        library = LibrarySystem(storage=BackgroundStorage(SqliteStorage(args.sqlite)), lazy_history=True)
+    else:
+        inner = JsonStorage(journal_file=args.journal, shared=True, binary=args.binary)
+        library = LibrarySystem(storage=BackgroundStorage(inner), archive=HistoryArchive(args.archive))
+    if library.load_errors:
+        print(f"⚠️ {len(library.load_errors)} records could not be loaded.")
+
+    server = LibraryServer((args.host, args.port), library, args.workers)
+    print(f"📚 Serving {library.stats()['total']} books on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        library.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
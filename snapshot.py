@@ -0,0 +1,135 @@
+"""
+Binary snapshots: a compact, fast-loading companion of each JSON data file.
+
+A snapshot sits next to its JSON file ("library_data.json" ->
+"library_data.snap") and holds the same rows, marshalled:
+
+    header   magic, format version, marshal version,
+             stamp (size, mtime_ns) of the JSON file when it was taken,
+             payload length, CRC-32 of the payload
+    payload  marshal.dumps(list of row dicts)
+
+It is only trusted when the header matches this build, the checksum
+verifies and the JSON file still has the recorded stamp; anything else
+(missing, corrupt, written by another version, JSON edited since) makes
+the caller fall back to the JSON file.
+
+Usage (JSON files and journal as the desktop app uses them):
+    python snapshot.py export        # Rewrite the JSON files (snapshots + journal)
+    python snapshot.py info          # Show whether each snapshot is usable
+"""
+import argparse
+import marshal
+import os
+import struct
+import zlib
+
+MAGIC = b"SLIBSNAP"
+VERSION = 1
+_HEADER = struct.Struct("<8sHHqqQI")
+
+
+def snapshot_path(path):
+    """The snapshot file that accompanies a JSON data file."""
+    return os.path.splitext(path)[0] + ".snap"
+
+
+def source_stamp(path):
+    """(size, mtime_ns) of a file, or (-1, -1) if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (-1, -1)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def dump(rows, f, source):
+    """
+    Writes a snapshot of `rows` to an open binary file.
+
+    Args:
+        rows (list): Row dicts, as written to the JSON file.
+        f (file): Binary file opened for writing.
+        source (str): Path of the JSON file the snapshot stands for.
+    """
+    payload = marshal.dumps(rows)
+    f.write(_HEADER.pack(MAGIC, VERSION, marshal.version, *source_stamp(source),
+                         len(payload), zlib.crc32(payload)))
+    f.write(payload)
+
+
+def write(path, rows, source):
+    """Atomically replaces the snapshot at `path`; returns its size in bytes."""
+    with open(path + ".tmp", "wb") as f:
+        dump(rows, f, source)
+        size = f.tell()
+    os.replace(path + ".tmp", path)
+    return size
+
+
+def read(path, source):
+    """
+    Returns the rows of a valid, up-to-date snapshot, or None.
+
+    Args:
+        path (str): Snapshot file.
+        source (str): Its JSON file; pass None to skip the staleness check.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return None
+            magic, version, marshal_version, size, mtime_ns, length, crc = _HEADER.unpack(header)
+            if (magic, version, marshal_version) != (MAGIC, VERSION, marshal.version):
+                return None
+            if source is not None and (size, mtime_ns) != source_stamp(source):
+                return None  # The JSON file was rewritten after this snapshot
+            payload = f.read(length)
+    except OSError:
+        return None
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        return None
+    try:
+        rows = marshal.loads(payload)
+    except (EOFError, ValueError, TypeError):
+        return None
+    return rows if isinstance(rows, list) else None
+
+
+def describe(path, source):
+    """One line about a snapshot's state, for the `info` command."""
+    if not os.path.exists(path):
+        return f"{path}: missing (the JSON file is used)"
+    if read(path, None) is None:
+        return f"{path}: unreadable or corrupt (the JSON file is used)"
+    if read(path, source) is None:
+        return f"{path}: stale, {source} changed since (the JSON file is used)"
+    return f"{path}: up to date ({os.path.getsize(path)} bytes, JSON {source_stamp(source)[0]} bytes)"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Binary snapshot tools.")
+    parser.add_argument("command", choices=["export", "info"])
+    parser.add_argument("--db", default="library_data.json", help="Books JSON file")
+    parser.add_argument("--borrow", default="borrow.json", help="Borrow history JSON file")
+    parser.add_argument("--journal", default="library.journal", help="Journal file ('' for none)")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        for source in (args.db, args.borrow):
+            print(describe(snapshot_path(source), source))
+        return
+
+    from storage import JsonStorage
+    from system import LibrarySystem
+
+    storage = JsonStorage(args.db, args.borrow, args.journal or None, shared=True, binary=True)
+    library = LibrarySystem(storage=storage)
+    library.export_json()
+    library.close()
+    print(f"✅ Exported {len(library.books)} books and {len(library.borrow_records)} records to JSON.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from collections import Counter
+from datetime import date
+
+
+class LibraryStats:
+    """
+    Incrementally maintained library counters.
+
+    LibrarySystem reports every change in book state here, so reading the
+    totals never scans the catalog. Active loans are bucketed by borrow day:
+    overdue counts and outstanding fines are derived from those buckets, so
+    they stay correct as days pass without any mutation, and computing them
+    costs O(distinct borrow days) rather than O(books).
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.total = 0
+        self.available = 0
+        self._loans_by_day = Counter()  # borrow day ordinal -> active loans
+
+    def rebuild(self, books):
+        """Recomputes every counter from scratch in one pass."""
+        self.total = 0
+        self.available = 0
+        self._loans_by_day.clear()
+        for book in books:
+            self.book_added(book)
+
+    def book_added(self, book):
+        self.total += 1
+        if book.is_available:
+            self.available += 1
+        elif book.borrow_day is not None:
+            self._loans_by_day[book.borrow_day] += 1
+
+    def book_removed(self, book):
+        self.total -= 1
+        if book.is_available:
+            self.available -= 1
+        elif book.borrow_day is not None:
+            self._drop_loan(book.borrow_day)
+
+    def loan_started(self, day):
+        self.available -= 1
+        if day is not None:
+            self._loans_by_day[day] += 1
+
+    def loan_ended(self, day):
+        self.available += 1
+        if day is not None:
+            self._drop_loan(day)
+
+    def _drop_loan(self, day):
+        self._loans_by_day[day] -= 1
+        if not self._loans_by_day[day]:
+            del self._loans_by_day[day]
+
+    def snapshot(self, today=None):
+        """
+        Returns the current counters.
+
+        Returns:
+            dict: total, available, borrowed, overdue, outstanding_fines.
+        """
+        today = (today or date.today()).toordinal()
+        loan_days, rate = self.policy.loan_days, self.policy.fine_per_day
+        overdue = 0
+        fines = 0
+        for day, count in self._loans_by_day.items():
+            late = today - day - loan_days
+            if late > 0:
+                overdue += count
+                fines += late * rate * count
+        return {
+            "total": self.total,
+            "available": self.available,
+            "borrowed": self.total - self.available,
+            "overdue": overdue,
+            "outstanding_fines": fines,
+        }
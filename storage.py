@@ -0,0 +1,923 @@
+import io
+import json
+import os
+import snapshot
+import threading
+from contextlib import contextmanager, nullcontext
+from journal import Journal
+from locking import FileLock
+from metrics import recorder
+
+
+class StorageBackend:
+    """
+    Interface between LibrarySystem and the place its data lives.
+
+    LibrarySystem keeps the working set in memory and hands every applied
+    mutation (an operation dict, see `LibrarySystem._apply`) to `commit`.
+    Rows are exchanged in the same dict schema as `Book.to_dict()` and
+    `BorrowRecord.to_dict()`.
+
+    Problems found while reading (e.g. a malformed line) are appended to
+    `load_errors` as readable strings instead of aborting the load.
+    """
+
+    shared = False  # True if other processes may write the same data
+    history = None  # SqliteHistory, if the backend can answer history queries itself
+    pending = 0  # Operations accepted but not yet durable (see BackgroundStorage)
+
+    def __init__(self):
+        self.load_errors = []
+
+    def load_books(self):
+        """Yields book rows in catalog order."""
+        raise NotImplementedError
+
+    def load_borrow_records(self):
+        """Yields borrow record rows, oldest first."""
+        raise NotImplementedError
+
+    def load_journal(self):
+        """Yields operations committed after the last snapshot."""
+        return iter(())
+
+    def save_books(self, rows):
+        """Rewrites the whole catalog from a list of book rows."""
+        raise NotImplementedError
+
+    def save_borrow_records(self, rows):
+        """Rewrites the whole borrow history from a list of record rows."""
+        raise NotImplementedError
+
+    def commit(self, library, op):
+        """Durably records one operation that has already been applied."""
+        raise NotImplementedError
+
+    def commit_batch(self, library, ops):
+        """Durably records several applied operations, ideally as one write."""
+        for op in ops:
+            self.commit(library, op)
+
+    def compact(self, library):
+        """Folds incremental state into a fresh snapshot, if the backend has any."""
+
+    def plan_compaction(self, library, pending, force=False):
+        """
+        Called under library.lock with `pending` operations applied but not
+        yet written: returns the state to snapshot once they are, if a
+        compaction is due (or forced), else None. See `write`.
+        """
+        return None
+
+    def write(self, library, ops, snapshot_rows=None):
+        """
+        Writes `ops`, then the `plan_compaction` result, without holding
+        library.lock (BackgroundStorage's writer thread).
+        """
+        if ops:
+            self.commit_batch(library, ops)
+
+    def transaction(self, library):
+        """
+        Context manager wrapped around every mutation, from validation to
+        commit. Backends shared between processes lock and catch up here.
+        """
+        return nullcontext()
+
+    def sync(self, library):
+        """Applies changes committed by other processes; True if there were any."""
+        return False
+
+    def export_json(self, library):
+        """Rewrites human-readable JSON data files from the current state."""
+        raise NotImplementedError
+
+    def rewrite_history(self, library):
+        """
+        Replaces the stored borrow history with the in-memory one after
+        records left it (see LibrarySystem.archive_history).
+        """
+        with library.lock:  # No commit may land between the snapshot and the rewrite
+            self.save_borrow_records([rec.to_dict() for rec in library.borrow_records])
+
+    def flush(self):
+        """Blocks until every commit so far is durable (no-op when commits are synchronous)."""
+
+    def poll(self):
+        """
+        Returns (ops_written, error) for each write finished since the last
+        call; synchronous backends report nothing since commit already returned.
+        """
+        return []
+
+    def close(self, library):
+        """Flushes pending state and releases resources."""
+
+
+class JsonStorage(StorageBackend):
+    """
+    The original flat-file format: `library_data.json` and `borrow.json`.
+
+    Files ending in `.ndjson` are read and written as newline-delimited JSON
+    (one record per line), which is streamed line by line and lets a single
+    bad line be reported and skipped. Everything else uses the JSON array
+    format, which is also parsed incrementally.
+
+    Without a journal every commit rewrites the affected file(s). With
+    `journal_file`, commits append to a Journal that is folded into the JSON
+    snapshots every `compact_every` entries and on close.
+
+    With `shared=True` several processes may use the same files. Every
+    transaction holds an advisory lock on "<db_file>.lock" and first catches
+    up with the other processes: new journal entries are applied
+    incrementally, while rewritten snapshots (a compaction, or a commit
+    without a journal), detected by their inode/mtime/size stamp, trigger a
+    full reload.
+
+    With `binary=True` every full rewrite also leaves a binary snapshot next
+    to each JSON file (see snapshot.py), which loads several times faster.
+    The JSON files stay authoritative, so processes opened without `binary`
+    can share the same files: a snapshot that is missing or older than its
+    JSON file is ignored and the JSON file loaded instead (fresh snapshots
+    are then left behind on close).
+    """
+
+    def __init__(self, db_file="library_data.json", borrow_file="borrow.json",
+                 journal_file=None, compact_every=1000, shared=False, binary=False):
+        super().__init__()
+        self.db_file = db_file
+        self.borrow_file = borrow_file
+        self.journal = Journal(journal_file) if journal_file else None
+        self.compact_every = compact_every
+        self.shared = shared
+        self.binary = binary
+        self.file_lock = FileLock(db_file + ".lock") if shared else None
+        self._stamp = None  # Snapshot stamp as of our last read or write
+        self._stale = set()  # JSON files loaded because their snapshot was unusable
+        if self.journal is not None:
+            with self.file_lock or nullcontext():
+                self.journal.recover(self._data_files())
+
+    def _data_files(self):
+        # Snapshots are listed even without `binary`: another process may write them
+        files = [self.db_file, self.borrow_file]
+        return files + [snapshot.snapshot_path(path) for path in files]
+
+    def load_books(self):
+        if self.shared:
+            self._stamp = self._snapshot_stamp()
+        return self._load_rows(self.db_file)
+
+    def load_borrow_records(self):
+        return self._load_rows(self.borrow_file)
+
+    def _load_rows(self, path):
+        if self.binary:
+            rows = snapshot.read(snapshot.snapshot_path(path), path)
+            if rows is not None:
+                self._stale.discard(path)
+                return iter(rows)
+            self._stale.add(path)
+        return iter_rows(path, self.load_errors)
+
+    def load_journal(self):
+        if self.journal is None:
+            return iter(())
+        return self.journal.replay()
+
+    def save_books(self, rows):
+        self._save_rows(self.db_file, rows, "bytes_written.books")
+
+    def save_borrow_records(self, rows):
+        self._save_rows(self.borrow_file, rows, "bytes_written.history")
+
+    def _save_rows(self, path, rows, label):
+        with open(path, "w", encoding="utf-8") as f:
+            write_rows(path, rows, f)
+            size = f.tell()
+        if self.binary:  # Written after the JSON file, so it records its final stamp
+            snapshot.write(snapshot.snapshot_path(path), rows, path)
+            self._stale.discard(path)
+        if recorder.enabled:
+            recorder.observe(label, size)
+        self._rewritten()
+
+    def commit(self, library, op):
+        self.commit_batch(library, [op])
+
+    def commit_batch(self, library, ops):
+        if self.journal is not None:
+            self.journal.append_many(ops)
+            if len(self.journal) >= self.compact_every:
+                self.compact(library)
+            return
+        library.save_data()
+        if any(op["op"] in ("borrow", "return") for op in ops):
+            library.save_borrow_data()
+
+    def compact(self, library):
+        if self.journal is None:
+            return
+        with self.transaction(library):
+            self._checkpoint(self._rows(library))
+
+    def plan_compaction(self, library, pending, force=False):
+        if self.journal is None:
+            return None
+        if force or len(self.journal) + pending >= self.compact_every:
+            return self._rows(library)
+        return None
+
+    def write(self, library, ops, snapshot_rows=None):
+        if self.journal is None:
+            return super().write(library, ops)
+        with self.transaction(library):
+            if ops:
+                self.journal.append_many(ops)
+            if snapshot_rows is not None:
+                self._checkpoint(snapshot_rows)
+
+    def _checkpoint(self, snapshots):
+        """Writes `snapshots` (rows keyed by JSON file) and truncates the journal."""
+        if self.binary:  # After the JSON files in the checkpoint (see _write_snapshot)
+            snapshots.update({snapshot.snapshot_path(path): rows
+                              for path, rows in list(snapshots.items())})
+        self.journal.checkpoint(snapshots, self._write_snapshot)
+        self._stale.clear()
+        self._rewritten()
+
+    def rewrite_history(self, library):
+        if self.journal is None:
+            return super().rewrite_history(library)
+        # Journaled borrows would be replayed over a rewritten file: checkpoint instead
+        with library.lock:
+            self.compact(library)
+
+    def export_json(self, library):
+        """
+        Rewrites the JSON files from the current state (they are kept current
+        anyway; this also folds the journal); in binary mode the snapshots
+        are rewritten after them, so they stay the ones loaded.
+        """
+        with self.transaction(library):
+            if self.journal is not None and len(self.journal):
+                self.compact(library)  # The JSON files must not predate the journal
+            for path, rows in self._rows(library).items():
+                with open(path + ".tmp", "w", encoding="utf-8") as f:
+                    write_rows(path, rows, f)
+                os.replace(path + ".tmp", path)
+                if self.binary:
+                    snapshot.write(snapshot.snapshot_path(path), rows, path)
+            self._stale.clear()
+            self._rewritten()
+
+    def _rows(self, library):
+        """Every book and borrow record as rows, keyed by their JSON file."""
+        with library.lock:
+            return {
+                self.db_file: [book.to_dict() for book in library.books],
+                self.borrow_file: [rec.to_dict() for rec in library.borrow_records],
+            }
+
+    def _write_snapshot(self, path, rows, f):
+        """Serializes one snapshot file for Journal.checkpoint (`f` is binary)."""
+        if path.endswith(".snap"):
+            source = self.db_file if path == snapshot.snapshot_path(self.db_file) else self.borrow_file
+            # The JSON file is already written to its temp file, whose size and
+            # mtime the rename keeps: stamp the snapshot with them
+            snapshot.dump(rows, f, source + ".tmp")
+            return
+        text = io.TextIOWrapper(f, encoding="utf-8")
+        write_rows(path, rows, text)
+        text.flush()
+        text.detach()
+
+    # ---------- Multi-process sharing ----------
+    def transaction(self, library):
+        if not self.shared:
+            return nullcontext()
+        return self._locked(library)
+
+    @contextmanager
+    def _locked(self, library):
+        # Nested inside another holder in this process (e.g. a batch the
+        # writer thread has not finished), nobody else can have written since
+        # that holder caught up, and our own writes may still be in progress
+        fresh = self.file_lock.acquire()
+        try:
+            if fresh:
+                self._catch_up(library)
+            yield
+        finally:
+            self.file_lock.release()
+
+    def sync(self, library):
+        if not self.shared or self._stamp is None:
+            return False
+        if self._snapshot_stamp() == self._stamp and not (
+            self.journal is not None and self.journal.has_unread()
+        ):
+            return False  # Cheap unlocked check: nothing changed
+        fresh = self.file_lock.acquire()
+        try:
+            return fresh and self._catch_up(library)
+        finally:
+            self.file_lock.release()
+
+    def _catch_up(self, library):
+        """Applies what other processes committed since our last read (lock held)."""
+        if self._stamp is None:
+            return False  # Still loading
+        with library.lock:
+            if self._snapshot_stamp() != self._stamp:
+                if self.journal is not None:
+                    self.journal.rewind()
+                library.reload()
+                return True
+            if self.journal is not None and self.journal.has_unread():
+                library.load_journal()
+                return True
+        return False
+
+    def _rewritten(self):
+        """
+        Records our own snapshot rewrite, so that a catch-up later in the same
+        transaction (e.g. a lazy history materialized by save_borrow_data)
+        does not mistake it for another process's and reload over pending work.
+        """
+        if self.shared:
+            self._stamp = self._snapshot_stamp()
+
+    def _snapshot_stamp(self):
+        """Identity of the current snapshot files; changes whenever one is rewritten."""
+        stamp = []
+        for path in self._data_files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                stamp.append(None)
+                continue
+            stamp.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        return tuple(stamp)
+
+    def close(self, library):
+        # A compaction also leaves fresh snapshots behind after a JSON fallback
+        if self.journal is not None:
+            if len(self.journal) or self._stale:
+                self.compact(library)
+            self.journal.close()
+        elif self._stale:
+            with self.transaction(library):
+                library.save_data()
+                library.save_borrow_data()
+
+
+class SqliteStorage(StorageBackend):
+    """
+    Stdlib sqlite3 backend (WAL mode).
+
+    Each operation is committed in its own transaction touching only the
+    affected rows, so the cost of a checkout does not depend on catalog or
+    history size.
+
+    The borrow history is also queryable in place (`history`, a
+    SqliteHistory): a LibrarySystem opened with `lazy_history=True` then
+    never loads it, and its log, borrower and analytics queries run as
+    indexed SQL, so memory use and startup time depend on the catalog only.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS books (
+            isbn         TEXT PRIMARY KEY,
+            title        TEXT NOT NULL,
+            author       TEXT NOT NULL,
+            is_available INTEGER NOT NULL DEFAULT 1,
+            borrow_man   TEXT,
+            borrow_date  TEXT
+        );
+        CREATE TABLE IF NOT EXISTS borrow_records (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            isbn        TEXT NOT NULL,
+            user_id     TEXT NOT NULL,
+            name        TEXT NOT NULL,
+            phone       TEXT NOT NULL,
+            borrow_date TEXT NOT NULL,
+            returned    INTEGER NOT NULL DEFAULT 0,
+            fine        NUMERIC NOT NULL DEFAULT 0,
+            return_date TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_borrow_isbn_returned
+            ON borrow_records (isbn, returned);
+        CREATE INDEX IF NOT EXISTS idx_borrow_user
+            ON borrow_records (user_id);
+    """
+
+    # Created after the return_date migration below
+    HISTORY_INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_borrow_returned
+            ON borrow_records (returned);
+        CREATE INDEX IF NOT EXISTS idx_borrow_date
+            ON borrow_records (borrow_date);
+        CREATE INDEX IF NOT EXISTS idx_borrow_return_date
+            ON borrow_records (return_date);
+        CREATE INDEX IF NOT EXISTS idx_borrow_phone
+            ON borrow_records (phone);
+        CREATE INDEX IF NOT EXISTS idx_borrow_numeric_user
+            ON borrow_records (CAST(user_id AS INTEGER))
+            WHERE user_id NOT GLOB '*[^0-9]*' AND user_id <> '';
+    """
+
+    def __init__(self, path="library.db"):
+        super().__init__()
+        self.path = path
+        import sqlite3  # Only the SQLite mode pays for the import
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(borrow_records)")}
+        if "return_date" not in columns:  # Databases created before return dates were kept
+            with self.conn:
+                self.conn.execute("ALTER TABLE borrow_records ADD COLUMN return_date TEXT")
+        self.conn.executescript(self.HISTORY_INDEXES)
+        if path != ":memory:":  # A private in-memory database has no second connection
+            self.history = SqliteHistory(path)
+
+    def load_books(self):
+        cur = self.conn.execute(
+            "SELECT title, author, isbn, is_available, borrow_man, borrow_date"
+            " FROM books ORDER BY rowid"
+        )
+        for title, author, isbn, available, borrow_man, borrow_date in cur:
+            yield {
+                "title": title,
+                "author": author,
+                "isbn": isbn,
+                "is_available": bool(available),
+                "borrow_man": borrow_man,
+                "borrow_date": borrow_date,
+            }
+
+    def load_borrow_records(self):
+        cur = self.conn.execute(
+            "SELECT isbn, user_id, name, phone, borrow_date, returned, fine, return_date"
+            " FROM borrow_records ORDER BY id"
+        )
+        for isbn, user_id, name, phone, borrow_date, returned, fine, return_date in cur:
+            yield {
+                "isbn": isbn,
+                "user_id": user_id,
+                "name": name,
+                "phone": phone,
+                "borrow_date": borrow_date,
+                "returned": bool(returned),
+                "fine": fine,
+                "return_date": return_date,
+            }
+
+    def save_books(self, rows):
+        with self.conn:
+            self.conn.execute("DELETE FROM books")
+            self._insert_books(rows)
+
+    def save_borrow_records(self, rows):
+        with self.conn:
+            self.conn.execute("DELETE FROM borrow_records")
+            self._insert_borrow_records(rows)
+
+    def import_rows(self, books, records):
+        """Bulk-inserts raw book and borrow rows in a single transaction."""
+        with self.conn:
+            self._insert_books(books)
+            self._insert_borrow_records(records)
+
+    def is_empty(self):
+        """True if neither table holds any rows."""
+        cur = self.conn.execute(
+            "SELECT EXISTS(SELECT 1 FROM books) OR EXISTS(SELECT 1 FROM borrow_records)"
+        )
+        return not cur.fetchone()[0]
+
+    def commit(self, library, op):
+        with self.conn:
+            self._write_op(op)
+
+    def commit_batch(self, library, ops):
+        with self.conn:
+            for op in ops:
+                self._write_op(op)
+
+    def _write_op(self, op):
+        """Executes the SQL for one operation inside the caller's transaction."""
+        kind = op["op"]
+        isbn = op["isbn"]
+        if kind == "add":
+            self.conn.execute(
+                "INSERT INTO books (isbn, title, author) VALUES (?, ?, ?)",
+                (isbn, op["title"], op["author"]),
+            )
+        elif kind == "delete":
+            self.conn.execute("DELETE FROM books WHERE isbn = ?", (isbn,))
+        elif kind == "borrow":
+            self.conn.execute(
+                "UPDATE books SET is_available = 0, borrow_man = ?, borrow_date = ?"
+                " WHERE isbn = ?",
+                (op["name"], op["date"], isbn),
+            )
+            self.conn.execute(
+                "INSERT INTO borrow_records (isbn, user_id, name, phone, borrow_date)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (isbn, op["user_id"], op["name"], op["phone"], op["date"]),
+            )
+        elif kind == "return":
+            self.conn.execute(
+                "UPDATE books SET is_available = 1, borrow_man = NULL, borrow_date = NULL"
+                " WHERE isbn = ?",
+                (isbn,),
+            )
+            self.conn.execute(
+                "UPDATE borrow_records SET returned = 1, fine = ?, return_date = ? WHERE id = ("
+                " SELECT id FROM borrow_records WHERE isbn = ? AND returned = 0"
+                " ORDER BY id DESC LIMIT 1)",
+                (op["fine"], op.get("date"), isbn),
+            )
+
+    def close(self, library):
+        if self.history is not None:
+            self.history.close()
+        self.conn.close()
+
+    def _insert_books(self, rows):
+        self.conn.executemany(
+            "INSERT INTO books (isbn, title, author, is_available, borrow_man, borrow_date)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                (r["isbn"], r["title"], r["author"], int(r["is_available"]),
+                 r.get("borrow_man"), r.get("borrow_date"))
+                for r in rows
+            ),
+        )
+
+    def _insert_borrow_records(self, rows):
+        self.conn.executemany(
+            "INSERT INTO borrow_records"
+            " (isbn, user_id, name, phone, borrow_date, returned, fine, return_date)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (r["isbn"], str(r["user_id"]), r["name"], r["phone"],
+                 r["borrow_date"], int(r["returned"]), r.get("fine", 0), r.get("return_date"))
+                for r in rows
+            ),
+        )
+
+
+class SqliteHistory:
+    """
+    Borrow-history queries answered by a SqliteStorage database.
+
+    Each thread reads through its own connection: in WAL mode it sees the
+    last committed state and never blocks the writer. Records come back as
+    rows in the `BorrowRecord.to_dict()` schema, newest or oldest first by
+    insertion order, as LibrarySystem keeps them; dates are ISO strings.
+    """
+
+    COLUMNS = "isbn, user_id, name, phone, borrow_date, returned, fine, return_date"
+
+    # The day a record came back; records saved before return dates were
+    # kept get CirculationStats.return_day's estimate
+    RETURN_DAY = (
+        "COALESCE(return_date, CASE WHEN fine > 0 AND :rate > 0"
+        " THEN date(borrow_date, '+' || (:days + CAST(fine / :rate AS INTEGER)) || ' days')"
+        " ELSE borrow_date END)"
+    )
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._conns = []
+        self._guard = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3
+
+            conn = self._local.conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self._guard:
+                self._conns.append(conn)
+        return conn
+
+    def _records(self, sql, params=()):
+        cur = self._conn().execute(sql, params)
+        for isbn, user_id, name, phone, borrow_date, returned, fine, return_date in cur:
+            yield {
+                "isbn": isbn,
+                "user_id": user_id,
+                "name": name,
+                "phone": phone,
+                "borrow_date": borrow_date,
+                "returned": bool(returned),
+                "fine": fine,
+                "return_date": return_date,
+            }
+
+    # ---------- Records ----------
+    def page(self, start, size, returned=None, first=None, last=None, user_id=None):
+        """
+        One page of records, newest first, and how many match the filters.
+
+        Args:
+            returned (bool, optional): Only returned (True) or open (False) loans.
+            first (str, optional): Earliest borrow date (inclusive).
+            last (str, optional): Latest borrow date (inclusive).
+            user_id (str, optional): Only this borrower's records.
+
+        Returns:
+            tuple: (rows, total).
+        """
+        where, params = [], []
+        for clause, value in (("user_id = ?", user_id), ("returned = ?", returned),
+                              ("borrow_date >= ?", first), ("borrow_date <= ?", last)):
+            if value is not None:
+                where.append(clause)
+                params.append(int(value) if type(value) is bool else str(value))
+        sql = " FROM borrow_records" + (" WHERE " + " AND ".join(where) if where else "")
+        total = self._conn().execute("SELECT COUNT(*)" + sql, params).fetchone()[0]
+        rows = list(self._records(f"SELECT {self.COLUMNS}{sql} ORDER BY id DESC LIMIT ? OFFSET ?",
+                                  params + [size, start]))
+        return rows, total
+
+    def for_user(self, user_id):
+        """Every record of a borrower, oldest first."""
+        return list(self._records(
+            f"SELECT {self.COLUMNS} FROM borrow_records WHERE user_id = ? ORDER BY id",
+            (str(user_id),),
+        ))
+
+    def active(self, isbn=None):
+        """Open loans (of one book, if given), oldest first."""
+        if isbn is None:
+            return list(self._records(
+                f"SELECT {self.COLUMNS} FROM borrow_records WHERE returned = 0 ORDER BY id"
+            ))
+        return list(self._records(
+            f"SELECT {self.COLUMNS} FROM borrow_records WHERE isbn = ? AND returned = 0 ORDER BY id",
+            (isbn,),
+        ))
+
+    def records(self):
+        """Yields every record, oldest first, straight from a cursor."""
+        return self._records(f"SELECT {self.COLUMNS} FROM borrow_records ORDER BY id")
+
+    # ---------- Borrowers ----------
+    def max_numeric_id(self):
+        """Highest all-digit user ID on record (an index lookup), or None."""
+        return self._conn().execute(
+            "SELECT MAX(CAST(user_id AS INTEGER)) FROM borrow_records"
+            " WHERE user_id NOT GLOB '*[^0-9]*' AND user_id <> ''"
+        ).fetchone()[0]
+
+    def borrower(self, user_id):
+        """
+        A borrower's profile: the latest loan's name and phone, the number of
+        loans and the latest borrow date ("last_date"); None if unknown.
+        """
+        conn = self._conn()
+        uid = str(user_id)
+        latest = conn.execute(
+            "SELECT name, phone, borrow_date FROM borrow_records WHERE user_id = ?"
+            " ORDER BY borrow_date DESC, id DESC LIMIT 1",
+            (uid,),
+        ).fetchone()
+        if latest is None:
+            return None
+        loans = conn.execute("SELECT COUNT(*) FROM borrow_records WHERE user_id = ?", (uid,)).fetchone()[0]
+        name, phone, last_date = latest
+        return {"user_id": uid, "name": name, "phone": str(phone), "loans": loans, "last_date": last_date}
+
+    def complete(self, prefix, limit=5):
+        """Profiles whose ID, then current phone, starts with `prefix` (index range scans)."""
+        prefix = str(prefix).strip()
+        if not prefix:
+            return []
+        bounds = (prefix, prefix + "\U0010ffff")
+        conn = self._conn()
+        found, seen = [], set()
+        for (uid,) in conn.execute(
+            "SELECT DISTINCT user_id FROM borrow_records WHERE user_id >= ? AND user_id < ?"
+            " ORDER BY user_id LIMIT ?", bounds + (limit,),
+        ):
+            seen.add(uid)
+            found.append(self.borrower(uid))
+        for phone, uid in conn.execute(
+            "SELECT DISTINCT phone, user_id FROM borrow_records WHERE phone >= ? AND phone < ?"
+            " ORDER BY phone, user_id", bounds,
+        ):
+            if len(found) >= limit:
+                break
+            if uid in seen:
+                continue
+            profile = self.borrower(uid)
+            if profile["phone"] == str(phone):  # Only the latest loan's phone counts
+                seen.add(uid)
+                found.append(profile)
+        return found
+
+    # ---------- Analytics ----------
+    def top_books(self, k=10):
+        """(isbn, loans) of the k most borrowed books, most first."""
+        return self._conn().execute(
+            "SELECT isbn, COUNT(*) AS loans FROM borrow_records GROUP BY isbn"
+            " ORDER BY loans DESC, MIN(id) LIMIT ?", (k,),
+        ).fetchall()
+
+    def book_totals(self):
+        """Yields (isbn, loans) for every book ever borrowed, in first-loan order."""
+        return iter(self._conn().execute(
+            "SELECT isbn, COUNT(*) FROM borrow_records GROUP BY isbn ORDER BY MIN(id)"
+        ))
+
+    def borrower_totals(self, k=None, field=0):
+        """
+        (user_id, [loans, returns, fines]) per borrower, in first-loan order,
+        or the k highest on `field` (an index into that list).
+        """
+        sql = ("SELECT user_id, COUNT(*) AS loans, SUM(returned) AS returns, SUM(fine) AS fines"
+               " FROM borrow_records GROUP BY user_id")
+        if k is None:
+            cur = self._conn().execute(sql + " ORDER BY MIN(id)")
+        else:
+            order = ("loans", "returns", "fines")[field]
+            cur = self._conn().execute(sql + f" ORDER BY {order} DESC, MIN(id) LIMIT ?", (k,))
+        for uid, loans, returns, fines in cur:
+            yield uid, [loans, returns, fines]
+
+    def month_totals(self, lo, hi, loan_days, fine_rate):
+        """
+        [loans, returns, fines] per "YYYY-MM" month from `lo` to `hi`
+        (inclusive), oldest first; see CirculationStats for the counting.
+
+        Returns:
+            list: (month, [loans, returns, fines]) pairs.
+        """
+        params = {"lo": lo, "hi": hi + "~", "days": loan_days, "rate": fine_rate}
+        conn = self._conn()
+        months = {}
+        for month, loans in conn.execute(
+            "SELECT substr(borrow_date, 1, 7) AS month, COUNT(*) FROM borrow_records"
+            " WHERE borrow_date >= :lo AND borrow_date < :hi GROUP BY month", params,
+        ):
+            months[month] = [loans, 0, 0]
+        for month, returns, fines in conn.execute(
+            f"SELECT substr(day, 1, 7) AS month, COUNT(*), SUM(fine) FROM ("
+            f" SELECT {self.RETURN_DAY} AS day, fine FROM borrow_records WHERE returned = 1"
+            f" AND (return_date >= :lo AND return_date < :hi OR return_date IS NULL))"
+            f" WHERE day >= :lo AND day < :hi GROUP BY month", params,
+        ):
+            row = months.setdefault(month, [0, 0, 0])
+            row[1] += returns
+            row[2] += fines
+        return sorted(months.items())
+
+    def close(self):
+        with self._guard:
+            for conn in self._conns:
+                conn.close()
+            self._conns = []
+
+
+def is_ndjson(path):
+    """True if `path` uses the newline-delimited JSON format."""
+    return path.endswith(".ndjson")
+
+
+def iter_rows(path, errors):
+    """Streams the records of a data file (array or NDJSON); missing file = empty."""
+    if not os.path.exists(path):
+        return iter(())
+    if is_ndjson(path):
+        return iter_ndjson(path, errors)
+    return iter_json_array(path, errors)
+
+
+def write_rows(path, rows, f):
+    """Writes records to an open file in the format implied by `path`."""
+    if is_ndjson(path):
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+    else:
+        json.dump(rows, f, indent=4, ensure_ascii=False)
+
+
+def iter_ndjson(path, errors):
+    """
+    Yields one record per non-blank line.
+
+    A line that is not a JSON object is reported in `errors` as
+    "<path>:<line>: <reason>" and skipped; the rest of the file still loads.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                errors.append(f"{path}:{lineno}: {e}")
+                continue
+            if not isinstance(row, dict):
+                errors.append(f"{path}:{lineno}: expected a JSON object")
+                continue
+            yield row
+
+
+def iter_json_array(path, errors, chunk_size=1 << 16):
+    """
+    Yields the elements of a top-level JSON array without loading the file.
+
+    The file is read in chunks and each element is decoded as soon as it is
+    complete. A syntax error stops the stream (the array cannot be
+    resynchronized) but is reported in `errors` with the element number, and
+    every element read before it is kept.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def read_more():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def peek():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not read_more():
+                    return ""
+
+        if peek() != "[":
+            errors.append(f"{path}: expected a JSON array")
+            return
+        pos += 1
+        if peek() == "]":
+            return
+
+        index = 0
+        while True:
+            index += 1
+            peek()
+            while True:
+                try:
+                    row, pos = decoder.raw_decode(buf, pos)
+                    break
+                except json.JSONDecodeError as e:
+                    if eof or not read_more():
+                        # e.lineno/colno are relative to the buffer, not the file
+                        errors.append(f"{path}: element {index}: {e.msg}")
+                        return
+            if isinstance(row, dict):
+                yield row
+            else:
+                errors.append(f"{path}: element {index}: expected a JSON object")
+
+            sep = peek()
+            if sep == ",":
+                pos += 1
+            elif sep == "]":
+                return
+            else:
+                errors.append(f"{path}: element {index}: expected ',' or ']'")
+                return
+
+
+def convert_to_ndjson(src, dst):
+    """
+    Streams a JSON array data file into NDJSON, one record per line.
+
+    Returns:
+        tuple: (records written, list of problems found in `src`)
+    """
+    errors = []
+    count = 0
+    with open(dst, "w", encoding="utf-8") as f:
+        for row in iter_json_array(src, errors):
+            write_rows(dst, [row], f)
+            count += 1
+    return count, errors
+
+
+recorder.instrument(JsonStorage, "commit_batch", "compact", "write")
+recorder.instrument(SqliteStorage, "commit_batch")
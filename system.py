@@ -1,31 +1,94 @@
-import json
-import os
-from datetime import date, timedelta
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+from itertools import chain
+from analytics import REPORTS, CirculationStats, month_of, ranking_field, write_report
+from archive import month_bounds
 from book import Book
+from borrowers import Borrower, BorrowerRegistry
 from borrow_record import BorrowRecord
+from dates import parse_day
+from events import OP_KINDS, RELOADED, EventBus
+from loans import LoanIndex
+from overdue import LoanPolicy, OverdueTracker
+from query import QueryIndex, parse_query, sort_books
+from search import SearchIndex
+from stats import LibraryStats
+from metrics import recorder
+from storage import JsonStorage
 
 class LibrarySystem:
     """
     The Core Engine (Controller) of the application.
-    Handles data persistence (JSON), business logic, and transaction management.
+    Handles business logic and transaction management; persistence is
+    delegated to a StorageBackend (JSON files by default, see storage.py).
+
+    Every mutation is expressed as an operation dict (see `_apply`) that is
+    applied in memory and then handed to the backend's `commit`.
+
+    With `lazy_history=True` the borrow history is not read at startup; it is
+    materialized the first time `borrow_records` is accessed, and borrow/return
+    operations made before that are queued and applied on top of it.
+
+    Records that cannot be loaded are skipped and described in `load_errors`.
+    Loan period and fine rate come from `policy` (a LoanPolicy).
+
+    `lock` serializes mutations with snapshot building, so a storage backend
+    may persist from another thread (see writer.BackgroundStorage). Each
+    mutation also runs inside the backend's `transaction`, where a backend
+    shared with other processes locks the files and catches up first.
+
+    Every applied operation (including journal entries replayed from other
+    processes) and every reload is published on `events` (an EventBus).
+
+    With an `archive` (a HistoryArchive), `archive_history` moves old
+    returned records out of the history; `borrow_records` then only holds
+    the hot part, while `borrow_log` and the analytics also read the
+    archived months a query's date range needs.
+
+    If the backend can query the history in place (`storage.history`, see
+    storage.SqliteHistory) and it has not been loaded (`lazy_history=True`,
+    no archive), the history queries below run there instead, and borrows
+    and returns are not queued for a later load.
     """
-    def __init__(self, db_file="library_data.json", borrow_file="borrow.json"):
-        self.db_file = db_file
-        self.borrow_file = borrow_file
-        self.books = []
-        self.borrow_records = []
+    def __init__(self, db_file="library_data.json", borrow_file="borrow.json",
+                 journal_file=None, compact_every=1000, storage=None,
+                 lazy_history=False, policy=None, archive=None):
+        if storage is None:
+            storage = JsonStorage(db_file, borrow_file, journal_file, compact_every)
+        self.storage = storage
+        self.policy = policy or LoanPolicy()
+        self.lock = threading.RLock()
+        self.load_errors = storage.load_errors
+        self._books = {}  # Primary index: ISBN -> Book (insertion ordered)
+        self._borrow_records = None  # None until the history is materialized
+        self._pending_history = []
+        self.search_index = SearchIndex()
+        self.query_index = QueryIndex()
+        self.counters = LibraryStats(self.policy)
+        self.loans = LoanIndex()
+        self.borrowers = BorrowerRegistry()
+        self.circulation = CirculationStats(self.policy)
+        self.overdue = OverdueTracker(self.policy)
+        self.events = EventBus()
+        self.archive = archive
+        self._folded = set()  # Archived months already added to `circulation`
+        if archive is not None:
+            archive.errors = self.load_errors
 
-        self.load_data()
-        self.load_borrow_data()
+        with storage.transaction(self):
+            self.load_data()
+            if not lazy_history:
+                self.load_borrow_data()
+            self.build_indexes()
+            self.load_journal()
 
     def load_data(self):
-        """Loads book records from the JSON database file."""
-        if not os.path.exists(self.db_file):
-            return
+        """Loads book records from the storage backend, skipping invalid ones."""
         try:
-            with open(self.db_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                for item in data:
+            for n, item in enumerate(self.storage.load_books(), 1):
+                try:
                     book = Book(
                         item["title"],
                         item["author"],
@@ -34,112 +97,954 @@ class LibrarySystem:
                         item["is_available"],
                         item.get("borrow_date"),
                     )
-                    self.books.append(book)
-        except:
-            self.books = []
+                except (KeyError, TypeError) as e:
+                    self.load_errors.append(f"Book #{n} skipped: missing or invalid {e}")
+                    continue
+                self._books[book.isbn] = book
+        except (OSError, ValueError) as e:
+            self.load_errors.append(f"Could not read books: {e}")
+
+    @property
+    def books(self):
+        """Live, insertion-ordered view of every Book in the catalog."""
+        return self._books.values()
+
+    def get_book(self, isbn):
+        """Returns the Book with the given ISBN, or None (O(1) index lookup)."""
+        return self._books.get(isbn)
+
+    def search(self, term):
+        """Returns the books whose title, author or ISBN contain `term`, in catalog order."""
+        return [self._books[isbn] for isbn in self.search_index.search(term)]
+
+    def query(self, text, sort=None, limit=None, today=None):
+        """
+        Runs a structured query by intersecting the secondary indexes, e.g.
+        'author:hassan status:borrowed borrowed_before:2026-01-01 sort:title'
+        (syntax in query.parse_query).
+
+        Args:
+            text (str): The query; plain text behaves exactly like `search`.
+            sort (str, optional): Overrides the query's sort: ("-" for descending).
+            limit (int, optional): Overrides the query's limit:.
+            today (date, optional): Reference day for status:overdue.
+
+        Returns:
+            list: Matching Books, in catalog order unless sorted.
+
+        Raises:
+            ValueError: For a malformed filter (the message is user-facing).
+        """
+        q = parse_query(text)
+        filters, index = q.filters, self.query_index
+        status = filters.get("status")
+        sets = []
+        if "author" in filters:
+            sets.append(index.by_author(filters["author"]))
+        if "borrower" in filters:
+            sets.append(index.by_borrower(filters["borrower"]))
+        if "borrowed_before" in filters or "borrowed_after" in filters:
+            sets.append(index.borrowed_between(filters.get("borrowed_after"), filters.get("borrowed_before")))
+        if status == "borrowed":
+            sets.append(index.borrowed)
+        elif status == "overdue":
+            sets.append({isbn for isbn, _ in self.overdue.overdue(today)})
+
+        candidates = None  # None: no structured constraint
+        for found in sorted(sets, key=len):
+            candidates = found if candidates is None else candidates & found
+
+        if q.text or candidates is None:
+            isbns = self.search_index.search(q.text)
+            if candidates is not None:
+                isbns = [isbn for isbn in isbns if isbn in candidates]
+        else:
+            isbns = self.search_index.in_catalog_order(candidates)
+        if status == "available":
+            isbns = [isbn for isbn in isbns if isbn not in index.borrowed]
+        return sort_books([self._books[isbn] for isbn in isbns], sort or q.sort, limit or q.limit)
+
+    def stats(self, today=None):
+        """Live totals: total, available, borrowed, overdue and outstanding_fines (EGP)."""
+        return self.counters.snapshot(today)
+
+    def overdue_loans(self, today=None, limit=None):
+        """
+        Borrowed books past their due date, most overdue first.
+
+        Returns:
+            list: (Book, days_late, fine) tuples.
+        """
+        rate = self.policy.fine_per_day
+        return [
+            (self._books[isbn], late, late * rate)
+            for isbn, late in self.overdue.overdue(today, limit)
+        ]
+
+    def fine_report(self, today=None):
+        """
+        Fines accrued by every active loan, computed in one batched pass.
+
+        Returns:
+            dict: "isbns" and "fines" (parallel lists), "overdue" (loans with a
+            fine) and "total" (EGP).
+        """
+        isbns, fines = self.overdue.fines(today)
+        return {
+            "isbns": isbns,
+            "fines": fines,
+            "overdue": sum(1 for f in fines if f),
+            "total": sum(fines),
+        }
 
     def save_data(self):
-        """Saves current book state to the JSON database."""
-        data = [book.to_dict() for book in self.books]
-        with open(self.db_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        """Saves current book state through the storage backend."""
+        with self.lock:
+            rows = [book.to_dict() for book in self.books]
+        self.storage.save_books(rows)
+
+    @property
+    def borrow_records(self):
+        """
+        Borrow history, oldest first (materialized on first access); with an
+        archive, only the records that have not been archived.
+        """
+        self._ensure_history()
+        return self._borrow_records
+
+    def _ensure_history(self):
+        """Loads a lazily deferred borrow history."""
+        while self._borrow_records is None:
+            direct = self.storage.history is not None
+            if direct:
+                # Nothing was queued for this load, so the database must hold
+                # every borrow and return: wait for the writer (without the lock)
+                self.storage.flush()
+            # In a transaction: a shared backend reloads everything if the
+            # snapshots changed since startup, so the history read here always
+            # matches the catalog it is applied to.
+            with self.storage.transaction(self), self.lock:
+                if self._borrow_records is None and not (direct and self.storage.pending):
+                    self.load_borrow_data()
+
+    def load_history(self):
+        """
+        Reads a lazily deferred history now (e.g. from a background thread,
+        before the first query needs it); a no-op when the backend answers
+        the history queries itself.
+        """
+        if self.storage.history is None or self.archive is not None:
+            self._ensure_history()
+
+    def _history_queries(self):
+        """
+        The backend's SqliteHistory while the history is not loaded (and
+        there is no archive), once it holds every change so far; else None.
+        """
+        history = self.storage.history
+        if history is None or self.archive is not None or self._borrow_records is not None:
+            return None
+        self.storage.flush()
+        return history
 
     def load_borrow_data(self):
-        """Loads transaction history from the JSON borrow file."""
-        if not os.path.exists(self.borrow_file):
-            return
+        """Loads transaction history from the storage backend, skipping invalid records."""
+        records = []
         try:
-            with open(self.borrow_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                for item in data:
+            for n, item in enumerate(self.storage.load_borrow_records(), 1):
+                try:
                     rec = BorrowRecord(
                         item["isbn"],
                         item["user_id"],
                         item["name"],
                         item["phone"],
-                        date.fromisoformat(item["borrow_date"]),
+                        item["borrow_date"],
                         item["returned"],
                         item.get("fine", 0),
+                        item.get("return_date"),
                     )
-                    self.borrow_records.append(rec)
-        except:
-            self.borrow_records = []
+                except (KeyError, TypeError) as e:
+                    self.load_errors.append(f"Borrow record #{n} skipped: missing or invalid {e}")
+                    continue
+                if rec.borrow_day is None:
+                    self.load_errors.append(f"Borrow record #{n} skipped: invalid 'borrow_date'")
+                    continue
+                records.append(rec)
+        except (OSError, ValueError) as e:
+            self.load_errors.append(f"Could not read borrow history: {e}")
+        if self.archive is not None and self.archive.load() and self.archive.pending:
+            # An archiving run was interrupted before the history was rewritten
+            archived = self.archive.duplicates()
+            kept = []
+            for rec in records:
+                key = (rec.isbn, str(rec.user_id), rec.borrow_day)
+                if archived[key]:
+                    archived[key] -= 1
+                else:
+                    kept.append(rec)
+            records[:] = kept
+        # Published complete: borrow_records only takes the lock while it is None
+        self._borrow_records = records
+        self._index_history()
+
+        pending, self._pending_history = self._pending_history, []
+        for op in pending:
+            self._apply_history(op)
+
+    def _index_history(self):
+        """Rebuilds the borrow-history indexes (archived borrowers included)."""
+        records = self._borrow_records
+        self.loans.rebuild(records)
+        self.borrowers.rebuild(records, self.archive.profiles() if self.archive else ())
+        self.circulation.rebuild(records)
+        self._folded = set()
+
+    def archive_history(self, today=None):
+        """
+        Moves returned records borrowed more than `archive.max_age_days`
+        before `today` (default: now) from the history to the archive.
+
+        The archive commits the records first, then the stored history is
+        rewritten without them; if that is interrupted, the next load drops
+        the duplicates and the next run finishes the rewrite.
+
+        Returns:
+            int: Number of records archived.
+
+        Raises:
+            OSError: A file could not be written.
+            ValueError: The archive manifest cannot be read.
+        """
+        if self.archive is None:
+            return 0
+        self._ensure_history()  # Also reads the manifest
+        if self.archive.broken:
+            raise ValueError("⚠️ The history archive manifest cannot be read; repair it first.")
+        cutoff = (today or date.today()).toordinal() - self.archive.max_age_days
+        with self.storage.transaction(self):
+            with self.lock:
+                records = self._borrow_records
+                old = [rec for rec in records if rec.returned and rec.borrow_day < cutoff]
+                if not old and not self.archive.pending:
+                    return 0
+                if old:
+                    self.archive.append(old, self.circulation.return_day)
+                    records[:] = [rec for rec in records
+                                  if not rec.returned or rec.borrow_day >= cutoff]
+                    self._index_history()
+            # Outside the lock: a background writer needs it to drain first
+            self.storage.rewrite_history(self)
+            self.archive.commit()
+        return len(old)
+
+    def active_loan(self, isbn):
+        """Returns the open BorrowRecord for a book, or None (O(1))."""
+        history = self._history_queries()
+        if history is not None:
+            rows = history.active(isbn)
+            return _record(rows[-1]) if rows else None
+        self._ensure_history()
+        return self.loans.active(isbn)
+
+    def loans_for_user(self, user_id):
+        """Returns every non-archived BorrowRecord of a borrower, oldest first."""
+        history = self._history_queries()
+        if history is not None:
+            return [_record(row) for row in history.for_user(user_id)]
+        self._ensure_history()
+        return list(self.loans.for_user(user_id))
+
+    def active_loans(self):
+        """Returns every open BorrowRecord."""
+        history = self._history_queries()
+        if history is not None:
+            return [_record(row) for row in history.active()]
+        self._ensure_history()
+        return list(self.loans.all_active())
+
+    def next_user_id(self):
+        """Suggests a borrower ID: one past the highest numeric ID on record (O(1))."""
+        history = self._history_queries()
+        if history is not None:
+            top = history.max_numeric_id()
+            return self.borrowers.first_id if top is None else top + 1
+        self._ensure_history()
+        return self.borrowers.next_id()
+
+    def get_borrower(self, user_id):
+        """Returns the Borrower profile for an ID, or None."""
+        history = self._history_queries()
+        if history is not None:
+            profile = history.borrower(user_id)
+            return _borrower(profile) if profile else None
+        self._ensure_history()
+        return self.borrowers.get(user_id)
+
+    def find_borrowers(self, prefix, limit=5):
+        """Known borrowers whose ID or phone starts with `prefix`, ID matches first."""
+        history = self._history_queries()
+        if history is not None:
+            return [_borrower(profile) for profile in history.complete(prefix, limit)]
+        self._ensure_history()
+        with self.lock:
+            return self.borrowers.complete(prefix, limit)
+
+    # ---------- Analytics ----------
+    def top_books(self, k=10):
+        """The k most borrowed books (deleted ones included), most loans first."""
+        history = self._history_queries()
+        if history is not None:
+            top = history.top_books(k)
+            with self.lock:
+                return [self._book_row(isbn, loans) for isbn, loans in top]
+        self._ensure_history()
+        with self.lock:
+            self._fold_archive()
+            return [self._book_row(isbn, loans) for isbn, loans in self.circulation.top_books(k)]
+
+    def top_borrowers(self, k=10, by="loans"):
+        """The k borrowers with the most loans, returns or fines (`by`), highest first."""
+        history = self._history_queries()
+        if history is not None:
+            top = history.borrower_totals(k, ranking_field(by))
+            return [self._borrower_row(uid, totals, history) for uid, totals in top]
+        self._ensure_history()
+        with self.lock:
+            self._fold_archive()
+            return [self._borrower_row(uid, totals)
+                    for uid, totals in self.circulation.top_borrowers(k, by)]
+
+    def monthly_totals(self, date_from=None, date_to=None):
+        """
+        Loans, returns and fines (EGP) per "YYYY-MM" month, oldest first.
+
+        Args:
+            date_from (date, optional): Only months from this one on.
+            date_to (date, optional): Only months up to this one.
+        """
+        first = date_from.toordinal() if date_from else None
+        last = date_to.toordinal() if date_to else None
+        lo = month_of(first) if first is not None else ""
+        hi = month_of(last) if last is not None else "9999-99"
+        history = self._history_queries()
+        if history is not None:
+            totals = history.month_totals(lo, hi, self.policy.loan_days, self.policy.fine_per_day)
+            return [{"month": month, "loans": loans, "returns": returns, "fines": fines}
+                    for month, (loans, returns, fines) in totals]
+        self._ensure_history()
+        with self.lock:
+            if self.archive is not None:
+                self._fold_archive(self.archive.contributing(first, last))
+            return [row for row in self._report_rows("months") if lo <= row["month"] <= hi]
+
+    def report(self, kind):
+        """
+        Yields the rows of a circulation report (see analytics.REPORTS).
+
+        Rows are built one at a time from the live aggregates: iterate it
+        under `lock` if other threads may be mutating (export_report does).
+        """
+        if kind not in REPORTS:
+            raise ValueError(f"⚠️ Unknown report '{kind}' (use {', '.join(REPORTS)}).")
+        history = self._history_queries()
+        if history is not None:
+            return self._queried_report_rows(history, kind)
+        self._ensure_history()
+        if kind != "history":
+            with self.lock:
+                self._fold_archive()
+        return self._report_rows(kind)
+
+    def _fold_archive(self, months=None):
+        """Adds archived months (default: all) to `circulation` the first time they are needed."""
+        if self.archive is None:
+            return
+        for month in self.archive.months() if months is None else months:
+            if month not in self._folded:
+                self._folded.add(month)
+                self.circulation.add_records(list(self.archive.iter_records([month])))
+
+    def _report_rows(self, kind):
+        if kind == "books":
+            for isbn, loans in self.circulation.loans_by_isbn.items():
+                yield self._book_row(isbn, loans)
+        elif kind == "months":
+            for month, (loans, returns, fines) in self.circulation.months():
+                yield {"month": month, "loans": loans, "returns": returns, "fines": fines}
+        elif kind == "borrowers":
+            for uid, totals in self.circulation.borrowers():
+                yield self._borrower_row(uid, totals)
+        else:
+            books = self._books
+            archived = self.archive.iter_records() if self.archive is not None else ()
+            for rec in chain(archived, self._borrow_records):
+                book = books.get(rec.isbn)
+                row = rec.to_dict()
+                row["title"] = book.title if book else "Unknown"
+                yield row
+
+    def _queried_report_rows(self, history, kind):
+        """_report_rows computed by SQL aggregation over the database's history."""
+        if kind == "books":
+            for isbn, loans in history.book_totals():
+                yield self._book_row(isbn, loans)
+        elif kind == "months":
+            for month, (loans, returns, fines) in history.month_totals(
+                "", "9999-99", self.policy.loan_days, self.policy.fine_per_day
+            ):
+                yield {"month": month, "loans": loans, "returns": returns, "fines": fines}
+        elif kind == "borrowers":
+            for uid, totals in history.borrower_totals():
+                yield self._borrower_row(uid, totals, history)
+        else:
+            books = self._books
+            for row in history.records():
+                book = books.get(row["isbn"])
+                row["title"] = book.title if book else "Unknown"
+                yield row
+
+    def export_report(self, kind, f, fmt="csv"):
+        """
+        Streams a circulation report to an open text file as CSV or NDJSON.
+
+        Returns:
+            int: Number of rows written.
+        """
+        if kind in REPORTS and self._history_queries() is not None:
+            # Read from the database: mutations need not wait for the export
+            return write_report(self.report(kind), f, fmt, REPORTS[kind])
+        self._ensure_history()
+        with self.lock:
+            return write_report(self.report(kind), f, fmt, REPORTS[kind])
+
+    def _book_row(self, isbn, loans):
+        book = self._books.get(isbn)
+        return {
+            "isbn": isbn,
+            "title": book.title if book else "Unknown",
+            "author": book.author if book else "Unknown",
+            "loans": loans,
+        }
+
+    def _borrower_row(self, user_id, totals, history=None):
+        if history is not None:
+            profile = history.borrower(user_id)
+            borrower = _borrower(profile) if profile else None
+        else:
+            borrower = self.borrowers.get(user_id)
+        loans, returns, fines = totals
+        return {
+            "user_id": user_id,
+            "name": borrower.name if borrower else "",
+            "phone": borrower.phone if borrower else "",
+            "loans": loans,
+            "returns": returns,
+            "fines": fines,
+        }
+
+    def borrow_log(self, page=0, page_size=50, status=None, date_from=None,
+                   date_to=None, user_id=None):
+        """
+        Returns one page of the borrow history, newest first, joined to book titles.
+
+        Args:
+            page (int): Zero-based page number.
+            page_size (int): Records per page.
+            status (str, optional): "active" or "returned".
+            date_from (date, optional): Earliest borrow date (inclusive).
+            date_to (date, optional): Latest borrow date (inclusive).
+            user_id (str, optional): Only this borrower's records.
+
+        Returns:
+            tuple: (rows, total) where rows is a list of (BorrowRecord, title)
+            and total is the number of records matching the filters.
+        """
+        history = self._history_queries()
+        if history is not None:
+            rows, total = history.page(
+                page * page_size, page_size,
+                returned={"active": False, "returned": True}.get(status),
+                first=date_from.isoformat() if date_from else None,
+                last=date_to.isoformat() if date_to else None,
+                user_id=user_id or None,
+            )
+            return self._log_rows([_record(row) for row in rows]), total
+        self._ensure_history()
+        if user_id:
+            records = self.loans.for_user(user_id)
+        elif status == "active":
+            records = list(self.loans.all_active())
+        else:
+            records = self._borrow_records
+
+        lo, hi = 0, len(records)
+        first = date_from.toordinal() if date_from else None
+        last = date_to.toordinal() if date_to else None
+        if self.archive is not None and status != "active":
+            months = self.archive.months(first, last)
+            if months:
+                selected, total = self._merged_log(
+                    records, months, page * page_size, page_size,
+                    status == "returned", first, last, user_id,
+                )
+                return self._log_rows(selected), total
+        if self.loans.chronological:
+            # Sorted by borrow day: narrow the date range by bisection
+            if first is not None:
+                lo = bisect_left(records, first, key=_borrow_day)
+            if last is not None:
+                hi = max(lo, bisect_right(records, last, key=_borrow_day))  # date_to < date_from: empty
+            first = last = None
+        returned = {"active": False, "returned": True}.get(status)
+
+        start = page * page_size
+        if returned is None and first is None and last is None:
+            total = hi - lo
+            end = hi - start
+            selected = records[max(lo, end - page_size):end][::-1] if end > lo else []
+        else:
+            total = 0
+            selected = []
+            for i in range(hi - 1, lo - 1, -1):
+                rec = records[i]
+                if returned is not None and rec.returned != returned:
+                    continue
+                if first is not None and rec.borrow_day < first:
+                    continue
+                if last is not None and rec.borrow_day > last:
+                    continue
+                if start <= total < start + page_size:
+                    selected.append(rec)
+                total += 1
+        return self._log_rows(selected), total
+
+    def _log_rows(self, selected):
+        books = self._books
+        rows = []
+        for rec in selected:
+            book = books.get(rec.isbn)
+            rows.append((rec, book.title if book else "Unknown"))
+        return rows
+
+    def _merged_log(self, records, months, start, page_size, only_returned, first, last, user_id):
+        """
+        borrow_log over the hot records plus archived months (all returned).
+
+        Months are walked newest first and each one's archived records are
+        merged with its hot ones by borrow day. A month wholly inside the
+        date range, without a borrower filter, is counted (and skipped while
+        paging) from the manifest, so only the months shown are read.
+
+        Returns:
+            tuple: (selected records, total matching).
+        """
+        if not self.loans.chronological:
+            records = sorted(records, key=_borrow_day)
+        lo = 0 if first is None else bisect_left(records, first, key=_borrow_day)
+        hi = len(records) if last is None else max(lo, bisect_right(records, last, key=_borrow_day))
+        uid = str(user_id) if user_id else None
+
+        def archived(month):
+            recs = self.archive.read(month)
+            if uid is None and counted(month):
+                return recs
+            return [rec for rec in recs
+                    if (first is None or rec.borrow_day >= first)
+                    and (last is None or rec.borrow_day <= last)
+                    and (uid is None or str(rec.user_id) == uid)]
+
+        def counted(month):
+            m_lo, m_hi = month_bounds(month)
+            return uid is None and (first is None or first <= m_lo) and (last is None or last >= m_hi - 1)
+
+        sizes = {m: self.archive.segments[m].records if counted(m) else len(archived(m))
+                 for m in months}
+        if only_returned:
+            total = sum(1 for i in range(lo, hi) if records[i].returned)
+        else:
+            total = hi - lo
+        total += sum(sizes.values())
+
+        selected = []
+        skip = start
+
+        def take(recs):
+            """Pages through records given newest first; True once the page is full."""
+            nonlocal skip
+            for rec in recs:
+                if only_returned and not rec.returned:
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                selected.append(rec)
+                if len(selected) == page_size:
+                    return True
+            return False
+
+        i = hi  # Hot records [i, hi) are already paged
+        for month in reversed(months):
+            m_lo, m_hi = month_bounds(month)
+            newer = max(lo, min(i, bisect_left(records, m_hi, key=_borrow_day)))
+            if not only_returned and skip >= i - newer:
+                skip -= i - newer  # Hot records newer than the month, counted by position
+            elif take(records[k] for k in range(i - 1, newer - 1, -1)):
+                return selected, total
+            j = max(lo, min(newer, bisect_left(records, m_lo, key=_borrow_day)))
+            hot = [rec for rec in records[j:newer] if rec.returned or not only_returned]
+            i = j
+            if skip >= len(hot) + sizes[month]:
+                skip -= len(hot) + sizes[month]
+                continue
+            if take(heapq.merge(reversed(hot), reversed(archived(month)),
+                                key=_borrow_day, reverse=True)):
+                return selected, total
+        take(records[k] for k in range(i - 1, lo - 1, -1))
+        return selected, total
 
     def save_borrow_data(self):
-        """Saves all borrow/return transactions to the JSON logs."""
-        data = [rec.to_dict() for rec in self.borrow_records]
-        with open(self.borrow_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        """Saves all borrow/return transactions through the storage backend."""
+        with self.lock:
+            rows = [rec.to_dict() for rec in self.borrow_records]
+        self.storage.save_borrow_records(rows)
+
+    def build_indexes(self):
+        """Builds the secondary indexes from the loaded snapshot in one pass."""
+        self.search_index.rebuild(self.books)
+        self.query_index.rebuild(self.books)
+        self.counters.rebuild(self.books)
+        self.overdue.rebuild(self.books)
+
+    def load_journal(self):
+        """Replays operations committed after the backend's last snapshot."""
+        for op in self.storage.load_journal():
+            self._apply(op)
+
+    def reload(self):
+        """Discards the in-memory state and loads everything from the backend again."""
+        with self.lock:
+            del self.load_errors[:]
+            self._books = {}
+            self._borrow_records = None
+            self._pending_history = []
+            self.load_data()
+            self.load_borrow_data()
+            self.build_indexes()
+            self.load_journal()
+            self.events.emit(RELOADED)
+
+    def metrics(self):
+        """
+        Operation counts, latency percentiles (ms) and write/redraw sizes
+        recorded while metrics are enabled (see metrics.recorder).
+        """
+        return recorder.snapshot()
+
+    def sync(self):
+        """
+        Picks up changes committed by other processes sharing the data files.
+
+        Returns:
+            bool: True if the in-memory state changed.
+        """
+        return self.storage.sync(self)
+
+    def compact(self):
+        """Asks the backend to fold incremental state into a fresh snapshot."""
+        self.storage.compact(self)
+
+    def export_json(self):
+        """Rewrites the human-readable JSON files (e.g. when using binary snapshots)."""
+        self.storage.export_json(self)
+
+    def flush(self):
+        """Blocks until every change made so far is durable."""
+        self.storage.flush()
+
+    def close(self):
+        """
+        Archives old history (with an archive and a loaded history), then
+        flushes the backend; call before exiting.
+        """
+        if self.archive is not None and self._borrow_records is not None and not self.archive.broken:
+            try:
+                self.archive_history()
+            except OSError as e:  # Nothing is lost: the next run retries
+                self.load_errors.append(f"Could not archive borrow history: {e}")
+        self.storage.close(self)
+
+    # ---------- Transactions ----------
+    def _apply(self, op):
+        """Applies one operation to the in-memory state (no validation, no I/O)."""
+        kind = op["op"]
+        isbn = op["isbn"]
+        if kind == "add":
+            book = Book(op["title"], op["author"], isbn)
+            self._books[isbn] = book
+            self.search_index.add(book)
+            self.query_index.book_added(book)
+            self.counters.book_added(book)
+        elif kind == "delete":
+            book = self._books.pop(isbn)
+            self.search_index.remove(isbn)
+            self.query_index.book_removed(book)
+            self.counters.book_removed(book)
+            self.overdue.loan_ended(isbn)
+        elif kind == "borrow":
+            book = self._books[isbn]
+            book.is_available = False
+            book.borrow_man = op["name"]
+            book.borrow_day = parse_day(op["date"])
+            self.counters.loan_started(book.borrow_day)
+            self.overdue.loan_started(isbn, book.borrow_day)
+            self.query_index.loan_started(book)
+        elif kind == "return":
+            book = self._books[isbn]
+            self.counters.loan_ended(book.borrow_day)
+            self.overdue.loan_ended(isbn)
+            self.query_index.loan_ended(book)
+            book.is_available = True
+            book.borrow_man = None
+            book.borrow_date = None
+
+        if kind in ("borrow", "return"):
+            if self._borrow_records is None:
+                if self.storage.history is None:  # Else the database has it already
+                    self._pending_history.append(op)
+            else:
+                self._apply_history(op)
+        self.events.emit(OP_KINDS[kind], isbn)
+
+    def _apply_history(self, op):
+        """Applies the borrow-history half of a borrow/return operation."""
+        isbn = op["isbn"]
+        if op["op"] == "borrow":
+            rec = BorrowRecord(isbn, op["user_id"], op["name"], op["phone"], op["date"])
+            self._borrow_records.append(rec)
+            self.loans.add(rec)
+            self.borrowers.record(rec)
+            self.circulation.loan_started(rec)
+        else:
+            rec = self.loans.close(isbn)
+            if rec is not None:
+                rec.returned = True
+                rec.fine = op["fine"]
+                rec.return_day = parse_day(op.get("date"))  # Journals may predate it
+                self.circulation.loan_ended(rec)
+
+    def _commit(self, op):
+        """Persists an applied operation through the storage backend."""
+        self.storage.commit(self, op)
+
+    def _execute(self, op):
+        """Applies an operation and persists it."""
+        with self.lock:
+            self._apply(op)
+            self._commit(op)
+
+    def _execute_batch(self, prepared):
+        """
+        Applies a stream of (ok, msg, op) results one by one, so each item is
+        validated against the state left by the previous ones, then persists
+        every applied operation with a single backend commit.
 
+        Returns:
+            list: (ok, msg) per item, in input order.
+        """
+        results, ops = [], []
+        with self.storage.transaction(self), self.lock:
+            for ok, msg, op in prepared:
+                if op is not None:
+                    self._apply(op)
+                    ops.append(op)
+                results.append((ok, msg))
+            if ops:
+                self.storage.commit_batch(self, ops)
+        return results
+
+    # ---------- Validation ----------
+    def _prepare_add(self, title, author, isbn):
+        if not title or not isbn:
+            return False, "⚠️ Missing Data", None
+        if isbn in self._books:
+            return False, "❌ Error: A book with this ISBN already exists!", None
+        op = {"op": "add", "isbn": isbn, "title": title, "author": author}
+        return True, "✅ Book Added Successfully!", op
+
+    def _prepare_borrow(self, isbn, user_id, name, phone):
+        book = self._books.get(isbn)
+        if book is None:
+            return False, "❌ Book not found.", None
+        if not book.is_available:
+            return False, "❌ Book already borrowed.", None
+
+        today = date.today()
+        op = {
+            "op": "borrow",
+            "isbn": isbn,
+            "user_id": user_id,
+            "name": name,
+            "phone": phone,
+            "date": today.isoformat(),
+        }
+        due_date = self.policy.due_date(today)
+        return True, f"✅ Borrowed Successfully!\n📅 Return by: {due_date}", op
+
+    def _prepare_return(self, isbn):
+        book = self._books.get(isbn)
+        if book is None:
+            return False, "❌ Book not found.", None
+        if book.is_available:
+            return False, "⚠️ Book is not borrowed.", None
+
+        msg = "🌟 Book returned successfully."
+        fine_amount = 0
+
+        if book.borrow_date:
+            days_late = self.policy.days_late(book.borrow_date)
+            if days_late > 0:
+                fine_amount = days_late * self.policy.fine_per_day
+                msg = f"⚠️ LATE RETURN!\nOverdue: {days_late} days.\n💰 Fine Recorded: {fine_amount} EGP"
+
+        return True, msg, {"op": "return", "isbn": isbn, "fine": fine_amount,
+                           "date": date.today().isoformat()}
+
+    # ---------- Public Actions ----------
     def add_book(self, title, author, isbn):
         """Adds a new book after validating that the ISBN is unique."""
-        if any(b.isbn == isbn for b in self.books):
-            return False, "❌ Error: A book with this ISBN already exists!"
-
-        new_book = Book(title, author, isbn)
-        self.books.append(new_book)
-        self.save_data()
-        return True, "✅ Book Added Successfully!"
+        with self.storage.transaction(self), self.lock:
+            ok, msg, op = self._prepare_add(title, author, isbn)
+            if ok:
+                self._execute(op)
+        return ok, msg
 
     def delete_book(self, isbn):
         """Deletes a book only if it is currently available (not borrowed)."""
-        for book in self.books:
-            if book.isbn == isbn:
-                if not book.is_available:
-                    return False, "⚠️ Cannot delete a borrowed book!\nReturn it first."
-                self.books.remove(book)
-                self.save_data()
-                return True, "🗑️ Book Deleted Successfully."
-        return False, "❌ Book not found."
+        with self.storage.transaction(self), self.lock:
+            book = self._books.get(isbn)
+            if book is None:
+                return False, "❌ Book not found."
+            if not book.is_available:
+                return False, "⚠️ Cannot delete a borrowed book!\nReturn it first."
+            self._execute({"op": "delete", "isbn": isbn})
+        return True, "🗑️ Book Deleted Successfully."
 
     def borrow_book(self, isbn, user_id, name, phone):
         """Updates book status to borrowed and records the transaction."""
-        for book in self.books:
-            if book.isbn == isbn:
-                if not book.is_available:
-                    return False, "❌ Book already borrowed."
+        with self.storage.transaction(self), self.lock:
+            ok, msg, op = self._prepare_borrow(isbn, user_id, name, phone)
+            if ok:
+                self._execute(op)
+        return ok, msg
 
-                book.is_available = False
-                book.borrow_man = name
-                book.borrow_date = date.today()
+    def return_book(self, isbn):
+        """Handles book return and overdue fine calculation (see LoanPolicy)."""
+        with self.storage.transaction(self), self.lock:
+            ok, msg, op = self._prepare_return(isbn)
+            if ok:
+                self._execute(op)
+        return ok, msg
 
-                rec = BorrowRecord(isbn, user_id, name, phone, date.today())
-                self.borrow_records.append(rec)
+    # ---------- Bulk Actions ----------
+    def add_books(self, items):
+        """
+        Adds many books under a single persistence commit.
 
-                self.save_data()
-                self.save_borrow_data()
+        Args:
+            items (iterable): Dicts with "title", "author" and "isbn" keys.
 
-                due_date = date.today() + timedelta(days=7)
-                return True, f"✅ Borrowed Successfully!\n📅 Return by: {due_date}"
-        return False, "❌ Book not found."
+        Returns:
+            list: (ok, msg) per item; duplicates (in the catalog or earlier in
+            the batch) and incomplete rows are rejected individually.
+        """
+        return self._execute_batch(
+            self._prepare_add(
+                str(item.get("title") or "").strip(),
+                str(item.get("author") or "").strip(),
+                str(item.get("isbn") or "").strip(),
+            )
+            for item in items
+        )
 
-    def return_book(self, isbn):
-        """Handles book return and overdue fine calculation (50 EGP/day)."""
-        for book in self.books:
-            if book.isbn == isbn:
-                if book.is_available:
-                    return False, "⚠️ Book is not borrowed."
-
-                msg = "🌟 Book returned successfully."
-                fine_amount = 0
-
-                if book.borrow_date:
-                    days_diff = (date.today() - book.borrow_date).days
-                    if days_diff > 7:
-                        fine_amount = (days_diff - 7) * 50
-                        msg = f"⚠️ LATE RETURN!\nOverdue: {days_diff - 7} days.\n💰 Fine Recorded: {fine_amount} EGP"
-
-                book.is_available = True
-                book.borrow_man = None
-                book.borrow_date = None
-
-                for rec in reversed(self.borrow_records):
-                    if rec.isbn == isbn and not rec.returned:
-                        rec.returned = True
-                        rec.fine = fine_amount
-                        break
-
-                self.save_data()
-                self.save_borrow_data()
-                return True, msg
-        return False, "❌ Book not found."
+    def borrow_many(self, items):
+        """
+        Lends many books under a single persistence commit.
+
+        Args:
+            items (iterable): Dicts with "isbn", "user_id", "name" and "phone" keys.
+
+        Returns:
+            list: (ok, msg) per item.
+        """
+        return self._execute_batch(
+            self._prepare_borrow(
+                str(item.get("isbn") or "").strip(),
+                str(item.get("user_id") or "").strip(),
+                str(item.get("name") or "").strip(),
+                str(item.get("phone") or "").strip(),
+            )
+            for item in items
+        )
+
+    def return_many(self, isbns):
+        """
+        Returns many books under a single persistence commit.
+
+        Returns:
+            list: (ok, msg) per ISBN.
+        """
+        return self._execute_batch(self._prepare_return(isbn) for isbn in isbns)
+
+    def scan_many(self, items):
+        """
+        Processes scanner input under a single persistence commit.
+
+        Like the Smart Scanner, a borrowed book is returned and an available
+        one is lent to the borrower given with the scan. Scans are handled in
+        order, so the same ISBN may go out and come back within one batch.
+
+        Args:
+            items (iterable): Dicts with an "isbn" key, plus "user_id", "name"
+                and "phone" when the scan is a loan.
+
+        Returns:
+            list: (ok, msg) per scan.
+        """
+        return self._execute_batch(self._prepare_scan(item) for item in items)
+
+    def _prepare_scan(self, item):
+        isbn = str(item.get("isbn") or "").strip()
+        book = self._books.get(isbn)
+        if book is None:
+            return False, "❌ Book not found.", None
+        if not book.is_available:
+            return self._prepare_return(isbn)
+        user_id = str(item.get("user_id") or "").strip()
+        name = str(item.get("name") or "").strip()
+        if not user_id or not name:
+            return False, "⚠️ Book is available; scan it with a borrower to lend it.", None
+        return self._prepare_borrow(isbn, user_id, name, str(item.get("phone") or "").strip())
+
+
+def _borrow_day(rec):
+    return rec.borrow_day
+
+
+def _record(row):
+    """A BorrowRecord from a history row (see storage.SqliteHistory)."""
+    return BorrowRecord(row["isbn"], row["user_id"], row["name"], row["phone"], row["borrow_date"],
+                        row["returned"], row["fine"], row["return_date"])
+
+
+def _borrower(profile):
+    """A Borrower from a SqliteHistory profile."""
+    return Borrower(profile["user_id"], profile["name"], profile["phone"], profile["loans"],
+                    parse_day(profile["last_date"]))
+
+
+recorder.instrument(
+    LibrarySystem,
+    "load_data", "load_borrow_data", "load_journal", "save_data", "save_borrow_data",
+    "add_book", "delete_book", "borrow_book", "return_book", "search", "borrow_log",
+    "archive_history",
+)
@@ -0,0 +1,177 @@
+import tkinter
+import customtkinter as ctk
+from metrics import recorder
+
+
+class TableRow(ctk.CTkFrame):
+    """
+    Base class for a recyclable VirtualTable row.
+
+    Subclasses build their child widgets once in `__init__` and repaint them
+    for a different item in `set_item`; rows are never destroyed while the
+    table is alive.
+    """
+
+    def __init__(self, master, **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+
+    def set_item(self, item):
+        """Updates the row's widgets to display `item`."""
+        raise NotImplementedError
+
+
+class VirtualTable(ctk.CTkFrame):
+    """
+    Scrollable table that only creates as many rows as fit in the viewport.
+
+    The table is bound to a list of items by index: row widget `i` shows
+    `items[offset + i]`. Scrolling only moves `offset` and repaints the
+    existing rows, so the number of Tk widgets is proportional to the window
+    height, not to the number of items. `update_item` and `append` patch a
+    single row in place.
+
+    Args:
+        row_factory (callable): Builds a TableRow given its parent frame.
+        row_height (int): Fixed pixel height of every row.
+    """
+
+    def __init__(self, master, row_factory, row_height=40, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_factory = row_factory
+        self.row_height = row_height
+        self.items = []
+        self.offset = 0
+        self.rows = []
+
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+    # ---------- Public API ----------
+    def set_items(self, items, keep_offset=False):
+        """Replaces the bound item list and repaints (from the top by default)."""
+        self.items = items
+        if not keep_offset:
+            self.offset = 0
+        self._clamp_offset()
+        self._render()
+
+    def refresh(self):
+        """Repaints the visible rows (e.g. after the bound items changed state)."""
+        self._clamp_offset()
+        self._render()
+
+    def update_item(self, index, item):
+        """Replaces `items[index]`, repainting only its row, and only if visible."""
+        self.items[index] = item
+        row = index - self.offset
+        if 0 <= row < len(self.rows):
+            self.rows[row].set_item(item)
+            self._observe_patch(1)
+        else:
+            self._observe_patch(0)
+
+    def append(self, item):
+        """Adds an item at the end; only its row is painted (if visible)."""
+        self.items.append(item)
+        row = len(self.items) - 1 - self.offset
+        if 0 <= row < len(self.rows):
+            self.rows[row].set_item(item)
+            self.rows[row].place(x=0, y=row * self.row_height, relwidth=1)
+            self._observe_patch(1)
+        else:
+            self._observe_patch(0)
+        self._update_scrollbar()
+
+    def remove(self, index):
+        """Removes `items[index]`; the visible rows at or below it shift up."""
+        del self.items[index]
+        if index < self.offset:
+            self.offset -= 1  # Keep the same items on screen
+        self._clamp_offset()
+        self._render()
+
+    def scroll_to(self, index):
+        """Scrolls so that `items[index]` is the first visible row."""
+        self.offset = index
+        self._clamp_offset()
+        self._render()
+
+    # ---------- Layout ----------
+    def _visible_count(self):
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    def _clamp_offset(self):
+        max_offset = max(0, len(self.items) - self._visible_count())
+        self.offset = max(0, min(self.offset, max_offset))
+
+    def _on_resize(self, event):
+        needed = event.height // self.row_height + 1
+        while len(self.rows) < needed:
+            row = self.row_factory(self.body)
+            row.configure(height=self.row_height)
+            row.pack_propagate(False)  # Keep the fixed pitch regardless of content
+            self._bind_wheel(row)
+            self.rows.append(row)
+        self._clamp_offset()
+        self._render()
+
+    def _render(self):
+        for i, row in enumerate(self.rows):
+            idx = self.offset + i
+            if idx < len(self.items):
+                row.set_item(self.items[idx])
+                row.place(x=0, y=i * self.row_height, relwidth=1)
+            else:
+                row.place_forget()
+        self._update_scrollbar()
+        if recorder.enabled:
+            recorder.observe("widgets.rows_per_redraw", min(len(self.rows), len(self.items) - self.offset))
+
+    def _observe_patch(self, rows):
+        if recorder.enabled:
+            recorder.observe("widgets.rows_per_patch", rows)
+
+    def _update_scrollbar(self):
+        total = len(self.items)
+        if total == 0:
+            self.scrollbar.set(0, 1)
+            return
+        first = self.offset / total
+        last = min(1.0, (self.offset + self._visible_count()) / total)
+        self.scrollbar.set(first, last)
+
+    # ---------- Scrolling ----------
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.offset = int(float(value) * len(self.items))
+        elif action == "scroll":
+            step = self._visible_count() if unit == "pages" else 1
+            self.offset += int(value) * step
+        self._clamp_offset()
+        self._render()
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            delta = -1
+        elif getattr(event, "num", None) == 5:
+            delta = 1
+        else:
+            delta = -1 if event.delta > 0 else 1
+        self.offset += delta * 3
+        self._clamp_offset()
+        self._render()
+
+    def _bind_wheel(self, widget):
+        """Routes mouse-wheel events from a widget and its children to the table."""
+        # Plain Tk bind: CTk's own bind() would also forward to the children
+        # visited below and fire twice per notch.
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tkinter.Misc.bind(widget, seq, self._on_wheel, "+")
+        for child in widget.winfo_children():
+            self._bind_wheel(child)
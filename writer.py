@@ -0,0 +1,213 @@
+import queue
+import threading
+from contextlib import contextmanager, nullcontext
+from storage import StorageBackend
+
+_COMMIT, _COMPACT, _CALL, _RELEASE, _STOP = "commit", "compact", "call", "release", "stop"
+
+
+class BackgroundStorage(StorageBackend):
+    """
+    Runs another storage backend's writes on a dedicated thread.
+
+    `commit` and `commit_batch` only enqueue the (already applied) operations,
+    so the caller — typically the Tk main loop — never waits for a disk write
+    or fsync. The writer drains everything queued since its last write and
+    hands it to the wrapped backend as one `commit_batch`, so a burst of scans
+    costs a single journal append (or a single rewrite without a journal).
+
+    The writer holds `library.lock` only while it drains the queue (and
+    snapshots the state, when a compaction is due): LibrarySystem applies and
+    enqueues under the same lock, so the snapshot holds exactly what has been
+    drained, and the disk I/O runs without blocking readers or new mutations.
+
+    Loading is delegated synchronously. Call `poll()` from the UI thread to
+    learn which writes finished (or failed), `flush()` to wait for the queue
+    to drain, and `close()` on shutdown.
+
+    If the wrapped backend is shared with other processes, a transaction
+    that committed something hands one hold on the file lock over to the
+    writer, which releases it once those writes are on disk: another process
+    may only catch up then, yet the caller does not wait.
+
+    Args:
+        inner (StorageBackend): The backend that actually touches the disk.
+    """
+
+    def __init__(self, inner):
+        super().__init__()
+        self.inner = inner
+        self.load_errors = inner.load_errors
+        self.history = inner.history
+        self._queue = queue.Queue()
+        self._results = queue.Queue()
+        self._queued = 0  # Only touched by callers (under library.lock)
+        self._written = 0  # Only touched by the writer
+        self._progress = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+        self._thread.start()
+
+    @property
+    def shared(self):
+        return self.inner.shared
+
+    @property
+    def pending(self):
+        """Number of operations accepted but not yet durable."""
+        return self._queued - self._written
+
+    # ---------- Loading (synchronous) ----------
+    def load_books(self):
+        return self.inner.load_books()
+
+    def load_borrow_records(self):
+        return self.inner.load_borrow_records()
+
+    def load_journal(self):
+        return self.inner.load_journal()
+
+    def save_books(self, rows):
+        self._settle()
+        self.inner.save_books(rows)
+
+    def save_borrow_records(self, rows):
+        self._settle()
+        self.inner.save_borrow_records(rows)
+
+    def _settle(self):
+        """Waits for queued writes unless called by the writer itself (full rewrites)."""
+        if threading.current_thread() is not self._thread:
+            self._queue.join()
+
+    # ---------- Multi-process sharing ----------
+    def transaction(self, library):
+        if not self.inner.shared:
+            return nullcontext()
+        return self._durable_transaction(library)
+
+    @contextmanager
+    def _durable_transaction(self, library):
+        with self.inner.transaction(library):
+            queued = self._queued
+            try:
+                yield
+            finally:
+                if self._queued != queued:
+                    self.inner.file_lock.acquire()
+                    self._queue.put((_RELEASE, library, None))
+
+    def sync(self, library):
+        return self.inner.sync(library)
+
+    # ---------- Writes (queued) ----------
+    def commit(self, library, op):
+        self.commit_batch(library, [op])
+
+    def commit_batch(self, library, ops):
+        self._queued += len(ops)
+        self._queue.put((_COMMIT, library, list(ops)))
+
+    def compact(self, library):
+        self._queue.put((_COMPACT, library, None))
+
+    def export_json(self, library):
+        return self._call(library, lambda: self.inner.export_json(library))
+
+    def rewrite_history(self, library):
+        return self._call(library, lambda: self.inner.rewrite_history(library))
+
+    def _call(self, library, fn):
+        """
+        Runs `fn` on the writer thread after everything queued so far, under
+        library.lock so that no commit lands in between, and returns its result.
+        """
+        if threading.current_thread() is self._thread:
+            with library.lock:
+                return fn()
+        done = threading.Event()
+        outcome = {}
+        self._queue.put((_CALL, library, (fn, done, outcome)))
+        done.wait()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome.get("result")
+
+    def flush(self):
+        if threading.current_thread() is self._thread:
+            return  # The writer's own reads (e.g. a lazy load) wait for nothing
+        # Waits for the ops queued so far only, so a busy stream of later
+        # commits cannot starve the caller.
+        target = self._queued
+        with self._progress:
+            while self._written < target and self._thread.is_alive():
+                self._progress.wait()
+
+    def poll(self):
+        reports = []
+        while True:
+            try:
+                reports.append(self._results.get_nowait())
+            except queue.Empty:
+                return reports
+
+    def close(self, library):
+        if self._thread.is_alive():
+            self._queue.put((_STOP, library, None))
+            self._thread.join()
+        self.inner.close(library)
+
+    # ---------- Writer thread ----------
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            kind, library, _ = items[0]
+            if kind == _STOP:
+                self._queue.task_done()
+                return
+            error = None
+            try:
+                with self.inner.transaction(library):
+                    with library.lock:
+                        # Everything applied so far has been queued: draining it
+                        # all under the lock keeps a compaction snapshot in step
+                        # with the journal, and coalesces bursts into one write.
+                        while True:
+                            try:
+                                items.append(self._queue.get_nowait())
+                            except queue.Empty:
+                                break
+                        ops = [op for kind, _, batch in items if kind == _COMMIT for op in batch]
+                        compact = any(kind == _COMPACT for kind, _, _ in items)
+                        rows = self.inner.plan_compaction(library, len(ops), compact)
+                    if ops or rows is not None:
+                        self.inner.write(library, ops, rows)
+            except Exception as e:  # Reported to the UI; the writer keeps running
+                error = e
+            written, stop = 0, False
+            for kind, _, batch in items:
+                if kind == _COMMIT:
+                    written += len(batch)
+                elif kind == _RELEASE:  # The batch is on disk (or failed): let others in
+                    self.inner.file_lock.release()
+                elif kind == _CALL:
+                    self._run_call(library, *batch)
+                elif kind == _STOP:
+                    stop = True
+            if written:
+                with self._progress:
+                    self._written += written
+                    self._progress.notify_all()
+            if written or error is not None:
+                self._results.put((written, error))
+            for _ in items:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _run_call(self, library, fn, done, outcome):
+        try:
+            with library.lock:
+                outcome["result"] = fn()
+        except Exception as e:  # Re-raised by _call in the caller's thread
+            outcome["error"] = e
+        done.set()